@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_app', '0002_delete_glossaire_delete_materiel_delete_pays'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.CharField(max_length=32)),
+            ],
+            options={
+                'verbose_name': 'Version de cache',
+                'verbose_name_plural': 'Versions de cache',
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 # C:\Foodypedia\apps\core\models.py
 
+import uuid
 from django.db import models
 
 # Cette application est désormais réservée à la configuration et aux utilitaires de base.
@@ -7,4 +8,40 @@ from django.db import models
 # pour éviter les conflits et centraliser les données de référence.
 
 # Vous pouvez ajouter ici des modèles d'utilitaires si nécessaire, mais il est 
-# préférable de les laisser vides pour l'instant.
\ No newline at end of file
+# préférable de les laisser vides pour l'instant.
+
+class CacheVersion(models.Model):
+    """
+    Version d'une donnée mise en cache, partagée par tous les processus.
+
+    Le cache par défaut (LocMemCache) est propre à chaque worker : une
+    invalidation par signal n'atteint que le processus qui a écrit. La version
+    est donc stockée en base, changée dans la transaction de l'écriture, et
+    relue (une requête sur clé primaire) avant chaque utilisation du cache :
+
+        version = CacheVersion.current('recipes:ingredient_index')
+        data = cache.get(f'recipes:ingredient_index:{version}')
+    """
+    key = models.CharField(max_length=100, primary_key=True)
+    # Jeton aléatoire, pas un compteur : une transaction annulée ne peut pas
+    # faire réapparaître une version déjà utilisée
+    version = models.CharField(max_length=32)
+
+    class Meta:
+        verbose_name = "Version de cache"
+        verbose_name_plural = "Versions de cache"
+
+    def __str__(self):
+        return f"{self.key} ({self.version})"
+
+    @classmethod
+    def current(cls, key):
+        """Version courante de 'key' (créée au premier appel)."""
+        return cls.objects.get_or_create(key=key, defaults={'version': uuid.uuid4().hex})[0].version
+
+    @classmethod
+    def bump(cls, key):
+        """Nouvelle version : toutes les copies en cache de 'key' deviennent obsolètes."""
+        version = uuid.uuid4().hex
+        cls.objects.update_or_create(key=key, defaults={'version': version})
+        return version
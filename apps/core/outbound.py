@@ -0,0 +1,266 @@
+# C:\Foodypedia\apps\core\outbound.py
+
+"""
+Client HTTP sortant partagé (microservice IA, webhooks n8n).
+
+Un client par service, créé une fois par processus (get_client) :
+- Session requests avec pool de connexions persistantes (keep-alive) par hôte ;
+- nouvelles tentatives bornées, délai exponentiel avec gigue ("full jitter") ;
+- disjoncteur : après N échecs consécutifs, les appels échouent immédiatement
+  (CircuitOpenError) pendant 'reset_timeout' secondes, puis un appel d'essai ;
+- métriques de latence par client (outbound_metrics()).
+
+    response = get_client('ia').post(settings.IA_SERVICE_URL, json=payload)
+
+Configuration : settings.OUTBOUND_HTTP = {'ia': {'retries': 2, ...}, ...},
+chaque clé surchargeant OUTBOUND_HTTP_DEFAULTS.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+OUTBOUND_HTTP_DEFAULTS = {
+    'connect_timeout': 3.05,        # secondes : un hôte injoignable échoue vite
+    'read_timeout': 30,
+    'retries': 2,                   # tentatives supplémentaires (donc 3 appels au plus)
+    'backoff_base': 0.2,            # secondes ; délai tiré dans [0, base * 2**tentative]
+    'backoff_max': 5,
+    'retry_statuses': (429, 502, 503, 504),
+    'pool_connections': 4,          # hôtes distincts gardés en pool
+    'pool_maxsize': 16,             # connexions par hôte (>= threads appelants)
+    'failure_threshold': 5,         # échecs consécutifs avant ouverture du disjoncteur
+    'reset_timeout': 30,            # secondes en état ouvert avant un appel d'essai
+}
+
+
+class OutboundError(Exception):
+    """Échec d'un appel sortant. retryable=False pour les refus définitifs (4xx)."""
+
+    def __init__(self, message, status_code=None, retryable=True):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+
+
+class CircuitOpenError(OutboundError):
+    """Disjoncteur ouvert : le service est considéré indisponible, aucun appel n'est fait."""
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """True si un appel peut partir. En demi-ouverture, un seul appel d'essai à la fois."""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()  # (ré)ouverture
+            self._trial = False
+
+    def release(self):
+        """Appel terminé sans verdict sur la santé du service : libère l'appel d'essai, sans compter d'échec."""
+        with self._lock:
+            self._trial = False
+
+
+class LatencyStats:
+    """Compteurs et percentiles de latence sur les 'window' derniers appels."""
+
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0  # refusés par le disjoncteur
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+            self.samples.append(seconds)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self.samples)
+            calls, errors, retries, rejected = self.calls, self.errors, self.retries, self.rejected
+
+        def percentile(p):
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+
+        return {
+            'calls': calls,
+            'errors': errors,
+            'retries': retries,
+            'rejected': rejected,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(samples[-1] * 1000, 1) if samples else None,
+        }
+
+
+class OutboundClient:
+    """
+    Appels HTTP vers un service. Nouvelle tentative sur erreur de connexion
+    (requête jamais reçue) et sur les statuts 'retry_statuses' ; pas sur un
+    délai de lecture dépassé, la requête ayant pu être traitée (POST non idempotent).
+    Un 429 (limitation de débit) est retenté sans compter comme échec du disjoncteur.
+    """
+
+    def __init__(self, name, **options):
+        self.name = name
+        self.options = {**OUTBOUND_HTTP_DEFAULTS, **options}
+        self.breaker = CircuitBreaker(self.options['failure_threshold'], self.options['reset_timeout'])
+        self.stats = LatencyStats()
+        self.session = requests.Session()
+        # Les tentatives sont gérées ici (pour le disjoncteur et les métriques), pas par urllib3
+        adapter = HTTPAdapter(
+            pool_connections=self.options['pool_connections'],
+            pool_maxsize=self.options['pool_maxsize'],
+            max_retries=0,
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def request(self, method, url, retries=None, timeout=None, **kwargs):
+        """
+        Retourne la réponse dès que le service a répondu sans erreur serveur
+        (les 4xx sont retournés, à traiter par l'appelant). Lève OutboundError
+        une fois les tentatives épuisées, CircuitOpenError si le disjoncteur est ouvert.
+        """
+        retries = self.options['retries'] if retries is None else retries
+        timeout = timeout or (self.options['connect_timeout'], self.options['read_timeout'])
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.stats.record_rejected()
+                raise CircuitOpenError(f"{self.name}: service indisponible (disjoncteur ouvert)")
+
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # ConnectTimeout en fait partie ; ReadTimeout non
+                error, can_retry = OutboundError(f"{self.name}: connexion impossible ({e})"), True
+            except requests.exceptions.RequestException as e:
+                error, can_retry = OutboundError(f"{self.name}: {e}"), False
+            except BaseException:
+                # Erreur locale (ex: TypeError à l'encodage de json=), interruption... :
+                # l'appel d'essai ne doit pas rester réservé (disjoncteur bloqué)
+                self.breaker.release()
+                raise
+            else:
+                if response.status_code < 500 and response.status_code not in self.options['retry_statuses']:
+                    # Succès, ou refus du client (4xx) : le service répond, le disjoncteur reste fermé
+                    self.stats.record(time.perf_counter() - start, ok=response.status_code < 400)
+                    self.breaker.record_success()
+                    return response
+                error = OutboundError(
+                    f"{self.name}: HTTP {response.status_code}", status_code=response.status_code,
+                )
+                can_retry = response.status_code in self.options['retry_statuses']
+                response.close()
+
+            self.stats.record(time.perf_counter() - start, ok=False)
+            if error.status_code == 429:
+                # Limitation de débit propre à l'appelant : le service répond, pas un échec
+                self.breaker.release()
+            else:
+                self.breaker.record_failure()
+            if not can_retry or attempt >= retries:
+                raise error
+            self.stats.record_retry()
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def _backoff(self, attempt):
+        ceiling = min(self.options['backoff_max'], self.options['backoff_base'] * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+    def metrics(self):
+        return {'state': self.breaker.state, 'failures': self.breaker.failures, **self.stats.snapshot()}
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name):
+    """Client partagé du service 'name' (options : settings.OUTBOUND_HTTP[name])."""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                options = getattr(settings, 'OUTBOUND_HTTP', {}).get(name, {})
+                client = _clients[name] = OutboundClient(name, **options)
+    return client
+
+
+def outbound_metrics():
+    """Métriques de tous les clients créés dans ce processus."""
+    return {name: client.metrics() for name, client in sorted(_clients.items())}
+
+
+def reset_clients():
+    """Oublie les clients (tests, changement de configuration)."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.session.close()
+        _clients.clear()
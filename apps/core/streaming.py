@@ -0,0 +1,145 @@
+# C:\Foodypedia\apps\core\streaming.py
+
+"""
+Lecture incrémentale de gros fichiers JSON pour les commandes d'import.
+
+Au lieu de json.load() sur tout le fichier, iter_json_array() lit par blocs et
+décode un élément du tableau à la fois (json.JSONDecoder.raw_decode, en C).
+La mémoire reste proportionnelle au plus gros élément, pas à la taille du
+fichier. Formats gérés :
+
+    [ {...}, {...} ]                     -> iter_json_array(f)
+    { "techniques": [ {...}, ... ] }     -> iter_json_array(f, key='techniques')
+"""
+
+import json
+import re
+from itertools import islice
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+TOKEN_END_RE = re.compile(r'[\s,:\[\]{}"]')
+
+
+class JSONStreamError(ValueError):
+    """Structure inattendue (pas de tableau, clé absente...)."""
+
+
+class _Reader:
+    def __init__(self, fp, chunk_size):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self, min_size=None):
+        """Ajoute au moins min_size caractères au tampon. False en fin de fichier."""
+        if self.eof:
+            return False
+        # On jette la partie déjà consommée
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = self.fp.read(max(min_size or 0, self.chunk_size))
+        if not chunk:
+            self.eof = True
+            return False
+        if not self.buffer and chunk[0] == '\ufeff':
+            chunk = chunk[1:]  # BOM UTF-8
+        self.buffer += chunk
+        return True
+
+    def peek(self):
+        """Prochain caractère significatif (sans le consommer), '' en fin de fichier."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise JSONStreamError(f"'{char}' attendu, '{found or 'fin de fichier'}' trouvé")
+        self.pos += 1
+
+    def value(self):
+        """Décode la valeur JSON suivante, en lisant davantage si elle est incomplète."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                # Valeur coupée par la fin du tampon : on double la lecture.
+                # Une erreur avant la fin du tampon est une vraie erreur de syntaxe :
+                # échec immédiat, sans charger le reste du fichier.
+                if not self._truncated(e) or not self.fill(len(self.buffer)):
+                    raise
+                continue
+            # Un nombre en fin de tampon peut être tronqué ('12' lu '1')
+            if end == len(self.buffer) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def _truncated(self, error):
+        """
+        Vrai si l'erreur peut venir de la fin du tampon : chaîne non fermée, ou
+        erreur sur le dernier jeton ('tru', '1.5e', '\\u00'). Une erreur suivie
+        d'un séparateur ou d'un blanc est une vraie erreur de syntaxe.
+        """
+        if error.msg.startswith('Unterminated string'):
+            return True
+        return not TOKEN_END_RE.search(self.buffer, error.pos + 1)
+
+
+def iter_json_array(fp, key=None, chunk_size=CHUNK_SIZE):
+    """
+    Génère les éléments du tableau racine, ou du tableau associé à 'key'
+    dans l'objet racine. 'fp' est un fichier ouvert en mode texte.
+    """
+    reader = _Reader(fp, chunk_size)
+
+    if key is not None:
+        reader.expect('{')
+        while True:
+            if reader.peek() == '}':
+                raise JSONStreamError(f"Clé '{key}' absente")
+            name = reader.value()
+            reader.expect(':')
+            if name == key:
+                break
+            reader.value()  # valeur ignorée
+            if reader.peek() == ',':
+                reader.pos += 1
+
+    reader.expect('[')
+    if reader.peek() == ']':
+        return
+    while True:
+        yield reader.value()
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == ']':
+            return
+        if separator != ',':
+            raise JSONStreamError(f"',' ou ']' attendu, '{separator or 'fin de fichier'}' trouvé")
+
+
+def iter_json_file(path, key=None, chunk_size=CHUNK_SIZE):
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from iter_json_array(f, key=key, chunk_size=chunk_size)
+
+
+def batched(iterable, size):
+    """Regroupe un itérable en listes de 'size' éléments au plus."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
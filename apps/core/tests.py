@@ -1,3 +1,156 @@
-from django.test import TestCase
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.test import SimpleTestCase
+from .outbound import CircuitBreaker, CircuitOpenError, OutboundClient, OutboundError
+from .streaming import JSONStreamError, iter_json_array, batched
 
-# Create your tests here.
+
+class StreamingJSONTestCase(SimpleTestCase):
+    """
+    Tests du lecteur JSON incrémental utilisé par les commandes d'import.
+    """
+
+    def setUp(self):
+        self.items = [
+            {'nom': f'Technique {i}', 'definition': 'é' * (i % 50), 'niveau': [i, 1.5e3, None, True]}
+            for i in range(300)
+        ] + [123456789, -0.25, 'texte']
+
+    def test_root_array_with_tiny_chunks(self):
+        """Test: Les éléments coupés entre deux blocs sont reconstitués."""
+        text = json.dumps(self.items, indent=2)
+        for chunk_size in (1, 3, 1024):
+            self.assertEqual(list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)), self.items)
+
+    def test_array_under_key(self):
+        """Test: Le tableau est cherché sous une clé de l'objet racine (BOM accepté)."""
+        text = '﻿' + json.dumps({'meta': {'version': [1, 2]}, 'techniques': self.items, 'fin': 1})
+        self.assertEqual(list(iter_json_array(io.StringIO(text), key='techniques', chunk_size=7)), self.items)
+        self.assertEqual(list(iter_json_array(io.StringIO('{"techniques": []}'), key='techniques')), [])
+
+    def test_invalid_structure(self):
+        """Test: Clé absente, racine non tableau ou JSON tronqué lèvent une ValueError."""
+        with self.assertRaises(JSONStreamError):
+            list(iter_json_array(io.StringIO('{"autre": []}'), key='techniques'))
+        with self.assertRaises(JSONStreamError):
+            list(iter_json_array(io.StringIO('{"a": 1}')))
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO('[{"a": 1}, {"b"')))
+
+    def test_syntax_error_fails_without_reading_to_end(self):
+        """Test: Une erreur de syntaxe au milieu du tampon échoue sans charger la suite du fichier."""
+        fp = io.StringIO('[{"a": 1}, {"b" 2}, ' + json.dumps(self.items) * 50 + ']')
+        with self.assertRaises(ValueError):
+            list(iter_json_array(fp, chunk_size=16))
+        self.assertLess(fp.tell(), 64)
+
+    def test_batched(self):
+        """Test: Regroupement en lots de taille bornée."""
+        self.assertEqual([len(batch) for batch in batched(range(10), 4)], [4, 4, 2])
+
+
+class _FakeBackend(BaseHTTPRequestHandler):
+    """Serveur HTTP/1.1 local : répond selon server.statuses, note les ports clients."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.client_ports.add(self.client_address[1])
+        code = self.server.statuses.pop(0) if self.server.statuses else 200
+        body = json.dumps({'ok': code == 200}).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class OutboundClientTestCase(SimpleTestCase):
+    """
+    Tests du client HTTP sortant (keep-alive, tentatives, disjoncteur, métriques).
+    """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeBackend)
+        self.server.block_on_close = False  # connexions keep-alive encore ouvertes en fin de test
+        self.server.statuses = []
+        self.server.client_ports = set()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+        self.client = OutboundClient('test', backoff_base=0, failure_threshold=3, reset_timeout=60)
+
+    def tearDown(self):
+        self.client.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_is_reused(self):
+        """Test: Appels successifs sur une seule connexion TCP (keep-alive)."""
+        for _ in range(5):
+            self.assertEqual(self.client.post(self.url, json={}).json(), {'ok': True})
+        self.assertEqual(len(self.server.client_ports), 1)
+        metrics = self.client.metrics()
+        self.assertEqual(metrics['calls'], 5)
+        self.assertEqual(metrics['state'], CircuitBreaker.CLOSED)
+        self.assertIsNotNone(metrics['p95_ms'])
+
+    def test_retries_on_unavailable_then_succeeds(self):
+        """Test: 503 puis 200 -> une nouvelle tentative, réponse 200 ; 4xx retourné sans tentative."""
+        self.server.statuses = [503, 200, 404]
+        self.assertEqual(self.client.post(self.url, json={}).status_code, 200)
+        self.assertEqual(self.client.post(self.url, json={}).status_code, 404)
+        metrics = self.client.metrics()
+        self.assertEqual((metrics['calls'], metrics['retries'], metrics['errors']), (3, 1, 2))
+
+    def test_circuit_opens_and_fails_fast(self):
+        """Test: Après 3 échecs le disjoncteur s'ouvre ; plus aucun appel jusqu'au délai."""
+        self.server.statuses = [500, 500, 500, 200]
+        for _ in range(3):
+            with self.assertRaises(OutboundError) as ctx:
+                self.client.post(self.url, json={})
+            self.assertEqual(ctx.exception.status_code, 500)  # 500 : pas de nouvelle tentative
+
+        with self.assertRaises(CircuitOpenError):
+            self.client.post(self.url, json={})
+        self.assertEqual(self.server.statuses, [200])  # rien n'a été envoyé
+        self.assertEqual(self.client.metrics()['rejected'], 1)
+
+        # Délai écoulé : un appel d'essai réussi referme le disjoncteur
+        self.client.breaker.opened_at -= 60
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(self.client.post(self.url, json={}).status_code, 200)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_unreachable_host_is_retried_then_raises(self):
+        """Test: Connexion refusée -> tentatives bornées puis OutboundError retentable."""
+        closed = ThreadingHTTPServer(('127.0.0.1', 0), _FakeBackend)
+        url = f'http://127.0.0.1:{closed.server_port}/'
+        closed.server_close()  # port libre, plus personne n'écoute
+        with self.assertRaises(OutboundError) as ctx:
+            self.client.post(url, json={}, retries=1)
+        self.assertTrue(ctx.exception.retryable)
+        self.assertEqual(self.client.metrics()['calls'], 2)
+
+    def test_local_error_during_trial_call_does_not_lock_the_breaker(self):
+        """Test: Une erreur locale (TypeError de json=) pendant l'appel d'essai libère le disjoncteur."""
+        self.client.breaker.opened_at = self.client.breaker.clock() - 60  # demi-ouvert
+        with self.assertRaises(TypeError):
+            self.client.post(self.url, json={'non': object()})
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(self.client.post(self.url, json={}).status_code, 200)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_rate_limiting_does_not_trip_the_breaker(self):
+        """Test: Des 429 sont retentés mais ne comptent pas comme des échecs du service."""
+        self.server.statuses = [429] * 6
+        for _ in range(2):
+            with self.assertRaises(OutboundError) as ctx:
+                self.client.post(self.url, json={})
+            self.assertEqual(ctx.exception.status_code, 429)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.client.breaker.failures, 0)
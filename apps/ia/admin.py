@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import GenerationJob
 
-# Register your models here.
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'recette', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('recette__titre',)
+    readonly_fields = ('payload', 'result', 'error', 'worker', 'created_at', 'started_at', 'finished_at')
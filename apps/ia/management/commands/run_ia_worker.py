@@ -0,0 +1,55 @@
+import threading
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from apps.ia.services import GenerationJobQueue, worker_id
+
+
+class Command(BaseCommand):
+    help = 'Run the IA generation worker pool (DB-backed job queue, no external broker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.IA_WORKERS,
+                            help='Number of worker threads (IA calls are I/O bound)')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queue is empty instead of polling')
+        parser.add_argument('--batch-size', type=int, default=settings.IA_WORKER_BATCH_SIZE,
+                            help='Jobs sent per call to the batch (NDJSON) endpoint; 1 uses the single-item endpoint')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds between polls when the queue is empty')
+
+    def handle(self, *args, **options):
+        queue = GenerationJobQueue()
+        requeued = queue.requeue_stale()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'{requeued} stale job(s) requeued.'))
+
+        stop = threading.Event()
+        counts = [0] * max(options['workers'], 1)
+
+        def run(index):
+            try:
+                counts[index] = queue.work(
+                    worker_id(index), stop=stop, burst=options['burst'],
+                    poll_interval=options['poll_interval'], between_jobs=close_old_connections,
+                    batch_size=options['batch_size'],
+                )
+            finally:
+                # Chaque thread a sa propre connexion
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(len(counts))]
+        self.stdout.write(f'Starting {len(threads)} IA worker(s)...')
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after current jobs...')
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        self.stdout.write(self.style.SUCCESS(f'IA workers stopped: {sum(counts)} job(s) processed.'))
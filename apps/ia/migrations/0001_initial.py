@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('recipes', '0005_recipecategory_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('fiche_technique', 'Fiche technique')], default='fiche_technique', max_length=50)),
+                ('payload', models.JSONField(default=dict, verbose_name='Requête envoyée au service IA')),
+                ('status', models.CharField(choices=[('PENDING', 'En attente'), ('RUNNING', 'En cours'), ('SUCCEEDED', 'Terminée'), ('FAILED', 'Échec')], default='PENDING', max_length=20)),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Réponse du service IA')),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Exécutable à partir de')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Worker ayant pris la tâche')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('recette', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generation_jobs', to='recipes.recette')),
+            ],
+            options={
+                'verbose_name': 'Tâche IA',
+                'verbose_name_plural': 'Tâches IA',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='ia_job_status_available_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,64 @@
+# C:\Foodypedia\apps\ia\models.py
+
 from django.db import models
+from django.utils import timezone
+from apps.recipes.models import Recette
+
+
+class GenerationJob(models.Model):
+    """
+    Tâche de génération IA (file d'attente locale, stockée en base).
+    La vue enregistre la tâche et répond 202 ; un worker (run_ia_worker)
+    appelle le microservice et écrit le résultat.
+    """
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_SUCCEEDED = 'SUCCEEDED'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'En attente'),
+        (STATUS_RUNNING, 'En cours'),
+        (STATUS_SUCCEEDED, 'Terminée'),
+        (STATUS_FAILED, 'Échec'),
+    ]
+
+    KIND_FICHE_TECHNIQUE = 'fiche_technique'
+    KIND_CHOICES = [
+        (KIND_FICHE_TECHNIQUE, 'Fiche technique'),
+    ]
+
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES, default=KIND_FICHE_TECHNIQUE)
+    recette = models.ForeignKey(
+        Recette,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='generation_jobs'
+    )
+    payload = models.JSONField(default=dict, verbose_name="Requête envoyée au service IA")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    result = models.JSONField(null=True, blank=True, verbose_name="Réponse du service IA")
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now, verbose_name="Exécutable à partir de")
+    worker = models.CharField(max_length=100, blank=True, verbose_name="Worker ayant pris la tâche")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Tâche IA"
+        verbose_name_plural = "Tâches IA"
+        ordering = ['-created_at']
+        indexes = [
+            # Prise de tâche : plus ancienne tâche en attente et exécutable
+            models.Index(fields=['status', 'available_at'], name='ia_job_status_available_idx'),
+        ]
+
+    def __str__(self):
+        return f"Tâche IA #{self.pk} ({self.get_status_display()})"
 
-# Create your models here.
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
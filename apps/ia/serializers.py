@@ -0,0 +1,14 @@
+from rest_framework import serializers
+from .models import GenerationJob
+
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = GenerationJob
+        fields = [
+            'id', 'kind', 'recette', 'status', 'status_display', 'attempts',
+            'result', 'error', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
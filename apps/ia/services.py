@@ -0,0 +1,262 @@
+# C:\Foodypedia\apps\ia\services.py
+
+"""
+File de tâches IA stockée en base (aucun broker externe requis).
+
+    GenererFicheIA (POST)  ->  GenerationJob PENDING  ->  202 + job_id
+    GenererFichesIALot     ->  N GenerationJob PENDING ->  202 + job_ids
+    run_ia_worker          ->  claim() / run()        ->  SUCCEEDED | FAILED
+                               claim_batch() / run_batch() : un appel NDJSON par lot
+    GenerationJobStatus    ->  lecture du statut et du résultat
+"""
+
+import json
+import socket
+import threading
+import time
+from datetime import timedelta
+import requests
+from django.conf import settings
+from django.db.models import F, Prefetch
+from django.utils import timezone
+from apps.core.outbound import OutboundError, get_client
+from apps.recipes.models import Recette, QuantiteIngredient
+from .models import GenerationJob
+
+
+class IAServiceError(Exception):
+    """Erreur d'appel au microservice IA. retryable=False pour les refus (4xx)."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def build_fiche_payload(recette: Recette) -> dict:
+    """Payload FicheInput du microservice (services/ia/schemas.py)."""
+    ingredients_bruts = []
+    if 'lignes_ingredients' in getattr(recette, '_prefetched_objects_cache', {}):
+        lignes = recette.lignes_ingredients.all()  # cf. recettes_for_payload()
+    else:
+        lignes = recette.lignes_ingredients.select_related('ingredient', 'sub_recipe')
+    for ligne in lignes:
+        element = ligne.ingredient.name if ligne.ingredient_id else ligne.sub_recipe.titre
+        quantite = 'QS' if ligne.quantite is None else f"{ligne.quantite:g}"
+        ingredients_bruts.append(f"{quantite} {ligne.unite} de {element}".replace('  ', ' '))
+    return {
+        "recette_id": recette.id,
+        "titre": recette.titre,
+        "ingredients_bruts": ingredients_bruts,
+    }
+
+
+def recettes_for_payload(queryset):
+    """Précharge les lignes nécessaires à build_fiche_payload (2 requêtes pour tout le lot)."""
+    return queryset.prefetch_related(Prefetch(
+        'lignes_ingredients',
+        queryset=QuantiteIngredient.objects.select_related('ingredient', 'sub_recipe'),
+    ))
+
+
+def call_ia_service(payload: dict) -> dict:
+    """
+    Appel synchrone du microservice (exécuté par les workers, jamais par une vue),
+    par le client partagé : connexions persistantes, tentatives, disjoncteur.
+    """
+    try:
+        response = get_client('ia').post(settings.IA_SERVICE_URL, json=payload)
+    except OutboundError as e:
+        raise IAServiceError(f"Erreur d'appel au service IA: {e}", retryable=e.retryable)
+    if response.status_code >= 400:
+        raise IAServiceError(
+            f"Service IA: HTTP {response.status_code}",
+            retryable=response.status_code >= 500 or response.status_code == 429,
+        )
+    try:
+        return response.json()
+    except ValueError:
+        raise IAServiceError("Service IA: réponse non JSON")
+
+
+def call_ia_service_batch(payloads: list):
+    """
+    Appel du endpoint de lot (NDJSON). Génère un dict par élément, dans l'ordre
+    de fin : {"index", "recette_id", "ok", "fiche" | "erreur"}.
+    """
+    try:
+        # read_timeout : délai entre deux lignes, pas pour tout le lot
+        response = get_client('ia').post(settings.IA_SERVICE_BATCH_URL, json=payloads, stream=True)
+    except OutboundError as e:
+        raise IAServiceError(f"Erreur d'appel au service IA: {e}", retryable=e.retryable)
+    with response:
+        if response.status_code >= 400:
+            raise IAServiceError(
+                f"Service IA: HTTP {response.status_code}",
+                retryable=response.status_code >= 500 or response.status_code == 429,
+            )
+        try:
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+        except requests.exceptions.RequestException as e:
+            raise IAServiceError(f"Service IA: flux interrompu ({e})")
+        except ValueError:
+            raise IAServiceError("Service IA: ligne NDJSON invalide")
+
+
+class GenerationJobQueue:
+    """
+    Opérations sur la file. La prise de tâche est un UPDATE conditionnel
+    (status=PENDING) : deux workers ne peuvent pas prendre la même tâche,
+    sans dépendre de SELECT ... FOR UPDATE SKIP LOCKED (absent de SQLite).
+    """
+
+    def __init__(self, client=None, batch_client=None):
+        self.client = client or call_ia_service
+        self.batch_client = batch_client or call_ia_service_batch
+
+    def enqueue(self, recette: Recette, kind=GenerationJob.KIND_FICHE_TECHNIQUE) -> GenerationJob:
+        return GenerationJob.objects.create(kind=kind, recette=recette, payload=build_fiche_payload(recette))
+
+    def enqueue_many(self, recettes, kind=GenerationJob.KIND_FICHE_TECHNIQUE) -> list:
+        """Une tâche par recette, insérées en une requête (recettes : queryset de Recette)."""
+        return GenerationJob.objects.bulk_create([
+            GenerationJob(kind=kind, recette=recette, payload=build_fiche_payload(recette))
+            for recette in recettes_for_payload(recettes)
+        ])
+
+    def claim(self, worker_id: str):
+        """Prend la plus ancienne tâche en attente. None si la file est vide."""
+        while True:
+            job_id = (
+                GenerationJob.objects.filter(status=GenerationJob.STATUS_PENDING, available_at__lte=timezone.now())
+                .order_by('available_at', 'id').values_list('id', flat=True).first()
+            )
+            if job_id is None:
+                return None
+            claimed = GenerationJob.objects.filter(id=job_id, status=GenerationJob.STATUS_PENDING).update(
+                status=GenerationJob.STATUS_RUNNING,
+                worker=worker_id,
+                started_at=timezone.now(),
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                return GenerationJob.objects.get(id=job_id)
+            # Prise par un autre worker entre les deux requêtes : on recommence
+
+    def claim_batch(self, worker_id: str, limit: int) -> list:
+        """Prend jusqu'à 'limit' tâches en attente en un seul UPDATE. [] si la file est vide."""
+        job_ids = list(
+            GenerationJob.objects.filter(status=GenerationJob.STATUS_PENDING, available_at__lte=timezone.now())
+            .order_by('available_at', 'id').values_list('id', flat=True)[:limit]
+        )
+        if not job_ids:
+            return []
+        GenerationJob.objects.filter(id__in=job_ids, status=GenerationJob.STATUS_PENDING).update(
+            status=GenerationJob.STATUS_RUNNING,
+            worker=worker_id,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        # Les tâches prises entre-temps par un autre worker portent un autre identifiant
+        return list(GenerationJob.objects.filter(
+            id__in=job_ids, status=GenerationJob.STATUS_RUNNING, worker=worker_id
+        ).order_by('available_at', 'id'))
+
+    def run(self, job: GenerationJob) -> GenerationJob:
+        try:
+            result = self.client(job.payload)
+        except IAServiceError as e:
+            self._fail(job, str(e), e.retryable)
+        except Exception as e:
+            self._fail(job, f"Erreur inattendue: {e}", retryable=False)
+        else:
+            self._succeed(job, result)
+        return job
+
+    def run_batch(self, jobs: list) -> list:
+        """
+        Exécute les tâches en un seul appel au endpoint de lot. Chaque résultat
+        est enregistré dès réception de sa ligne NDJSON ; si le flux s'interrompt,
+        les tâches sans réponse suivent la règle de nouvelle tentative de run().
+        """
+        pending = dict(enumerate(jobs))
+        try:
+            for item in self.batch_client([job.payload for job in jobs]):
+                job = pending.pop(item.get('index'), None)
+                if job is None:
+                    continue
+                if item.get('ok'):
+                    self._succeed(job, item.get('fiche'))
+                else:
+                    self._fail(job, f"Service IA: {item.get('erreur', 'erreur inconnue')}", retryable=True)
+        except IAServiceError as e:
+            error, retryable = str(e), e.retryable
+        except Exception as e:
+            error, retryable = f"Erreur inattendue: {e}", False
+        else:
+            error, retryable = "Service IA: aucune réponse pour cet élément", True
+        for job in pending.values():
+            self._fail(job, error, retryable)
+        return jobs
+
+    def _succeed(self, job, result):
+        job.result = result
+        job.status = GenerationJob.STATUS_SUCCEEDED
+        job.error = ''
+        self._save(job)
+
+    def _fail(self, job, error, retryable):
+        job.error = error
+        if retryable and job.attempts < settings.IA_JOB_MAX_ATTEMPTS:
+            # Nouvelle tentative, avec un délai exponentiel (2s, 4s, 8s...)
+            job.status = GenerationJob.STATUS_PENDING
+            job.available_at = timezone.now() + timedelta(seconds=2 ** job.attempts)
+        else:
+            job.status = GenerationJob.STATUS_FAILED
+        self._save(job)
+
+    def _save(self, job):
+        job.finished_at = timezone.now() if job.is_finished else None
+        job.save(update_fields=['result', 'status', 'error', 'available_at', 'finished_at'])
+
+    def requeue_stale(self) -> int:
+        """Remet en file les tâches RUNNING abandonnées (worker arrêté en cours d'appel)."""
+        limit = timezone.now() - timedelta(seconds=settings.IA_JOB_STALE_AFTER)
+        return GenerationJob.objects.filter(
+            status=GenerationJob.STATUS_RUNNING, started_at__lt=limit
+        ).update(status=GenerationJob.STATUS_PENDING)
+
+    def work(self, worker_id: str, stop: threading.Event = None, burst=False, poll_interval=1.0,
+             between_jobs=None, batch_size=1) -> int:
+        """
+        Boucle d'un worker : prend et exécute des tâches jusqu'à 'stop'
+        (ou jusqu'à file vide si burst=True). Retourne le nombre de tâches traitées.
+        between_jobs : appelé avant chaque prise (ex. close_old_connections).
+        batch_size > 1 : tâches prises par lots et envoyées au endpoint de lot.
+        """
+        stop = stop or threading.Event()
+        processed = 0
+        while not stop.is_set():
+            if between_jobs:
+                between_jobs()
+            if batch_size > 1:
+                jobs = self.claim_batch(worker_id, batch_size)
+            else:
+                job = self.claim(worker_id)
+                jobs = [job] if job else []
+            if not jobs:
+                if burst:
+                    break
+                stop.wait(poll_interval)
+                continue
+            if batch_size > 1:
+                self.run_batch(jobs)
+            else:
+                self.run(jobs[0])
+            processed += len(jobs)
+        return processed
+
+
+def worker_id(index=0) -> str:
+    return f"{socket.gethostname()}:{threading.get_native_id()}:{index}:{int(time.time())}"
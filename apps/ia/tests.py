@@ -1,3 +1,171 @@
+# C:\Foodypedia\apps\ia\tests.py
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.ingredients.models import Ingredient, IngredientCategory
+from apps.recipes.models import Recette, QuantiteIngredient, RecipeCategory
+from .models import GenerationJob
+from .services import GenerationJobQueue, IAServiceError
+
+User = get_user_model()
+
+
+class GenerationJobQueueTestCase(TestCase):
+    """
+    Tests de la file de tâches IA (enqueue 202, worker, statut).
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='chef', email='chef@example.com', password='testpass123')
+        self.client_auth = APIClient()
+        self.client_auth.force_authenticate(user=self.user)
+
+        category = IngredientCategory.objects.create(name='Épicerie', slug='epicerie')
+        farine = Ingredient.objects.create(name='Farine', slug='farine', description='-', category=category)
+        self.recette = Recette.objects.create(
+            titre='Pâte sablée', description='-',
+            category=RecipeCategory.objects.create(name='Bases', slug='bases'),
+        )
+        QuantiteIngredient.objects.create(recette=self.recette, ingredient=farine, quantite=500, unite='g')
+        self.calls = []
+
+    def fake_client(self, payload):
+        self.calls.append(payload)
+        return {"recette_id": payload["recette_id"], "statut_generation": "SUCCES"}
+
+    def test_enqueue_returns_202_and_worker_fills_result(self):
+        """Test: La vue répond 202 sans appeler le service ; le worker écrit le résultat."""
+        response = self.client_auth.post('/api/v1/ia/generer-fiche/', {'recette_id': self.recette.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['job_id']
+        self.assertEqual(response['Location'], f'/api/v1/ia/jobs/{job_id}/')
+
+        job = GenerationJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, GenerationJob.STATUS_PENDING)
+        self.assertEqual(job.payload['ingredients_bruts'], ['500 g de Farine'])
+
+        processed = GenerationJobQueue(client=self.fake_client).work('test-worker', burst=True)
+        self.assertEqual(processed, 1)
+
+        response = self.client_auth.get(response.data['status_url'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], GenerationJob.STATUS_SUCCEEDED)
+        self.assertEqual(response.data['result']['statut_generation'], 'SUCCES')
+        self.assertEqual(response.data['attempts'], 1)
+
+    def test_unknown_recipe(self):
+        """Test: Recette inexistante -> 404, aucune tâche créée."""
+        response = self.client_auth.post('/api/v1/ia/generer-fiche/', {'recette_id': 9999}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(GenerationJob.objects.exists())
+
+    def test_claim_is_exclusive(self):
+        """Test: Deux prises successives ne renvoient jamais la même tâche."""
+        queue = GenerationJobQueue(client=self.fake_client)
+        first, second = queue.enqueue(self.recette), queue.enqueue(self.recette)
+
+        claimed = [queue.claim('w1'), queue.claim('w2'), queue.claim('w3')]
+        self.assertEqual([job.pk for job in claimed[:2]], [first.pk, second.pk])
+        self.assertIsNone(claimed[2])
+        self.assertEqual(GenerationJob.objects.get(pk=first.pk).worker, 'w1')
+
+    def test_retryable_error_is_requeued_with_backoff(self):
+        """Test: Erreur temporaire -> remise en file différée, puis échec au-delà du maximum."""
+        def failing_client(payload):
+            raise IAServiceError("HTTP 503")
+
+        queue = GenerationJobQueue(client=failing_client)
+        job = queue.enqueue(self.recette)
+
+        with self.settings(IA_JOB_MAX_ATTEMPTS=2):
+            job = queue.run(queue.claim('w1'))
+            self.assertEqual(job.status, GenerationJob.STATUS_PENDING)
+            self.assertGreater(job.available_at, timezone.now())
+            self.assertIsNone(queue.claim('w1'))  # pas encore exécutable
+
+            GenerationJob.objects.filter(pk=job.pk).update(available_at=timezone.now())
+            job = queue.run(queue.claim('w1'))
+            self.assertEqual(job.status, GenerationJob.STATUS_FAILED)
+            self.assertEqual(job.attempts, 2)
+            self.assertIsNotNone(job.finished_at)
+
+
+class GenerationJobBatchTestCase(TestCase):
+    """
+    Tests de la génération en lot (enqueue_many, claim_batch, run_batch NDJSON).
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='chef', email='chef@example.com', password='testpass123')
+        self.client_auth = APIClient()
+        self.client_auth.force_authenticate(user=self.user)
+
+        category = IngredientCategory.objects.create(name='Épicerie', slug='epicerie')
+        sucre = Ingredient.objects.create(name='Sucre', slug='sucre', description='-', category=category)
+        self.desserts = RecipeCategory.objects.create(name='Desserts', slug='desserts')
+        self.recettes = []
+        for i in range(4):
+            recette = Recette.objects.create(titre=f'Dessert {i}', description='-', category=self.desserts)
+            QuantiteIngredient.objects.create(recette=recette, ingredient=sucre, quantite=100 + i, unite='g')
+            self.recettes.append(recette)
+        Recette.objects.create(titre='Hors catégorie', description='-')
+        self.batches = []
+
+    def fake_batch_client(self, payloads):
+        """Répond dans le désordre ; l'élément d'index 1 échoue."""
+        self.batches.append(payloads)
+        for index in reversed(range(len(payloads))):
+            if index == 1:
+                yield {"index": index, "recette_id": payloads[index]["recette_id"], "ok": False, "erreur": "LLM"}
+            else:
+                yield {"index": index, "recette_id": payloads[index]["recette_id"], "ok": True,
+                       "fiche": {"recette_id": payloads[index]["recette_id"], "statut_generation": "SUCCES"}}
+
+    def test_category_batch_is_sent_in_one_call(self):
+        """Test: Une catégorie -> une tâche par recette, traitées en un seul appel de lot."""
+        with self.assertNumQueries(5):  # catégorie, count, recettes, lignes préchargées, insertion
+            response = self.client_auth.post('/api/v1/ia/generer-fiches/lot/', {'categorie': 'desserts'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['count'], 4)
+        job_ids = response.data['job_ids']
+        self.assertEqual(
+            GenerationJob.objects.get(pk=job_ids[2]).payload['ingredients_bruts'], ['102 g de Sucre']
+        )
+
+        queue = GenerationJobQueue(batch_client=self.fake_batch_client)
+        with self.settings(IA_JOB_MAX_ATTEMPTS=1):
+            processed = queue.work('w1', burst=True, batch_size=10)
+        self.assertEqual(processed, 4)
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual([p['recette_id'] for p in self.batches[0]], [r.pk for r in self.recettes])
+
+        response = self.client_auth.get(response.data['status_url'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['counts'], {'SUCCEEDED': 3, 'FAILED': 1})
+        failed = GenerationJob.objects.get(status=GenerationJob.STATUS_FAILED)
+        self.assertEqual(failed.recette, self.recettes[1])
+        self.assertIn('LLM', failed.error)
+
+    def test_interrupted_stream_requeues_missing_items(self):
+        """Test: Flux coupé -> les tâches reçues sont terminées, les autres remises en file."""
+        def broken_client(payloads):
+            yield {"index": 0, "ok": True, "fiche": {"statut_generation": "SUCCES"}}
+            raise IAServiceError("Service IA: flux interrompu")
+
+        queue = GenerationJobQueue(batch_client=broken_client)
+        queue.enqueue_many(Recette.objects.filter(category=self.desserts).order_by('pk'))
+        jobs = queue.run_batch(queue.claim_batch('w1', 10))
+
+        self.assertEqual([job.status for job in jobs], ['SUCCEEDED', 'PENDING', 'PENDING', 'PENDING'])
+        self.assertEqual(queue.claim_batch('w2', 10), [])  # délai avant nouvelle tentative
 
-# Create your tests here.
+    def test_invalid_batch_request(self):
+        """Test: Ni ids ni catégorie -> 400 ; ids inconnus -> 404."""
+        response = self.client_auth.post('/api/v1/ia/generer-fiches/lot/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client_auth.post('/api/v1/ia/generer-fiches/lot/', {'recette_ids': [9999]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(GenerationJob.objects.exists())
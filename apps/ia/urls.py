@@ -1,7 +1,11 @@
 from django.urls import path
-from .views import GenererFicheIA
+from .views import GenererFicheIA, GenererFichesIALot, GenerationJobList, GenerationJobStatus, OutboundMetrics
 
 urlpatterns = [
-    # Endpoint appelé par le Frontend ou n8n
+    # Endpoint appelé par le Frontend ou n8n (répond 202 + job_id)
     path('generer-fiche/', GenererFicheIA.as_view(), name='generer-fiche-ia'),
-]
\ No newline at end of file
+    path('generer-fiches/lot/', GenererFichesIALot.as_view(), name='generer-fiches-ia-lot'),
+    path('jobs/', GenerationJobList.as_view(), name='ia-job-list'),
+    path('jobs/<int:pk>/', GenerationJobStatus.as_view(), name='ia-job-status'),
+    path('outbound-metrics/', OutboundMetrics.as_view(), name='ia-outbound-metrics'),
+]
@@ -1,68 +1,123 @@
 # ia/views.py
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
-import requests
-import json
-from apps.recipes.models import Recette
-
-# URL du Microservice IA (à adapter pour votre déploiement Docker)
-IA_SERVICE_URL = "http://localhost:8001/generate-fiche-technique/"
+from rest_framework import permissions, status
+from apps.core.outbound import outbound_metrics
+from apps.recipes.models import Recette, RecipeCategory
+from .models import GenerationJob
+from .serializers import GenerationJobSerializer
+from .services import GenerationJobQueue
 
 class GenererFicheIA(APIView):
     """
-    API Gateway : Reçoit une requête et l'envoie au Microservice IA pour traitement.
+    API Gateway : enregistre une demande de génération et répond immédiatement.
+    L'appel au Microservice IA est fait par un worker (manage.py run_ia_worker),
+    jamais par le worker WSGI.
+
+    POST /api/v1/ia/generer-fiche/  {"recette_id": 12}
+    -> 202 {"job_id": 34, "status": "PENDING", "status_url": "/api/v1/ia/jobs/34/"}
     """
     def post(self, request, format=None):
         recette_id = request.data.get('recette_id')
         
         try:
             recette = Recette.objects.get(pk=recette_id)
-        except Recette.DoesNotExist:
+        except (Recette.DoesNotExist, ValueError, TypeError):
             return Response({"error": "Recette non trouvée."}, status=status.HTTP_404_NOT_FOUND)
 
-        # 1. Préparation des données pour l'IA
-        # Récupération des ingrédients bruts (nécessite une fonction d'extraction)
-        ingredients_list = [
-            f"{q.quantite} {q.unite_mesure} de {q.ingredient_fk.nom_fr}" 
-            for q in recette.quantiteingredient_set.all()
-        ]
-
-        # Structure du payload envoyé au Microservice FastAPI
-        payload_ia = {
-            "recette_id": recette.id,
-            "titre": recette.titre,
-            "ingredients_bruts": ingredients_list,
-            # On peut ajouter ici les étapes brutes si elles sont disponibles
-        }
-
-        # 2. Appel du Microservice externe
+        job = GenerationJobQueue().enqueue(recette)
+        status_url = reverse('ia-job-status', args=[job.pk])
+        return Response(
+            {"job_id": job.pk, "status": job.status, "status_url": status_url},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': status_url},
+        )
+
+
+class GenerationJobStatus(APIView):
+    """
+    Statut et résultat d'une tâche IA (à interroger jusqu'à SUCCEEDED ou FAILED).
+    GET /api/v1/ia/jobs/<id>/
+    """
+    def get(self, request, pk, format=None):
+        job = get_object_or_404(GenerationJob, pk=pk)
+        return Response(GenerationJobSerializer(job).data)
+
+
+class GenererFichesIALot(APIView):
+    """
+    Génération en lot : une tâche par recette, toutes insérées en une requête.
+    Les workers (run_ia_worker --batch-size) les envoient par lots au endpoint
+    NDJSON du microservice au lieu d'un aller-retour par recette.
+
+    POST /api/v1/ia/generer-fiches/lot/  {"recette_ids": [12, 13]}  ou  {"categorie": "desserts"}
+    -> 202 {"count": 2, "job_ids": [34, 35], "status_url": "/api/v1/ia/jobs/?ids=34,35"}
+    """
+    def post(self, request, format=None):
+        recette_ids = request.data.get('recette_ids')
+        categorie = request.data.get('categorie')
+
+        if recette_ids is not None:
+            if not isinstance(recette_ids, list):
+                return Response({"error": "'recette_ids' doit être une liste."}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                recette_ids = {int(pk) for pk in recette_ids}
+            except (ValueError, TypeError):
+                return Response({"error": "'recette_ids' doit contenir des entiers."}, status=status.HTTP_400_BAD_REQUEST)
+            recettes = Recette.objects.filter(pk__in=recette_ids)
+        elif categorie:
+            lookup = {'pk': categorie} if str(categorie).isdigit() else {'slug': categorie}
+            category = get_object_or_404(RecipeCategory, **lookup)
+            recettes = Recette.objects.filter(category=category)
+        else:
+            return Response({"error": "'recette_ids' ou 'categorie' requis."}, status=status.HTTP_400_BAD_REQUEST)
+
+        recettes = recettes.order_by('pk')
+        count = recettes.count()
+        if not count:
+            return Response({"error": "Aucune recette trouvée."}, status=status.HTTP_404_NOT_FOUND)
+        if count > settings.IA_BATCH_MAX_RECETTES:
+            return Response(
+                {"error": f"Lot limité à {settings.IA_BATCH_MAX_RECETTES} recettes."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        jobs = GenerationJobQueue().enqueue_many(recettes)
+        job_ids = [job.pk for job in jobs]
+        status_url = f"{reverse('ia-job-list')}?ids={','.join(map(str, job_ids))}"
+        return Response(
+            {"count": len(job_ids), "job_ids": job_ids, "status_url": status_url},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class GenerationJobList(APIView):
+    """
+    Statut de plusieurs tâches en une requête (suivi d'un lot).
+    GET /api/v1/ia/jobs/?ids=34,35
+    """
+    def get(self, request, format=None):
         try:
-            response_ia = requests.post(IA_SERVICE_URL, json=payload_ia, timeout=30)
-            response_ia.raise_for_status() # Lève une exception si le statut est 4xx ou 5xx
-            
-            # Le Microservice retourne la Fiche Technique normalisée
-            fiche_normale = response_ia.json()
-
-            # NOTE: Dans la réalité, Django recevrait un statut "OK" et une tâche asynchrone (Celery)
-            # mettrait à jour la DB. Ici, nous faisons un appel synchrone simple.
-            
-            return Response(fiche_normale, status=status.HTTP_200_OK)
-
-        except requests.exceptions.RequestException as e:
-            # Gérer les erreurs de connexion ou de l'IA elle-même
-            return Response({"error": f"Erreur d'appel au service IA: {str(e)}"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        
-#### 2. Création de `ia/urls.py`
+            ids = [int(pk) for pk in request.query_params.get('ids', '').split(',') if pk.strip()]
+        except ValueError:
+            return Response({"error": "'ids' doit être une liste d'entiers séparés par des virgules."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        jobs = GenerationJob.objects.filter(pk__in=ids[:settings.IA_BATCH_MAX_RECETTES]).order_by('pk')
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return Response({"counts": counts, "jobs": GenerationJobSerializer(jobs, many=True).data})
 
-#Permet d'atteindre cette vue depuis l'extérieur.
 
-#```python
-# ia/urls.py
-from django.urls import path
-from .views import GenererFicheIA
+class OutboundMetrics(APIView):
+    """
+    Latence et état des clients HTTP sortants de ce processus (IA, n8n).
+    GET /api/v1/ia/outbound-metrics/  (administrateurs)
+    """
+    permission_classes = [permissions.IsAdminUser]
 
-urlpatterns = [
-    # Endpoint appelé par le Frontend ou n8n
-    path('generer-fiche/', GenererFicheIA.as_view(), name='generer-fiche-ia'),
-]
\ No newline at end of file
+    def get(self, request, format=None):
+        return Response(outbound_metrics())
@@ -0,0 +1,12 @@
+# C:\Foodypedia\apps\ingredients\apps.py
+
+from django.apps import AppConfig
+
+
+class IngredientsConfig(AppConfig):
+    name = 'apps.ingredients'
+    label = 'ingredients'
+
+    def ready(self):
+        # Branchement des signaux (index de recherche plein texte)
+        from . import signals  # noqa: F401
@@ -0,0 +1,206 @@
+# C:\Foodypedia\apps\ingredients\images.py
+
+"""
+Index des photos d'ingrédients (static/ingredients_pics) et étape d'ingestion
+parallèle pour les commandes d'import.
+
+Le dossier est parcouru UNE fois par exécution ; chaque recherche devient une
+lecture de dictionnaire. L'index peut être persisté en JSON avec le mtime de
+chaque sous-dossier : si aucun dossier n'a changé, le parcours est évité.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from PIL import Image
+from .storage import store_image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+INDEX_VERSION = 1
+
+
+def _stem_key(filename):
+    """Nom sans extension d'image, insensible à la casse ('Pomme.JPG' -> 'pomme')."""
+    stem, ext = os.path.splitext(filename)
+    if ext.lower() in IMAGE_EXTENSIONS:
+        filename = stem
+    return filename.casefold()
+
+
+class ImageIndex:
+    """
+    Recherche par nom de fichier, dans l'ordre :
+    1. nom exact ; 2. nom insensible à la casse ;
+    3. même nom avec une autre extension d'image (.jpg -> .png...).
+    Utilisation :
+
+        index = ImageIndex.load()
+        path = index.find('Pomme.jpg')
+    """
+
+    def __init__(self, root, files=None, dir_mtimes=None):
+        self.root = str(root)
+        self.files = files or []            # chemins relatifs à root, ordre du parcours
+        self.dir_mtimes = dir_mtimes or {}  # {dossier relatif: mtime}
+        self._exact, self._folded, self._stems = {}, {}, {}
+        for rel_path in self.files:
+            name = os.path.basename(rel_path)
+            path = os.path.join(self.root, rel_path)
+            self._exact.setdefault(name, path)
+            self._folded.setdefault(name.casefold(), path)
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                self._stems.setdefault(_stem_key(name), path)
+
+    @classmethod
+    def default_root(cls):
+        return getattr(settings, 'INGREDIENT_PICS_DIR', None) or os.path.join(
+            settings.BASE_DIR.parent, 'static', 'ingredients_pics'
+        )
+
+    @classmethod
+    def load(cls, root=None, cache_path=None):
+        """
+        Construit l'index de 'root' (défaut : settings.INGREDIENT_PICS_DIR).
+        cache_path=None utilise settings.INGREDIENT_PICS_INDEX_CACHE (un fichier par
+        dossier, voir cache_path_for) ; '' désactive le cache.
+        """
+        root = str(root or cls.default_root())
+        if cache_path is None:
+            cache_path = cls.cache_path_for(root)
+
+        if cache_path:
+            cached = cls._read_cache(root, cache_path)
+            if cached is not None:
+                return cached
+
+        index = cls.scan(root)
+        if cache_path and index.dir_mtimes:
+            index.save(cache_path)
+        return index
+
+    @classmethod
+    def cache_path_for(cls, root):
+        """
+        Fichier de cache de 'root' : INGREDIENT_PICS_INDEX_CACHE pour le dossier
+        par défaut, suffixé d'un hachage du chemin pour les autres (un autre
+        dossier n'écrase pas le cache partagé).
+        """
+        cache_path = getattr(settings, 'INGREDIENT_PICS_INDEX_CACHE', '')
+        if not cache_path or os.path.abspath(root) == os.path.abspath(str(cls.default_root())):
+            return cache_path
+        base, ext = os.path.splitext(cache_path)
+        return f'{base}.{hashlib.sha1(os.path.abspath(root).encode()).hexdigest()[:12]}{ext}'
+
+    @classmethod
+    def scan(cls, root):
+        files, dir_mtimes = [], {}
+        if not os.path.isdir(root):
+            return cls(root)
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            rel_dir = os.path.relpath(dirpath, root)
+            dir_mtimes[rel_dir] = os.stat(dirpath).st_mtime_ns
+            files.extend(os.path.normpath(os.path.join(rel_dir, name)) for name in sorted(filenames))
+        return cls(root, files, dir_mtimes)
+
+    @classmethod
+    def _read_cache(cls, root, cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != INDEX_VERSION or data.get('root') != root:
+            return None
+
+        # Ajouter/supprimer/renommer un fichier modifie le mtime de son dossier
+        dir_mtimes = data.get('dirs', {})
+        for rel_dir, mtime in dir_mtimes.items():
+            try:
+                if os.stat(os.path.join(root, rel_dir)).st_mtime_ns != mtime:
+                    return None
+            except OSError:
+                return None
+        return cls(root, data.get('files', []), dir_mtimes)
+
+    def save(self, cache_path):
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        tmp_path = f'{cache_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'root': self.root,
+                       'dirs': self.dir_mtimes, 'files': self.files}, f)
+        os.replace(tmp_path, cache_path)
+
+    def find(self, filename):
+        """Chemin absolu de l'image, ou None."""
+        if not filename:
+            return None
+        filename = os.path.basename(filename)
+        return (
+            self._exact.get(filename)
+            or self._folded.get(filename.casefold())
+            or self._stems.get(_stem_key(filename))
+        )
+
+    def __iter__(self):
+        """Chemins absolus de toutes les images indexées."""
+        for rel_path in self.files:
+            if os.path.splitext(rel_path)[1].lower() in IMAGE_EXTENSIONS:
+                yield os.path.join(self.root, rel_path)
+
+    def __len__(self):
+        return len(self.files)
+
+
+def validate_image(path):
+    """Vérifie que le fichier est une image décodable (lève une exception sinon)."""
+    with Image.open(path) as img:
+        img.verify()
+
+
+class ImageIngestionPipeline:
+    """
+    Étape d'ingestion des images, séparée des écritures ORM : résolution par
+    l'index, validation Pillow puis stockage (storage.store_image) dans un pool
+    de threads, le travail étant dominé par les E/S disque.
+
+        stored = ImageIngestionPipeline(index).ingest(['Pomme.jpg', ...])
+        # {'Pomme.jpg': 'cas/ab/ab....jpg'} ; échecs dans pipeline.errors
+    """
+
+    def __init__(self, index, workers=None):
+        self.index = index
+        self.workers = workers or min(8, (os.cpu_count() or 1) * 2)
+        self.missing = []
+        self.errors = {}
+
+    def ingest(self, filenames):
+        paths = {}
+        for filename in dict.fromkeys(name for name in filenames if name):
+            path = self.index.find(filename)
+            if path:
+                paths[filename] = path
+            else:
+                self.missing.append(filename)
+
+        # Un même fichier (plusieurs noms demandés) n'est traité qu'une fois
+        stored = {}
+        unique_paths = set(paths.values())
+        if unique_paths:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(unique_paths))) as pool:
+                futures = {pool.submit(self._ingest_one, path): path for path in unique_paths}
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        stored[path] = future.result()
+                    except Exception as e:
+                        self.errors[path] = str(e)
+
+        return {filename: stored[path] for filename, path in paths.items() if path in stored}
+
+    @staticmethod
+    def _ingest_one(path):
+        validate_image(path)
+        return store_image(path)
@@ -0,0 +1,370 @@
+# C:\Foodypedia\apps\ingredients\importers.py
+
+"""
+Moteur d'import groupé des ingrédients (commandes d'import JSON).
+
+Toutes les références (catégories, glossaire, catégories fonctionnelles) sont
+résolues en requêtes ensemblistes, les ingrédients sont upsertés avec
+bulk_create(update_conflicts=True) et les liaisons M2M insérées en bloc.
+
+CatalogueSync applique un refresh complet du catalogue par différence
+(empreinte de chaque item JSON) au lieu de tout supprimer puis recréer.
+"""
+
+import hashlib
+import json
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+from apps.atlas.models import Glossaire
+from apps.core.streaming import batched
+from .models import Ingredient, IngredientCategory, FunctionalCategory, IngredientImage
+from .search import IngredientSearchIndex
+
+TEXT_FIELDS = [
+    'scientific_name', 'description', 'seasonality', 'buying_guide',
+    'storage_guide', 'prep_guide', 'nutrition_info', 'texture', 'image_filename',
+]
+
+
+def resolve_by_key(model, key_field, keys, build):
+    """
+    Retourne {clé: id} pour toutes les clés, en créant les lignes manquantes
+    en une seule insertion groupée (build(clé) -> instance non sauvegardée).
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    resolved = dict(model.objects.filter(**{f'{key_field}__in': keys}).values_list(key_field, 'id'))
+    missing = keys - resolved.keys()
+    if missing:
+        model.objects.bulk_create([build(key) for key in sorted(missing)], ignore_conflicts=True, batch_size=500)
+        resolved.update(model.objects.filter(**{f'{key_field}__in': missing}).values_list(key_field, 'id'))
+    return resolved
+
+
+class BulkIngredientImporter:
+    """
+    Importe une liste d'items JSON (format ingredients_import_template.json)
+    dans une seule transaction. Utilisation :
+
+        report = BulkIngredientImporter().import_items(items)
+    """
+    BATCH_SIZE = 500
+    UPDATE_FIELDS = [
+        'slug', 'category', 'glossary_term', 'specific_data', 'tags', 'updated_at',
+        'source_fingerprint',  # remis à zéro : le prochain refresh réécrira l'ingrédient
+    ] + TEXT_FIELDS
+
+    def import_items(self, items) -> dict:
+        """
+        Retourne un rapport : {'created': [...], 'updated': [...], 'skipped': [...],
+        'rejected': [...], 'ingredients': {nom: Ingredient}}.
+        'skipped' : catégorie absente ; 'rejected' : slug déjà porté par un autre
+        ingrédient (en base ou plus tôt dans le lot, ex. "Piment" / "piment").
+        """
+        report = {'created': [], 'updated': [], 'skipped': [], 'rejected': [], 'ingredients': {}}
+
+        # Dernière occurrence gagnante (comme des update_or_create successifs),
+        # les catégories fonctionnelles s'additionnent (comme des .add() successifs)
+        by_name, fc_by_name = {}, {}
+        for item in items:
+            name = item.get('name') if isinstance(item, dict) else None
+            if not name:
+                continue
+            if not item.get('category'):
+                report['skipped'].append(name)
+                continue
+            by_name[name] = item
+            fc_by_name.setdefault(name, []).extend(item.get('functional_categories') or [])
+        if not by_name:
+            return report
+
+        with transaction.atomic():
+            cat_names = {}
+            for item in by_name.values():
+                cat_names.setdefault(slugify(item['category']), item['category'])
+            categories = resolve_by_key(
+                IngredientCategory, 'slug', cat_names.keys(),
+                lambda slug: IngredientCategory(slug=slug, name=cat_names[slug].capitalize()),
+            )
+            glossary = resolve_by_key(
+                Glossaire, 'terme',
+                {item['glossary_term'] for item in by_name.values() if item.get('glossary_term')},
+                lambda terme: Glossaire(terme=terme, definition=f"Définition automatique pour {terme}. À compléter."),
+            )
+            fc_names = {}
+            for names in fc_by_name.values():
+                for fc_name in names:
+                    fc_names.setdefault(slugify(fc_name), fc_name)
+            functional = resolve_by_key(
+                FunctionalCategory, 'slug', fc_names.keys(),
+                lambda slug: FunctionalCategory(slug=slug, name=fc_names[slug].replace('-', ' ').capitalize()),
+            )
+
+            # Une requête : ingrédients existants et propriétaires actuels des slugs visés
+            slugs = {name: slugify(name) for name in by_name}
+            owners = Ingredient.objects.filter(
+                Q(name__in=by_name.keys()) | Q(slug__in=set(slugs.values()))
+            ).values_list('name', 'slug')
+            existing, slug_owner = set(), {}
+            for owner, slug in owners:
+                existing.add(owner)
+                slug_owner[slug] = owner
+            objs = []
+            for name, item in by_name.items():
+                category_id = categories.get(slugify(item['category']))
+                if category_id is None:
+                    # Conflit sur le nom de catégorie (slug différent) : on n'invente rien
+                    report['skipped'].append(name)
+                    continue
+                if slug_owner.setdefault(slugs[name], name) != name:
+                    # L'upsert porte sur le nom : un slug en double lèverait une IntegrityError
+                    report['rejected'].append(name)
+                    continue
+                ingredient = Ingredient(
+                    name=name,
+                    slug=slugs[name],
+                    category_id=category_id,
+                    glossary_term_id=glossary.get(item.get('glossary_term')),
+                    specific_data=item.get('specific_data') or {},
+                    tags=item.get('tags') or [],
+                    **{field: item.get(field) or '' for field in TEXT_FIELDS},
+                )
+                objs.append(ingredient)
+                report['updated' if name in existing else 'created'].append(name)
+
+            Ingredient.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=['name'],
+                update_fields=self.UPDATE_FIELDS,
+                batch_size=self.BATCH_SIZE,
+            )
+
+            # Relecture unique pour obtenir les IDs (et l'état des images)
+            ingredients = {
+                ingredient.name: ingredient
+                for ingredient in Ingredient.objects.filter(name__in=[obj.name for obj in objs])
+            }
+            report['ingredients'] = ingredients
+            # bulk_create n'envoie pas post_save : réindexation explicite
+            IngredientSearchIndex.update(ingredients.values())
+
+            through = Ingredient.functional_categories.through
+            links = [
+                through(ingredient_id=ingredients[name].id, functionalcategory_id=functional[slugify(fc_name)])
+                for name, names in fc_by_name.items() if name in ingredients
+                for fc_name in names
+            ]
+            through.objects.bulk_create(links, ignore_conflicts=True, batch_size=self.BATCH_SIZE)
+
+        return report
+
+
+def item_fingerprint(*parts):
+    """SHA-256 d'une représentation JSON canonique (clés triées) des éléments."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CatalogueSync:
+    """
+    Refresh différentiel du catalogue (refresh_ingredients).
+
+    'entries' décrit le catalogue complet attendu, dans l'ordre des fichiers :
+    [{'name', 'slug', 'category_slug', 'category_name', 'item'}, ...]
+    Les entrées sont lues une seule fois, en flux (un générateur convient) :
+    les items modifiés sont écrits par lots de BATCH_SIZE, la mémoire ne
+    dépend pas de la taille des fichiers. 'wanted' (noms attendus) doit alors
+    être connu d'avance, pour supprimer les ingrédients retirés avant les
+    insertions ; sans lui, les entrées sont d'abord chargées en liste.
+
+    Seuls les ingrédients dont l'empreinte a changé (ou dont la photo était
+    introuvable jusqu'ici) sont réécrits ; ceux qui ne figurent plus dans les
+    entrées sont supprimés. Tout est appliqué dans une seule transaction : les
+    lecteurs de l'API voient l'ancien ou le nouveau catalogue, jamais des
+    tables vides, et les clés primaires sont conservées.
+    """
+    BATCH_SIZE = 500
+    UPDATE_FIELDS = [
+        'slug', 'category', 'glossary_term', 'specific_data', 'tags',
+        'main_image', 'source_fingerprint', 'updated_at',
+    ] + TEXT_FIELDS
+    EMPTY_GLOSSARY_TERM = "Non spécifié"
+
+    def sync(self, entries, wanted=None, ingest_images=None, reset=False):
+        """
+        ingest_images(noms de fichiers) -> {nom: nom stocké} est appelé pour
+        chaque lot d'items modifiés, avant son écriture.
+        reset=True reproduit l'ancien comportement (tout supprimer, tout recréer).
+        Retourne {'created', 'updated', 'unchanged', 'deleted'} (compteurs).
+        """
+        if wanted is None:
+            entries = list(entries)
+            wanted = {entry['name'] for entry in entries}
+        existing = {} if reset else {
+            name: (pk, fingerprint, main_image or None)
+            for pk, name, fingerprint, main_image in Ingredient.objects.values_list(
+                'id', 'name', 'source_fingerprint', 'main_image'
+            )
+        }
+        stale_ids = [pk for name, (pk, _, _) in existing.items() if name not in wanted]
+        # Références rencontrées dans tout le catalogue (slug -> nom), et compteurs
+        self._cat_names, self._fc_names = {}, {}
+        self._categories, self._glossary, self._functional = {}, {}, {}
+        self._counts = {'seen': 0, 'created': 0, 'updated': 0}
+
+        with transaction.atomic():
+            if reset:
+                IngredientImage.objects.all().delete()
+                Ingredient.objects.all().delete()
+                IngredientCategory.objects.all().delete()
+                FunctionalCategory.objects.all().delete()
+            # Libère noms et slugs avant les insertions
+            Ingredient.objects.filter(id__in=stale_ids).delete()
+
+            for batch in batched(self._changed(entries, existing), self.BATCH_SIZE):
+                self._write_batch(batch, existing, ingest_images)
+
+            self._categories.update(self._resolve_categories(self._cat_names.keys()))
+            self._fill_category_images()
+
+            # Références qui ne servent plus (l'ancien refresh les supprimait toutes)
+            IngredientCategory.objects.exclude(id__in=self._categories.values()) \
+                .filter(ingredients__isnull=True).delete()
+            FunctionalCategory.objects.exclude(slug__in=self._fc_names.keys()) \
+                .filter(ingredients__isnull=True).delete()
+
+        changed = self._counts['created'] + self._counts['updated']
+        return {
+            'created': self._counts['created'],
+            'updated': self._counts['updated'],
+            'unchanged': self._counts['seen'] - changed,
+            'deleted': len(stale_ids),
+        }
+
+    def _changed(self, entries, existing):
+        """Parcourt le catalogue (références, compteurs) et ne génère que les items à réécrire."""
+        for entry in entries:
+            self._counts['seen'] += 1
+            self._cat_names.setdefault(entry['category_slug'], entry['category_name'])
+            for fc_name in entry['item'].get('functional_categories') or []:
+                self._fc_names.setdefault(slugify(fc_name), fc_name)
+            entry['fingerprint'] = item_fingerprint(entry['category_slug'], entry['slug'], entry['item'])
+            _, fingerprint, main_image = existing.get(entry['name'], (None, None, None))
+            # Photo introuvable au refresh précédent : nouvel essai, même si l'item n'a pas changé
+            if fingerprint != entry['fingerprint'] or (entry['item'].get('image_filename') and not main_image):
+                yield entry
+
+    def _write_batch(self, batch, existing, ingest_images):
+        """Écrit un lot d'items modifiés : références manquantes, upsert, index, relations, galerie."""
+        stored = {}
+        if ingest_images:
+            filenames = []
+            for entry in batch:
+                filenames.append(entry['item'].get('image_filename'))
+                filenames.extend(entry['item'].get('variant_images') or [])
+            stored = ingest_images(filenames)
+
+        self._categories.update(self._resolve_categories(
+            {entry['category_slug'] for entry in batch} - self._categories.keys()
+        ))
+        self._glossary.update(resolve_by_key(
+            Glossaire, 'terme',
+            {self._glossary_term(entry['item']) for entry in batch} - {None} - self._glossary.keys(),
+            lambda terme: Glossaire(terme=terme, definition=f"Définition pour {terme}.", type_terme='N'),
+        ))
+        self._functional.update(resolve_by_key(
+            FunctionalCategory, 'slug',
+            {slugify(fc) for entry in batch for fc in entry['item'].get('functional_categories') or []}
+            - self._functional.keys(),
+            lambda slug: FunctionalCategory(slug=slug, name=self._fc_names[slug]),
+        ))
+
+        to_create, to_update = [], []
+        for entry in batch:
+            current_image = existing.get(entry['name'], (None, None, None))[2]
+            ingredient = self._build(entry, self._categories, self._glossary, stored, current_image)
+            if entry['name'] in existing:
+                ingredient.pk = existing[entry['name']][0]
+                to_update.append(ingredient)
+            else:
+                to_create.append(ingredient)
+        Ingredient.objects.bulk_create(to_create)
+        Ingredient.objects.bulk_update(to_update, self.UPDATE_FIELDS)
+        self._counts['created'] += len(to_create)
+        self._counts['updated'] += len(to_update)
+
+        ids = dict(Ingredient.objects.filter(name__in=[e['name'] for e in batch]).values_list('name', 'id'))
+        updated_ids = [ingredient.pk for ingredient in to_update]
+        IngredientSearchIndex.update(Ingredient.objects.filter(id__in=ids.values()))
+
+        # Relations des items modifiés : remplacées en bloc
+        through = Ingredient.functional_categories.through
+        through.objects.filter(ingredient_id__in=updated_ids).delete()
+        through.objects.bulk_create([
+            through(ingredient_id=ids[entry['name']], functionalcategory_id=self._functional[slugify(fc_name)])
+            for entry in batch
+            for fc_name in dict.fromkeys(entry['item'].get('functional_categories') or [])
+        ], ignore_conflicts=True)
+
+        IngredientImage.objects.filter(ingredient_id__in=updated_ids).delete()
+        IngredientImage.objects.bulk_create([
+            IngredientImage(ingredient_id=ids[entry['name']], image=stored[img_name], caption=img_name)
+            for entry in batch
+            for img_name in entry['item'].get('variant_images') or []
+            if img_name in stored
+        ])
+
+    def _resolve_categories(self, slugs):
+        return resolve_by_key(
+            IngredientCategory, 'slug', slugs,
+            lambda slug: IngredientCategory(slug=slug, name=self._cat_names[slug]),
+        )
+
+    def _glossary_term(self, item):
+        terme = item.get('glossary_term')
+        if not terme or terme == self.EMPTY_GLOSSARY_TERM:
+            return None
+        return terme
+
+    def _build(self, entry, categories, glossary, stored, current_image=None):
+        """
+        Ingrédient à écrire. La photo principale n'est remplacée que si une
+        nouvelle a été stockée : celle posée par import_images (ou une autre
+        commande) est conservée.
+        """
+        item = entry['item']
+        return Ingredient(
+            name=entry['name'],
+            slug=entry['slug'],
+            category_id=categories[entry['category_slug']],
+            glossary_term_id=glossary.get(self._glossary_term(item)),
+            specific_data=item.get('specific_data') or {},
+            tags=item.get('tags') or [],
+            main_image=stored.get(item.get('image_filename')) or current_image,
+            source_fingerprint=entry['fingerprint'],
+            updated_at=timezone.now(),  # bulk_update n'applique pas auto_now
+            **{field: item.get(field) or '' for field in TEXT_FIELDS},
+        )
+
+    def _fill_category_images(self):
+        """Catégorie sans photo : celle de son premier ingrédient illustré (même fichier stocké)."""
+        empty = set(
+            IngredientCategory.objects.filter(Q(image='') | Q(image__isnull=True), id__in=self._categories.values())
+            .values_list('slug', flat=True)
+        )
+        if not empty:
+            return
+        images = {}
+        for slug, image in (
+            Ingredient.objects.filter(category__slug__in=empty).exclude(main_image='')
+            .exclude(main_image__isnull=True).order_by('pk').values_list('category__slug', 'main_image')
+        ):
+            images.setdefault(slug, image)
+        IngredientCategory.objects.bulk_update(
+            [IngredientCategory(id=self._categories[slug], image=image) for slug, image in images.items()],
+            ['image'],
+        )
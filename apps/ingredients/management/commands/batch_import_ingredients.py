@@ -1,9 +1,13 @@
 import json
 import os
+from collections import Counter
 from django.core.management.base import BaseCommand, CommandError
-from django.utils.text import slugify
-from django.conf import settings
-from apps.ingredients.models import Ingredient, IngredientCategory, FunctionalCategory
+from django.db import transaction
+from apps.core.streaming import JSONStreamError, iter_json_file, batched
+from apps.ingredients.images import ImageIndex
+from apps.ingredients.importers import BulkIngredientImporter
+from apps.ingredients.models import IngredientImage
+from apps.ingredients.storage import attach_image, store_image
 
 class Command(BaseCommand):
     help = 'Importe des ingrédients depuis un fichier JSON (voir ingredients_import_template.json)'
@@ -19,6 +23,12 @@ class Command(BaseCommand):
             type=str, 
             help='Chemin vers un dossier contenant plusieurs fichiers JSON'
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Nombre d'items lus puis upsertés à la fois (lecture en flux)"
+        )
 
     def handle(self, *args, **options):
         file_path = options['file']
@@ -42,105 +52,72 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.MIGRATE_HEADING(f"Traitement de {len(files_to_import)} fichier(s) JSON..."))
 
+        importer = BulkIngredientImporter()
+        self.image_index = ImageIndex.load()
         for json_file in files_to_import:
             self.stdout.write(f"\n--- Importation de : {os.path.basename(json_file)} ---")
-            with open(json_file, 'r', encoding='utf-8') as f:
-                try:
-                    data = json.load(f)
-                except json.JSONDecodeError:
-                    self.stdout.write(self.style.ERROR(f"Erreur de lecture dans {json_file}, ignoré."))
-                    continue
+            # Lecture en flux par lots : mémoire bornée quelle que soit la taille du fichier.
+            # Un fichier illisible est annulé en entier (une transaction par fichier).
+            totals = Counter()
+            try:
+                with transaction.atomic():
+                    for data in batched(iter_json_file(json_file), options['batch_size']):
+                        # Upsert groupé : un nombre fixe de requêtes par lot
+                        report = importer.import_items(data)
+                        for name in report['skipped']:
+                            self.stdout.write(self.style.WARNING(f"  [SKIP] Catégorie manquante : {name}"))
+                        for name in report['rejected']:
+                            self.stdout.write(self.style.WARNING(f"  [REJET] Slug déjà utilisé : {name}"))
 
-                for item in data:
-                    name = item.get('name')
-                    if not name:
-                        continue
-                    
-                    # Gestion Catégorie
-                    cat_slug = item.get('category')
-                    category = None
-                    if cat_slug:
-                        category, _ = IngredientCategory.objects.get_or_create(
-                            slug=slugify(cat_slug),
-                            defaults={'name': cat_slug.capitalize()}
-                        )
-                    
-                    # Gestion Glossaire (Lien facultatif avec l'Atlas)
-                    glossary_term = None
-                    glossary_name = item.get('glossary_term')
-                    if glossary_name:
-                        from apps.atlas.models import Glossaire
-                        glossary_term, _ = Glossaire.objects.get_or_create(
-                            terme=glossary_name,
-                            defaults={'definition': f"Définition automatique pour {glossary_name}. À compléter."}
-                        )
+                        self._attach_images(data, report['ingredients'])
+                        totals.update({
+                            key: len(report[key]) for key in ('created', 'updated', 'skipped', 'rejected')
+                        })
+            except (json.JSONDecodeError, JSONStreamError, UnicodeDecodeError):
+                self.stdout.write(self.style.ERROR(f"Erreur de lecture dans {json_file}, ignoré."))
+                continue
 
-                    # Création / Update Ingrédient
-                    ingredient, created = Ingredient.objects.update_or_create(
-                        name=name,
-                        defaults={
-                            'slug': slugify(name),
-                            'scientific_name': item.get('scientific_name', ''),
-                            'description': item.get('description', ''),
-                            'category': category,
-                            'glossary_term': glossary_term,
-                            'seasonality': item.get('seasonality', ''),
-                            'buying_guide': item.get('buying_guide', ''),
-                            'storage_guide': item.get('storage_guide', ''),
-                            'prep_guide': item.get('prep_guide', ''),
-                            'nutrition_info': item.get('nutrition_info', ''),
-                            'texture': item.get('texture', ''),
-                            'specific_data': item.get('specific_data', {}),
-                            'tags': item.get('tags', []),
-                            'image_filename': item.get('image_filename', ''),
-                        }
-                    )
+            self.stdout.write(self.style.SUCCESS(
+                f"  [OK] {totals['created']} créé(s), {totals['updated']} mis à jour, "
+                f"{totals['skipped']} ignoré(s), {totals['rejected']} rejeté(s)"
+            ))
 
-                    # Gestion ManyToMany (Functional Categories)
-                    func_cats = item.get('functional_categories', [])
-                    if func_cats:
-                        for fc_name in func_cats:
-                            slug = slugify(fc_name)
-                            fc, _ = FunctionalCategory.objects.get_or_create(
-                                slug=slug,
-                                defaults={'name': fc_name.replace('-', ' ').capitalize()}
-                            )
-                            ingredient.functional_categories.add(fc)
+        self.stdout.write(self.style.SUCCESS("\nImportation globale terminée ! 🥕"))
 
-                    # NOUVEAU : Gestion de l'image principale avec recherche récursive
-                    image_filename = item.get('image_filename')
-                    if image_filename and not ingredient.main_image:
-                        from django.core.files import File
-                        root_dir = settings.BASE_DIR.parent  # BASE_DIR est dans foodypedia_project/, static est à la racine
-                        search_root = os.path.join(root_dir, 'static', 'ingredients_pics')
-                        
-                        # Recherche récursive du fichier
-                        img_path = None
-                        for root, dirs, files in os.walk(search_root):
-                            if image_filename in files:
-                                img_path = os.path.join(root, image_filename)
-                                break
-                        
-                        if img_path and os.path.exists(img_path):
-                            with open(img_path, 'rb') as f_img:
-                                ingredient.main_image.save(image_filename, File(f_img), save=True)
-                    
-                    # NOUVEAU : Galerie d'images (variations)
-                    images_list = item.get('images', []) # Liste de noms de fichiers
-                    if images_list:
-                        from django.core.files import File
-                        from apps.ingredients.models import IngredientImage
-                        root_dir = settings.BASE_DIR.parent
-                        for idx, img_name in enumerate(images_list):
-                            # On évite d'ajouter si déjà présent (basé sur le nom du fichier)
-                            if not IngredientImage.objects.filter(ingredient=ingredient, image__icontains=img_name).exists():
-                                img_path = os.path.join(root_dir, 'static', 'ingredients_pics', img_name)
-                                if os.path.exists(img_path):
-                                    with open(img_path, 'rb') as f_img:
-                                        new_img = IngredientImage(ingredient=ingredient, caption=img_name.split('.')[0], order=idx)
-                                        new_img.image.save(img_name, File(f_img), save=True)
+    def _attach_images(self, data, ingredients):
+        """Image principale (recherche récursive) et galerie (insérée en un bulk_create), après l'upsert."""
+        # Une seule requête pour les images de galerie déjà présentes
+        existing_gallery = {}
+        for ingredient_id, image in IngredientImage.objects.filter(
+            ingredient_id__in=[ingredient.id for ingredient in ingredients.values()]
+        ).values_list('ingredient_id', 'image'):
+            existing_gallery.setdefault(ingredient_id, []).append(image or '')
 
-                    verb = "Créé" if created else "Mis à jour"
-                    self.stdout.write(self.style.SUCCESS(f"  [OK] {verb} : {ingredient.name}"))
+        gallery = []
+        for item in data:
+            ingredient = ingredients.get(item.get('name')) if isinstance(item, dict) else None
+            if ingredient is None:
+                continue
 
-        self.stdout.write(self.style.SUCCESS("\nImportation globale terminée ! 🥕"))
+            image_filename = item.get('image_filename')
+            if image_filename and not ingredient.main_image:
+                img_path = self.image_index.find(image_filename)
+                if img_path:
+                    attach_image(ingredient, 'main_image', img_path)
+
+            images_list = item.get('images', [])  # Liste de noms de fichiers
+            known = existing_gallery.setdefault(ingredient.id, [])
+            for idx, img_name in enumerate(images_list):
+                # On évite d'ajouter si déjà présent (nom du fichier, ou même contenu)
+                if any(img_name.lower() in path.lower() for path in known):
+                    continue
+                img_path = self.image_index.find(img_name)
+                if img_path:
+                    stored_name = store_image(img_path)
+                    if stored_name in known:
+                        continue
+                    gallery.append(IngredientImage(
+                        ingredient=ingredient, image=stored_name, caption=img_name.split('.')[0], order=idx
+                    ))
+                    known.append(stored_name)
+        IngredientImage.objects.bulk_create(gallery)
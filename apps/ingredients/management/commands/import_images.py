@@ -1,9 +1,10 @@
 import os
 from django.core.management.base import BaseCommand
-from django.core.files import File
 from django.conf import settings
 from django.utils.text import slugify
 from apps.ingredients.models import Ingredient
+from apps.ingredients.images import ImageIndex
+from apps.ingredients.storage import attach_image
 
 class Command(BaseCommand):
     help = 'Import images from static/ingredients_pics to Ingredient models matches by filename'
@@ -30,38 +31,36 @@ class Command(BaseCommand):
         count_skipped = 0
         count_not_found = 0
 
-        for root, dirs, files in os.walk(source_dir):
-            for filename in files:
-                if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
-                    # 1. Identifier le nom de l'ingrédient
-                    name_part = os.path.splitext(filename)[0]
-                    # Nettoyer le nom (ex: "Carotte_Bio" -> "carotte-bio")
-                    candidate_slug = slugify(name_part)
-                    
-                    # 2. Chercher l'ingrédient
-                    # On essaie par slug exact, ou par nom contenant le terme
-                    ingredient = None
-                    try:
-                        ingredient = Ingredient.objects.get(slug=candidate_slug)
-                    except Ingredient.DoesNotExist:
-                        # Fallback: recherche approximative (dangereux si homonymes, mais utile)
-                        # On cherche un ingrédient dont le slug COMMENCE par ce nom
-                        matches = Ingredient.objects.filter(slug__startswith=candidate_slug)
-                        if matches.count() == 1:
-                            ingredient = matches.first()
-                    
-                    if ingredient:
-                        if not ingredient.main_image:
-                            file_path = os.path.join(root, filename)
-                            with open(file_path, 'rb') as f:
-                                ingredient.main_image.save(filename, File(f), save=True)
-                                self.stdout.write(self.style.SUCCESS(f" [OK] Linked {filename} to {ingredient.name}"))
-                                count_success += 1
-                        else:
-                            self.stdout.write(f" [SKIP] {ingredient.name} already has an image")
-                            count_skipped += 1
-                    else:
-                        self.stdout.write(self.style.WARNING(f" [?] No match for {filename} (slug: {candidate_slug})"))
-                        count_not_found += 1
+        # Index partagé avec les autres commandes d'import (extensions d'image uniquement)
+        for file_path in ImageIndex.load(source_dir):
+            filename = os.path.basename(file_path)
+            # 1. Identifier le nom de l'ingrédient
+            name_part = os.path.splitext(filename)[0]
+            # Nettoyer le nom (ex: "Carotte_Bio" -> "carotte-bio")
+            candidate_slug = slugify(name_part)
+            
+            # 2. Chercher l'ingrédient
+            # On essaie par slug exact, ou par nom contenant le terme
+            ingredient = None
+            try:
+                ingredient = Ingredient.objects.get(slug=candidate_slug)
+            except Ingredient.DoesNotExist:
+                # Fallback: recherche approximative (dangereux si homonymes, mais utile)
+                # On cherche un ingrédient dont le slug COMMENCE par ce nom
+                matches = Ingredient.objects.filter(slug__startswith=candidate_slug)
+                if matches.count() == 1:
+                    ingredient = matches.first()
+            
+            if ingredient:
+                if not ingredient.main_image:
+                    attach_image(ingredient, 'main_image', file_path)
+                    self.stdout.write(self.style.SUCCESS(f" [OK] Linked {filename} to {ingredient.name}"))
+                    count_success += 1
+                else:
+                    self.stdout.write(f" [SKIP] {ingredient.name} already has an image")
+                    count_skipped += 1
+            else:
+                self.stdout.write(self.style.WARNING(f" [?] No match for {filename} (slug: {candidate_slug})"))
+                count_not_found += 1
 
         self.stdout.write(self.style.SUCCESS(f"\nImport finished! Linked: {count_success}, Skipped: {count_skipped}, Not Found: {count_not_found}"))
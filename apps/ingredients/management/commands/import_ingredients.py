@@ -3,10 +3,10 @@ import os
 import re
 from django.core.management.base import BaseCommand
 from django.utils.text import slugify
-from django.conf import settings
-from django.core.files import File
 from apps.ingredients.models import Ingredient, IngredientCategory, FunctionalCategory
 from apps.atlas.models import Glossaire
+from apps.ingredients.images import ImageIndex
+from apps.ingredients.storage import attach_image
 
 class Command(BaseCommand):
     help = 'Importe les ingrédients et catégories avec gestion des images'
@@ -56,8 +56,7 @@ class Command(BaseCommand):
             if not cat.image and info.get('image_search'):
                 img_path = self.find_image(info['image_search'])
                 if img_path:
-                    with open(img_path, 'rb') as f:
-                        cat.image.save(info['image_search'], File(f), save=True)
+                    attach_image(cat, 'image', img_path)
             
             self.stdout.write(f"Category: {cat.name} ({'Created' if created else 'Updated'})")
 
@@ -141,28 +140,16 @@ class Command(BaseCommand):
                         image_filename = f"{name}.jpg"
                     
                     if not ingredient.main_image:
+                        # Casse et extension (.jpg/.png...) sont résolues par l'index
                         img_path = self.find_image(image_filename)
-                        if not img_path: # try png
-                             img_path = self.find_image(image_filename.replace('.jpg', '.png'))
-                        if not img_path: # try lowercase
-                             img_path = self.find_image(image_filename.lower())
                         
                         if img_path:
-                            with open(img_path, 'rb') as f_img:
-                                ingredient.main_image.save(os.path.basename(img_path), File(f_img), save=True)
+                            attach_image(ingredient, 'main_image', img_path)
 
                     self.stdout.write(f"  [OK] {ingredient.name}")
 
     def find_image(self, filename):
-        root_dir = settings.BASE_DIR.parent
-        search_root = os.path.join(root_dir, 'static', 'ingredients_pics')
-        for root, dirs, files in os.walk(search_root):
-            if filename in files:
-                return os.path.join(root, filename)
-        
-        # Case insensitive check
-        for root, dirs, files in os.walk(search_root):
-            for f in files:
-                if f.lower() == filename.lower():
-                    return os.path.join(root, f)
-        return None
+        """Recherche de l'image dans l'index de static/ingredients_pics (construit une fois par exécution)"""
+        if getattr(self, 'image_index', None) is None:
+            self.image_index = ImageIndex.load()
+        return self.image_index.find(filename)
@@ -2,10 +2,10 @@ import json
 import os
 from django.core.management.base import BaseCommand
 from django.utils.text import slugify
-from django.conf import settings
-from django.core.files import File
 from apps.ingredients.models import Ingredient, IngredientCategory, FunctionalCategory
 from apps.atlas.models import Glossaire
+from apps.ingredients.images import ImageIndex
+from apps.ingredients.storage import attach_image
 
 class Command(BaseCommand):
     help = 'Importe les poissons et fruits de mer depuis les fichiers JSON spécifiques'
@@ -108,17 +108,13 @@ class Command(BaseCommand):
 
                     # On ne recharge l'image que si elle n'est pas déjà présente
                     if not ingredient.main_image:
+                        # Casse et extension (.jpg/.png...) sont résolues par l'index
                         img_path = self.find_image(image_filename)
-                        if not img_path: # Tentative avec .png
-                             img_path = self.find_image(image_filename.replace('.jpg', '.png'))
-                        if not img_path: # Tentative en minuscules
-                             img_path = self.find_image(image_filename.lower())
                         
                         if img_path:
                             try:
-                                with open(img_path, 'rb') as f_img:
-                                    ingredient.main_image.save(os.path.basename(img_path), File(f_img), save=True)
-                                    self.stdout.write(f"  [OK] {ingredient.name} (Image: {os.path.basename(img_path)})")
+                                attach_image(ingredient, 'main_image', img_path)
+                                self.stdout.write(f"  [OK] {ingredient.name} (Image: {os.path.basename(img_path)})")
                             except Exception as e:
                                 self.stdout.write(self.style.WARNING(f"  [!] Erreur image pour {ingredient.name} : {e}"))
                         else:
@@ -129,19 +125,7 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS("\nImportation terminée avec succès !"))
 
     def find_image(self, filename):
-        """Recherche récursive de l'image dans le dossier static/ingredients_pics"""
-        root_dir = settings.BASE_DIR.parent
-        search_root = os.path.join(root_dir, 'static', 'ingredients_pics')
-        
-        # 1. Recherche exacte
-        for root, dirs, files in os.walk(search_root):
-            if filename in files:
-                return os.path.join(root, filename)
-        
-        # 2. Recherche insensible à la casse
-        for root, dirs, files in os.walk(search_root):
-            for f in files:
-                if f.lower() == filename.lower():
-                    return os.path.join(root, f)
-        
-        return None
+        """Recherche de l'image dans l'index de static/ingredients_pics (construit une fois par exécution)"""
+        if getattr(self, 'image_index', None) is None:
+            self.image_index = ImageIndex.load()
+        return self.image_index.find(filename)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from apps.ingredients.search import IngredientSearchIndex
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des ingrédients"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Ingrédients indexés par lot'
+        )
+
+    def handle(self, *args, **options):
+        if not IngredientSearchIndex.supported():
+            self.stdout.write(self.style.WARNING("Base sans index plein texte (SQLite ou PostgreSQL requis)"))
+            return
+        count = IngredientSearchIndex.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{count} ingrédients indexés"))
@@ -1,166 +1,140 @@
-import json
 import os
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils.text import slugify
 from django.conf import settings
-from django.core.files import File
-from apps.ingredients.models import Ingredient, IngredientCategory, FunctionalCategory, IngredientImage
-from apps.atlas.models import Glossaire
+from apps.core.streaming import JSONStreamError, iter_json_file
+from apps.ingredients.images import ImageIndex, ImageIngestionPipeline
+from apps.ingredients.importers import CatalogueSync
 
 class Command(BaseCommand):
-    help = 'Supprime tout et recharge les ingrédients depuis le dossier JSON des ingredients'
+    help = 'Synchronise les ingrédients avec le dossier JSON des ingredients (diff par empreinte, une transaction)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--json-dir',
+            type=str,
+            default=r"C:\Foodypedia\JSON des ingredients",
+            help='Dossier contenant les fichiers JSON (un fichier par catégorie)'
+        )
+        parser.add_argument(
+            '--image-workers',
+            type=int,
+            default=None,
+            help="Nombre de threads pour l'ingestion des images"
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Ancien comportement : supprime tout puis recrée (toujours dans une transaction)'
+        )
 
     def handle(self, *args, **options):
-        json_dir = r"C:\Foodypedia\JSON des ingredients"
-        pics_dir = r"C:\Foodypedia\static\ingredients_pics"
+        json_dir = options['json_dir']
+        image_index = ImageIndex.load(settings.INGREDIENT_PICS_DIR)
 
         if not os.path.exists(json_dir):
             self.stdout.write(self.style.ERROR(f"Dossier JSON introuvable : {json_dir}"))
             return
 
-        # 1. Nettoyage TOTAL
-        self.stdout.write(self.style.WARNING("--- NETTOYAGE COMPLET DES TABLES INGRÉDIENTS ---"))
-        IngredientImage.objects.all().delete()
-        Ingredient.objects.all().delete()
-        IngredientCategory.objects.all().delete()
-        FunctionalCategory.objects.all().delete()
-        self.stdout.write("Tables vidées avec succès.")
-
-        # 2. Itération sur les fichiers JSON
-        json_files = [f for f in os.listdir(json_dir) if f.endswith('.json')]
-        total_imported = 0
-        processed_names = set()
-        processed_slugs = set()
-
-        for filename in json_files:
-            category_name = os.path.splitext(filename)[0]
-            category_slug = slugify(category_name)
-            
-            self.stdout.write(f"\n--- Traitement de la catégorie : {category_name} ---")
-            
-            # Création de la catégorie
-            category, _ = IngredientCategory.objects.get_or_create(
-                slug=category_slug,
-                defaults={'name': category_name}
-            )
-
-            file_path = os.path.join(json_dir, filename)
+        # 1. Premier passage en flux (aucune écriture) : fichiers lisibles et noms attendus
+        json_files, wanted = self.check_catalogue(json_dir)
+
+        # 2. Second passage en flux, en une transaction : items modifiés écrits par lots,
+        #    leurs images ingérées lot par lot (pool de threads)
+        pipeline = ImageIngestionPipeline(image_index, workers=options['image_workers'])
+        if options['reset']:
+            self.stdout.write(self.style.WARNING("--- RECHARGEMENT COMPLET DES TABLES INGRÉDIENTS ---"))
+        report = CatalogueSync().sync(
+            self.read_catalogue(json_dir, json_files), wanted=wanted,
+            ingest_images=pipeline.ingest, reset=options['reset'],
+        )
+
+        for path, error in pipeline.errors.items():
+            self.stdout.write(self.style.WARNING(f"  [!] Image invalide {os.path.basename(path)} : {error}"))
+        self.stdout.write(
+            f"Images : {len(pipeline.missing)} introuvables, {len(pipeline.errors)} invalides."
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"\nTerminé ! {report['created']} créés, {report['updated']} mis à jour, "
+            f"{report['unchanged']} inchangés, {report['deleted']} supprimés."
+        ))
+
+    def check_catalogue(self, json_dir):
+        """
+        Valide chaque fichier en flux et retourne (fichiers lisibles, noms attendus
+        après dédoublonnage). Un fichier invalide est ignoré en entier ; seuls les
+        noms d'un fichier sont gardés le temps de sa lecture.
+        """
+        unique = UniqueNames()
+        json_files, wanted = [], set()
+        for filename in sorted(f for f in os.listdir(json_dir) if f.endswith('.json')):
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                names = [
+                    item['name'] for item in iter_json_file(os.path.join(json_dir, filename))
+                    if isinstance(item, dict) and 'name' in item
+                ]
+            except JSONStreamError:
+                self.stdout.write(self.style.WARNING(f"Format invalide pour {filename} (liste attendue)"))
+                continue
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f"Erreur de lecture {filename}: {e}"))
                 continue
+            json_files.append(filename)
+            wanted.update(unique.assign(name)[0] for name in names)
+        return json_files, wanted
+
+    def read_catalogue(self, json_dir, json_files):
+        """
+        Génère les entrées pour CatalogueSync au fil du décodage (un item à la
+        fois), avec le même dédoublonnage des noms et des slugs que check_catalogue.
+        """
+        unique = UniqueNames()
+        for filename in json_files:
+            category_name = os.path.splitext(filename)[0]
+            category_slug = slugify(category_name)
 
-            if not isinstance(data, list):
-                self.stdout.write(self.style.WARNING(f"Format invalide pour {filename} (liste attendue)"))
-                continue
+            self.stdout.write(f"\n--- Lecture de la catégorie : {category_name} ---")
 
-            first_img_path = None
-
-            for item in data:
-                if not isinstance(item, dict) or 'name' not in item:
-                    continue
-
-                name = item['name']
-                
-                # Gestion des doublons de noms
-                base_name = name
-                counter = 2
-                while name.lower() in processed_names:
-                    name = f"{base_name} ({counter})"
-                    counter += 1
-                processed_names.add(name.lower())
-
-                # Gestion des doublons de slugs
-                base_slug = slugify(name)
-                if not base_slug: base_slug = "ingredient"
-                slug = base_slug
-                counter = 2
-                while slug in processed_slugs:
-                    slug = f"{base_slug}-{counter}"
-                    counter += 1
-                processed_slugs.add(slug)
-
-                self.stdout.write(f"  Importation de : {name}")
-
-                # Glossaire
-                glossary_term = None
-                g_name = item.get('glossary_term')
-                if g_name and g_name != "Non spécifié":
-                    glossary_term, _ = Glossaire.objects.get_or_create(
-                        terme=g_name,
-                        defaults={'definition': f"Définition pour {g_name}.", 'type_terme': 'N'}
-                    )
-
-                # Ingrédient
-                ingredient = Ingredient.objects.create(
-                    name=name,
-                    slug=slug,
-                    scientific_name=item.get('scientific_name', '') or '',
-                    description=item.get('description', '') or '',
-                    category=category,
-                    glossary_term=glossary_term,
-                    seasonality=item.get('seasonality', '') or '',
-                    buying_guide=item.get('buying_guide', '') or '',
-                    storage_guide=item.get('storage_guide', '') or '',
-                    prep_guide=item.get('prep_guide', '') or '',
-                    nutrition_info=item.get('nutrition_info', '') or '',
-                    texture=item.get('texture', '') or '',
-                    specific_data=item.get('specific_data', {}),
-                    tags=item.get('tags', []),
-                    image_filename=item.get('image_filename', '') or ''
-                )
-
-                # Categories fonctionnelles
-                func_cats = item.get('functional_categories', [])
-                for fc_name in func_cats:
-                    fc_slug = slugify(fc_name)
-                    fc, _ = FunctionalCategory.objects.get_or_create(slug=fc_slug, defaults={'name': fc_name})
-                    ingredient.functional_categories.add(fc)
-
-                # Image principale
-                img_name = item.get('image_filename')
-                if img_name:
-                    img_path = self.find_image(img_name, pics_dir)
-                    if img_path:
-                        with open(img_path, 'rb') as f_img:
-                            ingredient.main_image.save(os.path.basename(img_path), File(f_img), save=True)
-                        if not first_img_path:
-                            first_img_path = img_path
-
-                # Images variantes
-                variant_images = item.get('variant_images', [])
-                for v_img_name in variant_images:
-                    v_img_path = self.find_image(v_img_name, pics_dir)
-                    if v_img_path:
-                        with open(v_img_path, 'rb') as f_v:
-                            v_img_obj = IngredientImage(ingredient=ingredient, caption=v_img_name)
-                            v_img_obj.image.save(os.path.basename(v_img_path), File(f_v), save=True)
-
-                total_imported += 1
-
-            # Assigner une image à la catégorie si elle n'en a pas
-            if first_img_path and not category.image:
-                with open(first_img_path, 'rb') as f_cat:
-                    category.image.save(os.path.basename(first_img_path), File(f_cat), save=True)
-
-        self.stdout.write(self.style.SUCCESS(f"\nTerminé ! {total_imported} ingrédients importés."))
-
-    def find_image(self, filename, search_root):
-        if not filename: return None
-        # Recherche directe
-        target = os.path.join(search_root, filename)
-        if os.path.exists(target):
-            return target
-            
-        # Recherche insensible à la casse
-        try:
-            files = os.listdir(search_root)
-            for f in files:
-                if f.lower() == filename.lower():
-                    return os.path.join(search_root, f)
-        except:
-            pass
-            
-        return None
+            try:
+                for item in iter_json_file(os.path.join(json_dir, filename)):
+                    if isinstance(item, dict) and 'name' in item:
+                        name, slug = unique.assign(item['name'])
+                        yield {
+                            'name': name,
+                            'slug': slug,
+                            'category_slug': category_slug,
+                            'category_name': category_name,
+                            'item': item,
+                        }
+            except (ValueError, OSError) as e:
+                # Fichier modifié depuis check_catalogue : la transaction est annulée
+                raise CommandError(f"Erreur de lecture {filename} pendant le refresh, rien n'a été écrit : {e}")
+
+
+class UniqueNames:
+    """Dédoublonnage des noms (insensible à la casse) et des slugs, dans l'ordre de lecture."""
+
+    def __init__(self):
+        self.processed_names = set()
+        self.processed_slugs = set()
+
+    def assign(self, name):
+        """Retourne (nom, slug) uniques : "Sel" puis "Sel (2)", "sel" puis "sel-2"."""
+        # Gestion des doublons de noms
+        base_name = name
+        counter = 2
+        while name.lower() in self.processed_names:
+            name = f"{base_name} ({counter})"
+            counter += 1
+        self.processed_names.add(name.lower())
+
+        # Gestion des doublons de slugs
+        base_slug = slugify(name)
+        if not base_slug: base_slug = "ingredient"
+        slug = base_slug
+        counter = 2
+        while slug in self.processed_slugs:
+            slug = f"{base_slug}-{counter}"
+            counter += 1
+        self.processed_slugs.add(slug)
+        return name, slug
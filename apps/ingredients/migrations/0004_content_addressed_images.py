@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:13
+
+import apps.ingredients.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredients', '0003_ingredientcategory_description_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ingredient',
+            name='main_image',
+            field=models.ImageField(blank=True, null=True, storage=apps.ingredients.storage.image_storage, upload_to='ingredients/main/', verbose_name='Image principale'),
+        ),
+        migrations.AlterField(
+            model_name='ingredientcategory',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=apps.ingredients.storage.image_storage, upload_to='categories/', verbose_name='Photo de couverture'),
+        ),
+        migrations.AlterField(
+            model_name='ingredientimage',
+            name='image',
+            field=models.ImageField(storage=apps.ingredients.storage.image_storage, upload_to='ingredients/variations/'),
+        ),
+    ]
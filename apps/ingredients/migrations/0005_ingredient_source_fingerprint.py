@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredients', '0004_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='source_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Index plein texte des ingrédients (apps/ingredients/search.py).
+# Structure seule, figée ici : l'index est rempli par la migration 0007,
+# puis tenu à jour par signals.py et importers.py.
+
+from django.db import migrations
+
+TABLE = 'ingredients_search'
+COLUMNS = ('name', 'keywords', 'body')
+
+SQLITE_FORWARD = [
+    f"CREATE VIRTUAL TABLE {TABLE} USING fts5({', '.join(COLUMNS)}, tokenize='unicode61 remove_diacritics 2')",
+    # Suppressions (y compris en masse) propagées par la base
+    f"CREATE TRIGGER {TABLE}_delete AFTER DELETE ON ingredients_ingredient "
+    f"BEGIN DELETE FROM {TABLE} WHERE rowid = old.id; END",
+]
+SQLITE_BACKWARD = [f"DROP TRIGGER IF EXISTS {TABLE}_delete", f"DROP TABLE IF EXISTS {TABLE}"]
+
+POSTGRESQL_FORWARD = [
+    f"CREATE TABLE {TABLE} ("
+    f"ingredient_id bigint PRIMARY KEY REFERENCES ingredients_ingredient (id) ON DELETE CASCADE, "
+    f"document tsvector NOT NULL)",
+    f"CREATE INDEX {TABLE}_document_gin ON {TABLE} USING GIN (document)",
+]
+POSTGRESQL_BACKWARD = [f"DROP TABLE IF EXISTS {TABLE}"]
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredients', '0005_ingredient_source_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
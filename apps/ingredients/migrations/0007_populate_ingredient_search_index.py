@@ -0,0 +1,103 @@
+# Remplissage initial de l'index plein texte créé par 0006 : sans lui, toute
+# recherche ?search= serait vide jusqu'au premier rebuild_ingredient_search.
+# Normalisation figée ici (copie de apps/ingredients/search.py à la date de la
+# migration) : la migration ne dépend pas du code applicatif. Après un
+# changement de la normalisation, reconstruire avec rebuild_ingredient_search.
+
+import re
+import unicodedata
+from django.db import migrations
+
+TABLE = 'ingredients_search'
+COLUMNS = {
+    'name': ('name', 'scientific_name'),
+    'keywords': ('flavor_profile', 'texture', 'seasonality', 'tags'),
+    'body': ('description', 'buying_guide', 'storage_guide', 'prep_guide'),
+}
+TS_WEIGHTS = ('A', 'B', 'C')
+STOPWORDS = frozenset(
+    "a au aux avec ce ces d dans de des du en et il l la le les leur ma mais ne ni on ou par pas "
+    "pour qu que qui sa se ses son sur ta un une vos votre".split()
+)
+SUFFIXES = (
+    'issement', 'ement', 'ation', 'atrice', 'ateur', 'iere', 'euse',
+    'ier', 'ive', 'ee', 'eu', 'if', 'er', 'e',
+)
+LIGATURES = str.maketrans({'œ': 'oe', 'æ': 'ae', 'ß': 'ss'})
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+BATCH_SIZE = 500
+
+
+def fold(text):
+    decomposed = unicodedata.normalize('NFKD', text.casefold().translate(LIGATURES))
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def stem(token):
+    if len(token) <= 3 or token.isdigit():
+        return token
+    if token.endswith('eaux'):
+        token = token[:-1]
+    elif token.endswith('aux'):
+        token = token[:-3] + 'al'
+    elif token[-1] in 'sx':
+        token = token[:-1]
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            break
+    if len(token) > 4 and token[-1] == token[-2] and token[-1] not in 'aeiouy':
+        token = token[:-1]
+    return token
+
+
+def analyse(text):
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        text = ' '.join(str(item) for item in text)
+    return [stem(token) for token in TOKEN_RE.findall(fold(str(text))) if token not in STOPWORDS]
+
+
+def document(row):
+    return tuple(
+        ' '.join(term for field in fields for term in analyse(row[field]))
+        for fields in COLUMNS.values()
+    )
+
+
+def populate_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        sql = f'INSERT INTO {TABLE} (rowid, {", ".join(COLUMNS)}) VALUES (%s, %s, %s, %s)'
+    elif connection.vendor == 'postgresql':
+        vector = ' || '.join(f"setweight(to_tsvector('simple', %s), '{weight}')" for weight in TS_WEIGHTS)
+        sql = (f'INSERT INTO {TABLE} (ingredient_id, document) VALUES (%s, {vector}) '
+               f'ON CONFLICT (ingredient_id) DO UPDATE SET document = EXCLUDED.document')
+    else:
+        return
+    Ingredient = apps.get_model('ingredients', 'Ingredient')
+    fields = [field for fields in COLUMNS.values() for field in fields]
+    rows = Ingredient.objects.using(connection.alias).order_by('pk').values('pk', *fields)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {TABLE}')
+        batch = []
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            batch.append((row['pk'], *document(row)))
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredients', '0006_ingredient_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_index, migrations.RunPython.noop),
+    ]
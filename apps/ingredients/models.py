@@ -1,5 +1,6 @@
 from django.db import models
 from apps.atlas.models import Pays, Glossaire  # Intégration Atlas
+from .storage import image_storage
 
 # -------------------------------------------------------------------------
 # 1. Catégories & Classifications
@@ -14,7 +15,7 @@ class IngredientCategory(models.Model):
     slug = models.SlugField(unique=True, verbose_name="Slug")
     icon = models.CharField(max_length=50, blank=True, verbose_name="Icône (classe CSS/SVG)")
     description = models.TextField(blank=True, verbose_name="Description / Introduction")
-    image = models.ImageField(upload_to="categories/", blank=True, null=True, verbose_name="Photo de couverture")
+    image = models.ImageField(upload_to="categories/", storage=image_storage, blank=True, null=True, verbose_name="Photo de couverture")
 
     class Meta:
         verbose_name = "Catégorie Principale"
@@ -171,13 +172,16 @@ class Ingredient(models.Model):
     )
 
     # --- Média ---
-    main_image = models.ImageField(upload_to="ingredients/main/", blank=True, null=True, verbose_name="Image principale")
+    main_image = models.ImageField(upload_to="ingredients/main/", storage=image_storage, blank=True, null=True, verbose_name="Image principale")
     image_filename = models.CharField(
         max_length=255, 
         blank=True, 
         verbose_name="Nom du fichier image (Référence)"
     )
 
+    # Empreinte de l'item JSON source (refresh_ingredients différentiel)
+    source_fingerprint = models.CharField(max_length=64, blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -200,7 +204,7 @@ class IngredientImage(models.Model):
     Ex: Anis (Graine) vs Anis (Poudre), Poisson (Entier) vs Poisson (Filet)
     """
     ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name="images")
-    image = models.ImageField(upload_to="ingredients/variations/")
+    image = models.ImageField(upload_to="ingredients/variations/", storage=image_storage)
     caption = models.CharField(max_length=100, blank=True, verbose_name="Légende (ex: Moulu, Entier)")
     order = models.PositiveIntegerField(default=0, verbose_name="Ordre d'affichage")
 
@@ -0,0 +1,267 @@
+# C:\Foodypedia\apps\ingredients\search.py
+
+"""
+Recherche plein texte des ingrédients (?search= de l'API).
+
+Index inversé sur le nom, le profil aromatique et les guides, tenu par la base :
+- SQLite     : table virtuelle FTS5 'ingredients_search' (rowid = id de l'ingrédient),
+               classement bm25 ;
+- PostgreSQL : table 'ingredients_search' (tsvector + index GIN), classement ts_rank.
+Sur une autre base, la recherche retombe sur le SearchFilter de DRF (icontains).
+
+Le texte est normalisé en Python avant indexation, et la requête de la même
+façon, ce qui donne le même comportement sur les deux bases :
+casse et accents repliés ("Épice" = "epice"), mots vides retirés,
+racinisation française légère ("épices", "épicé", "épicée" -> "epic").
+
+Structure créée par la migration 0006, remplie par la migration 0007 (copie
+figée de la normalisation) ; après un changement de COLUMNS ou de la
+normalisation : manage.py rebuild_ingredient_search.
+Mise à jour incrémentale : Ingredient.save() (signals.py) et les imports
+groupés (importers.py) réindexent les ingrédients écrits ; la suppression
+est propagée par la base (déclencheur SQLite, ON DELETE CASCADE PostgreSQL).
+"""
+
+import re
+import unicodedata
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+from .models import Ingredient
+
+TABLE = 'ingredients_search'
+
+# Colonnes de l'index -> champs de l'ingrédient, par poids décroissant
+COLUMNS = {
+    'name': ('name', 'scientific_name'),
+    'keywords': ('flavor_profile', 'texture', 'seasonality', 'tags'),
+    'body': ('description', 'buying_guide', 'storage_guide', 'prep_guide'),
+}
+INDEXED_FIELDS = frozenset(field for fields in COLUMNS.values() for field in fields)
+BM25_WEIGHTS = (10.0, 4.0, 1.0)   # SQLite, dans l'ordre de COLUMNS
+TS_WEIGHTS = ('A', 'B', 'C')      # PostgreSQL, idem
+
+STOPWORDS = frozenset(
+    "a au aux avec ce ces d dans de des du en et il l la le les leur ma mais ne ni on ou par pas "
+    "pour qu que qui sa se ses son sur ta un une vos votre".split()
+)
+# Un seul suffixe retiré par mot, le plus long d'abord, s'il reste au moins 3 lettres
+SUFFIXES = (
+    'issement', 'ement', 'ation', 'atrice', 'ateur', 'iere', 'euse',
+    'ier', 'ive', 'ee', 'eu', 'if', 'er', 'e',
+)
+LIGATURES = str.maketrans({'œ': 'oe', 'æ': 'ae', 'ß': 'ss'})
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def fold(text: str) -> str:
+    """Minuscules, sans accents ni ligatures : 'Bœuf Épicé' -> 'boeuf epice'."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold().translate(LIGATURES))
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def stem(token: str) -> str:
+    """Racinisation française légère (pluriel, féminin, suffixes courants) d'un mot déjà replié."""
+    if len(token) <= 3 or token.isdigit():
+        return token
+    if token.endswith('eaux'):
+        token = token[:-1]                   # gâteaux -> gateau
+    elif token.endswith('aux'):
+        token = token[:-3] + 'al'            # bocaux -> bocal
+    elif token[-1] in 'sx':
+        token = token[:-1]
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            break
+    if len(token) > 4 and token[-1] == token[-2] and token[-1] not in 'aeiouy':
+        token = token[:-1]                   # beurre -> beurr -> beur
+    return token
+
+
+def analyse(text) -> list:
+    """Termes indexés d'un texte (ou d'une liste de textes, ex. tags)."""
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        text = ' '.join(str(item) for item in text)
+    return [stem(token) for token in TOKEN_RE.findall(fold(str(text))) if token not in STOPWORDS]
+
+
+def query_terms(query: str) -> list:
+    """
+    Termes d'une requête : [(racine, préfixe ou None)]. Les racines sont
+    cherchées à l'identique ("lait" ne trouve pas "laitue") ; seul le dernier
+    mot, s'il est en cours de saisie (pas d'espace final), accepte aussi un
+    préfixe sur le mot tapé : "poiv" trouve "poivre".
+    """
+    folded = fold(query)
+    tokens = [token for token in TOKEN_RE.findall(folded) if token not in STOPWORDS]
+    terms = {stem(token): None for token in tokens}
+    if tokens and folded.endswith(tokens[-1]):
+        terms[stem(tokens[-1])] = tokens[-1]
+    return list(terms.items())
+
+
+def document(ingredient) -> tuple:
+    """Texte normalisé de chaque colonne de l'index, dans l'ordre de COLUMNS."""
+    return tuple(
+        ' '.join(term for field in fields for term in analyse(getattr(ingredient, field, '')))
+        for fields in COLUMNS.values()
+    )
+
+
+class IngredientSearchIndex:
+    """
+    Opérations sur l'index ('using' : alias de la base).
+
+        IngredientSearchIndex.search("épices douces")  # -> [id, id, ...] par pertinence
+    """
+    VENDORS = ('sqlite', 'postgresql')
+
+    @classmethod
+    def supported(cls, using=DEFAULT_DB_ALIAS) -> bool:
+        return connections[using].vendor in cls.VENDORS
+
+    @classmethod
+    def update(cls, ingredients, using=DEFAULT_DB_ALIAS):
+        """(Ré)indexe les ingrédients donnés, en deux requêtes par lot."""
+        rows = [(ingredient.pk, *document(ingredient)) for ingredient in ingredients]
+        connection = connections[using]
+        if not rows or connection.vendor not in cls.VENDORS:
+            return
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                # FTS5 n'a pas d'UPSERT : suppression puis insertion
+                cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+                cursor.executemany(
+                    f'INSERT INTO {TABLE} (rowid, {", ".join(COLUMNS)}) VALUES (%s, %s, %s, %s)', rows,
+                )
+            else:
+                vector = ' || '.join(
+                    f"setweight(to_tsvector('simple', %s), '{weight}')" for weight in TS_WEIGHTS
+                )
+                cursor.executemany(
+                    f'INSERT INTO {TABLE} (ingredient_id, document) VALUES (%s, {vector}) '
+                    f'ON CONFLICT (ingredient_id) DO UPDATE SET document = EXCLUDED.document',
+                    rows,
+                )
+
+    @classmethod
+    def rebuild(cls, queryset=None, using=DEFAULT_DB_ALIAS, batch_size=500) -> int:
+        """Vide puis reconstruit l'index. Retourne le nombre d'ingrédients indexés."""
+        if queryset is None:
+            queryset = Ingredient.objects.all()
+        connection = connections[using]
+        if connection.vendor not in cls.VENDORS:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+        queryset = queryset.using(using).only('pk', *INDEXED_FIELDS).order_by('pk')
+        count, batch = 0, []
+        for ingredient in queryset.iterator(chunk_size=batch_size):
+            batch.append(ingredient)
+            if len(batch) >= batch_size:
+                cls.update(batch, using)
+                count, batch = count + len(batch), []
+        cls.update(batch, using)
+        return count + len(batch)
+
+    @classmethod
+    def search(cls, query: str, limit=None, using=DEFAULT_DB_ALIAS):
+        """
+        Ids des ingrédients contenant tous les termes de la requête (voir
+        query_terms), du plus pertinent au moins pertinent.
+        None si la base n'a pas d'index plein texte.
+        """
+        connection = connections[using]
+        if connection.vendor not in cls.VENDORS:
+            return None
+        terms = query_terms(query)
+        if not terms:
+            return []
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                sql = (f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+                       f'ORDER BY bm25({TABLE}, {", ".join(map(str, BM25_WEIGHTS))}), rowid')
+                params = [cls._fts5_query(terms)]
+            else:
+                sql = (f"SELECT ingredient_id FROM {TABLE}, to_tsquery('simple', %s) query "
+                       f'WHERE document @@ query ORDER BY ts_rank(document, query) DESC, ingredient_id')
+                params = [cls._tsquery(terms)]
+            if limit:
+                sql, params = f'{sql} LIMIT %s', params + [limit]
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    @classmethod
+    def filter(cls, queryset, query: str):
+        """
+        Ingrédients du queryset correspondant à la requête, annotés de
+        'search_rank' (plus petit = plus pertinent), sans limite de nombre :
+        la pagination découpe et compte le résultat en SQL.
+        None si la base n'a pas d'index plein texte.
+        """
+        connection = connections[queryset.db]
+        if connection.vendor not in cls.VENDORS:
+            return None
+        terms = query_terms(query)
+        if not terms:
+            return queryset.none()
+        qn = connection.ops.quote_name
+        outer_pk = f'{qn(queryset.model._meta.db_table)}.{qn(queryset.model._meta.pk.column)}'
+        if connection.vendor == 'sqlite':
+            match = [cls._fts5_query(terms)]
+            ids = RawSQL(f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', match)
+            rank = RawSQL(
+                f'SELECT bm25({TABLE}, {", ".join(map(str, BM25_WEIGHTS))}) FROM {TABLE} '
+                f'WHERE {TABLE} MATCH %s AND rowid = {outer_pk}', match,
+            )
+        else:
+            match = [cls._tsquery(terms)]
+            ids = RawSQL(f"SELECT ingredient_id FROM {TABLE} WHERE document @@ to_tsquery('simple', %s)", match)
+            rank = RawSQL(
+                f"SELECT -ts_rank(document, to_tsquery('simple', %s)) FROM {TABLE} "
+                f'WHERE ingredient_id = {outer_pk}', match,
+            )
+        return queryset.filter(pk__in=ids).annotate(search_rank=rank).order_by('search_rank', 'pk')
+
+    @staticmethod
+    def _fts5_query(terms):
+        # Termes limités à [a-z0-9] : aucun échappement nécessaire dans la syntaxe FTS5
+        return ' AND '.join(
+            f'("{term}" OR "{prefix}"*)' if prefix else f'"{term}"' for term, prefix in terms
+        )
+
+    @staticmethod
+    def _tsquery(terms):
+        return ' & '.join(f'({term} | {prefix}:*)' if prefix else term for term, prefix in terms)
+
+
+class IngredientSearchFilter(filters.SearchFilter):
+    """
+    ?search= servi par l'index plein texte, résultats triés par pertinence.
+    Requête sans terme indexable (ex. "de", que des mots vides) : SearchFilter
+    de DRF (icontains), comme sur une base sans index.
+    """
+
+    @staticmethod
+    def uses_index(query, using=DEFAULT_DB_ALIAS) -> bool:
+        return bool(query_terms(query)) and IngredientSearchIndex.supported(using)
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not self.uses_index(query, queryset.db):
+            return super().filter_queryset(request, queryset, view)
+        return IngredientSearchIndex.filter(queryset, query)
+
+
+class RelevanceOrderingFilter(filters.OrderingFilter):
+    """Sans ?ordering= explicite, une recherche garde l'ordre de pertinence (pas l'ordre par défaut)."""
+
+    def get_ordering(self, request, queryset, view):
+        query = request.query_params.get(IngredientSearchFilter.search_param, '')
+        if self.ordering_param not in request.query_params \
+                and IngredientSearchFilter.uses_index(query, queryset.db):
+            return None
+        return super().get_ordering(request, queryset, view)
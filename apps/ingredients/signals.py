@@ -0,0 +1,14 @@
+# C:\Foodypedia\apps\ingredients\signals.py
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Ingredient
+from .search import INDEXED_FIELDS, IngredientSearchIndex
+
+
+@receiver(post_save, sender=Ingredient)
+def index_ingredient(sender, instance, using, update_fields=None, raw=False, **kwargs):
+    """Réindexe l'ingrédient enregistré (la suppression est propagée par la base)."""
+    if raw or (update_fields is not None and not INDEXED_FIELDS.intersection(update_fields)):
+        return
+    IngredientSearchIndex.update([instance], using=using)
@@ -0,0 +1,141 @@
+# C:\Foodypedia\apps\ingredients\storage.py
+
+"""
+Stockage adressé par contenu des photos (ingrédients, galerie, catégories).
+
+Le nom d'un fichier est dérivé du SHA-256 de ses octets : 'cas/ab/abcdef....jpg'.
+Une même image n'est donc écrite qu'une fois dans MEDIA_ROOT, quel que soit le
+nombre d'ingrédients ou de catégories qui la référencent. Les commandes d'import
+passent par store_image()/attach_image() : si l'empreinte existe déjà, rien
+n'est copié ; sinon le fichier source est copié une fois, haché pendant la
+copie. Jamais de lien dur vers la source (une photo retouchée sur place
+changerait l'objet sans changer son nom) : un lien dur n'est créé qu'entre
+objets du stockage (même contenu, autre extension).
+"""
+
+import hashlib
+import os
+import threading
+from functools import lru_cache
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    PREFIX = 'cas'
+
+    def name_for(self, digest, ext=''):
+        return f'{self.PREFIX}/{digest[:2]}/{digest}{ext.lower()}'
+
+    def _save(self, name, content):
+        # Le nom proposé (upload_to + nom d'origine) ne sert qu'à l'extension
+        digest = hash_content(content)
+        target = self.name_for(digest, os.path.splitext(name)[1])
+        if self.exists(target):
+            return target
+        content.seek(0)
+        return super()._save(target, content)
+
+    def store_path(self, path):
+        """
+        Enregistre un fichier local et retourne son nom de stockage,
+        sans relire ni copier le fichier si son empreinte est déjà présente.
+        """
+        ext = os.path.splitext(path)[1]
+        digest = hash_file(path)
+        target = self.name_for(digest, ext)
+        if self.exists(target):
+            return target
+
+        tmp_path = self._tmp_path()
+        sibling = self._existing_object(digest)
+        if sibling and getattr(settings, 'INGREDIENT_MEDIA_HARDLINKS', True):
+            try:
+                os.link(sibling, tmp_path)
+                os.replace(tmp_path, self.path(target))
+                return target
+            except OSError:
+                # Système de fichiers sans liens durs : copie de la source
+                pass
+
+        # Empreinte recalculée sur les octets copiés : le nom correspond
+        # toujours au contenu stocké, même si la source change entre-temps
+        sha = hashlib.sha256()
+        with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                sha.update(chunk)
+                dst.write(chunk)
+        target = self.name_for(sha.hexdigest(), ext)
+        full_path = self.path(target)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.replace(tmp_path, full_path)
+        return target
+
+    def _tmp_path(self):
+        # Dans le stockage : même volume que la cible (os.replace atomique)
+        tmp_dir = self.path(self.PREFIX)
+        os.makedirs(tmp_dir, exist_ok=True)
+        return os.path.join(tmp_dir, f'.{os.getpid()}.{threading.get_ident()}.tmp')
+
+    def _existing_object(self, digest):
+        """Chemin d'un objet déjà stocké pour cette empreinte (autre extension), ou None."""
+        folder = self.path(f'{self.PREFIX}/{digest[:2]}')
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            return None
+        for name in names:
+            if os.path.splitext(name)[0] == digest:
+                return os.path.join(folder, name)
+        return None
+
+
+def hash_content(content):
+    sha = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(CHUNK_SIZE):
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+def hash_file(path):
+    stat = os.stat(path)
+    return _hash_file(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=4096)
+def _hash_file(path, size, mtime_ns):
+    # Taille et mtime dans la clé : un fichier modifié est re-hashé
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+_image_storage = ContentAddressedStorage()
+
+
+def image_storage():
+    """Stockage des ImageField ingrédients (callable référencé par les migrations)."""
+    return _image_storage
+
+
+def store_image(path):
+    return _image_storage.store_path(path)
+
+
+def attach_image(instance, field_name, path, save=True):
+    """
+    Associe le fichier 'path' au champ image 'field_name'.
+    Retourne False (sans écriture) si le champ référence déjà ce contenu.
+    """
+    name = store_image(path)
+    if getattr(instance, field_name).name == name:
+        return False
+    setattr(instance, field_name, name)
+    if save:
+        instance.save(update_fields=[field_name])
+    return True
@@ -0,0 +1,553 @@
+# C:\Foodypedia\apps\ingredients\tests.py
+
+import json
+import os
+import tempfile
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.atlas.models import Pays, Glossaire
+from .models import (
+    Ingredient, IngredientCategory, FunctionalCategory,
+    IngredientFamily, Label, CulinaryUse, IngredientImage
+)
+from .search import COLUMNS, IngredientSearchIndex, analyse
+
+
+class IngredientQueryBudgetTestCase(TestCase):
+    """
+    Tests de non-régression sur le nombre de requêtes SQL de l'API Ingrédients.
+    Le coût doit rester constant, quelle que soit la taille de la page.
+    """
+
+    def setUp(self):
+        self.client_public = APIClient()
+        self.url_list = '/api/v1/ingredients/ingredients/'
+
+        category = IngredientCategory.objects.create(name='Épices', slug='epices')
+        family = IngredientFamily.objects.create(name='Apiacées')
+        glossaire = Glossaire.objects.create(terme='Anis', definition='Plante aromatique', type_terme='N')
+        fonctionnelles = [
+            FunctionalCategory.objects.create(name='Pâtisserie', slug='patisserie'),
+            FunctionalCategory.objects.create(name='Aromatique', slug='aromatique'),
+        ]
+        labels = [Label.objects.create(name='Bio'), Label.objects.create(name='AOP')]
+        usages = [CulinaryUse.objects.create(name='Infusion'), CulinaryUse.objects.create(name='Marinade')]
+        pays = [
+            Pays.objects.create(nom_fr='France', continent='Europe'),
+            Pays.objects.create(nom_fr='Inde', continent='Asie'),
+        ]
+
+        for i in range(20):
+            ingredient = Ingredient.objects.create(
+                name=f'Ingrédient {i:02d}',
+                slug=f'ingredient-{i:02d}',
+                description='Description',
+                category=category,
+                family=family,
+                glossary_term=glossaire,
+            )
+            ingredient.functional_categories.set(fonctionnelles)
+            ingredient.labels.set(labels)
+            ingredient.culinary_uses.set(usages)
+            ingredient.origins_countries.set(pays)
+
+    def test_list_query_budget(self):
+        """Test: Une page de 20 ingrédients coûte un nombre fixe de requêtes."""
+        # COUNT + SELECT principal (JOIN FK) + 5 prefetch (4 M2M + galerie)
+        with self.assertNumQueries(7):
+            response = self.client_public.get(self.url_list)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 20)
+
+        first = response.data['results'][0]
+        self.assertEqual(first['category']['slug'], 'epices')
+        self.assertEqual(first['family']['name'], 'Apiacées')
+        self.assertEqual(len(first['functional_categories']), 2)
+        self.assertEqual(len(first['labels']), 2)
+        self.assertEqual(len(first['culinary_uses']), 2)
+        self.assertEqual(len(first['origins_countries_details']), 2)
+
+    def test_detail_query_budget(self):
+        """Test: Le détail d'un ingrédient ne dépend pas du nombre de relations."""
+        # SELECT principal (JOIN FK) + 5 prefetch
+        with self.assertNumQueries(6):
+            response = self.client_public.get(f'{self.url_list}ingredient-00/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['glossary_term_details']['terme'], 'Anis')
+
+    def test_by_category_query_budget(self):
+        """Test: Le regroupement par catégorie ne fait pas une requête par catégorie."""
+        IngredientCategory.objects.create(name='Légumes', slug='legumes')
+        # Catégories + ingrédients + 5 prefetch
+        with self.assertNumQueries(7):
+            response = self.client_public.get(f'{self.url_list}by_category/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['Épices']), 20)
+        self.assertEqual(response.data['Légumes'], [])
+
+
+class BulkIngredientImporterTestCase(TestCase):
+    """
+    Tests du moteur d'import groupé (batch_import_ingredients).
+    """
+
+    def _items(self, count, **extra):
+        return [
+            {
+                'name': f'Piment {i:03d}',
+                'category': 'epices',
+                'glossary_term': 'Capsaïcine',
+                'functional_categories': ['relevant', 'condiment'],
+                'description': 'Piment',
+                **extra,
+            }
+            for i in range(count)
+        ]
+
+    def test_import_creates_references_and_links(self):
+        """Test: Catégories, glossaire et M2M sont créés en bloc."""
+        from .importers import BulkIngredientImporter
+        report = BulkIngredientImporter().import_items(self._items(30) + [{'name': 'Sans catégorie'}])
+
+        self.assertEqual(len(report['created']), 30)
+        self.assertEqual(report['skipped'], ['Sans catégorie'])
+        self.assertEqual(Ingredient.objects.count(), 30)
+        self.assertEqual(IngredientCategory.objects.get(slug='epices').name, 'Epices')
+        self.assertEqual(Glossaire.objects.filter(terme='Capsaïcine').count(), 1)
+
+        piment = Ingredient.objects.get(name='Piment 007')
+        self.assertEqual(piment.slug, 'piment-007')
+        self.assertEqual(
+            sorted(piment.functional_categories.values_list('slug', flat=True)),
+            ['condiment', 'relevant'],
+        )
+
+    def test_reimport_updates_with_constant_query_count(self):
+        """Test: Un ré-import met à jour sans dépendre du nombre d'items."""
+        from .importers import BulkIngredientImporter
+        importer = BulkIngredientImporter()
+        importer.import_items(self._items(5))
+        created_at = Ingredient.objects.get(name='Piment 000').created_at
+
+        # SAVEPOINT/RELEASE + 3 résolutions + existants + upsert + relecture
+        # + index plein texte (DELETE et INSERT groupés) + M2M
+        with self.assertNumQueries(11):
+            report = importer.import_items(self._items(30, description='Nouveau'))
+        self.assertEqual(len(report['updated']), 5)
+        self.assertEqual(len(report['created']), 25)
+
+        piment = Ingredient.objects.get(name='Piment 000')
+        self.assertEqual(piment.description, 'Nouveau')
+        self.assertEqual(piment.created_at, created_at)
+        self.assertEqual(piment.functional_categories.count(), 2)
+
+    def test_duplicate_slugs_are_rejected(self):
+        """Test: Un slug déjà pris (en base ou dans le lot) rejette la ligne au lieu d'une IntegrityError."""
+        from .importers import BulkIngredientImporter
+        importer = BulkIngredientImporter()
+        importer.import_items(self._items(1))
+        report = importer.import_items(
+            self._items(2) + [{'name': 'PIMENT 000', 'category': 'epices'},
+                              {'name': 'Sel', 'category': 'epices'}, {'name': 'SEL', 'category': 'epices'}]
+        )
+
+        self.assertEqual(report['rejected'], ['PIMENT 000', 'SEL'])
+        self.assertEqual(report['updated'], ['Piment 000'])
+        self.assertEqual(report['created'], ['Piment 001', 'Sel'])
+        self.assertEqual(Ingredient.objects.get(slug='piment-000').name, 'Piment 000')
+        self.assertFalse(Ingredient.objects.filter(name__in=['PIMENT 000', 'SEL']).exists())
+
+
+class ImageIndexTestCase(SimpleTestCase):
+    """
+    Tests de l'index des photos partagé par les commandes d'import.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = os.path.join(self.tmp.name, 'pics')
+        os.makedirs(os.path.join(self.root, 'fruits'))
+        for rel_path in ('Curry.jpg', os.path.join('fruits', 'Pomme.PNG'), 'notes.txt'):
+            open(os.path.join(self.root, rel_path), 'wb').close()
+        self.cache_path = os.path.join(self.tmp.name, 'cache', 'index.json')
+
+    def test_find_exact_case_and_extension(self):
+        """Test: Nom exact, casse différente, puis autre extension d'image."""
+        from .images import ImageIndex
+        index = ImageIndex.load(self.root, cache_path='')
+        pomme = os.path.join(self.root, 'fruits', 'Pomme.PNG')
+
+        self.assertEqual(index.find('Curry.jpg'), os.path.join(self.root, 'Curry.jpg'))
+        self.assertEqual(index.find('pomme.png'), pomme)
+        self.assertEqual(index.find('Pomme.jpg'), pomme)
+        self.assertIsNone(index.find('Poire.jpg'))
+        self.assertEqual(len(list(index)), 2)
+
+    def test_cache_skips_rescan_until_tree_changes(self):
+        """Test: L'index persisté évite le parcours tant qu'aucun dossier n'a changé."""
+        from .images import ImageIndex
+        ImageIndex.load(self.root, cache_path=self.cache_path)
+
+        with mock.patch('apps.ingredients.images.os.walk') as walk:
+            index = ImageIndex.load(self.root, cache_path=self.cache_path)
+        walk.assert_not_called()
+        self.assertIsNotNone(index.find('curry.jpg'))
+
+        # Un nouveau fichier modifie le mtime du dossier : nouveau parcours
+        new_file = os.path.join(self.root, 'fruits', 'Poire.jpg')
+        open(new_file, 'wb').close()
+        os.utime(os.path.join(self.root, 'fruits'), ns=(0, 0))
+        index = ImageIndex.load(self.root, cache_path=self.cache_path)
+        self.assertEqual(index.find('poire.JPG'), new_file)
+
+    def test_other_root_does_not_overwrite_default_cache(self):
+        """Test: Un dossier autre que celui par défaut a son propre fichier de cache."""
+        from .images import ImageIndex
+        other = os.path.join(self.tmp.name, 'autres')
+        os.makedirs(other)
+        with self.settings(INGREDIENT_PICS_DIR=self.root, INGREDIENT_PICS_INDEX_CACHE=self.cache_path):
+            ImageIndex.load()
+            ImageIndex.load(other)
+            self.assertNotEqual(ImageIndex.cache_path_for(other), self.cache_path)
+            self.assertTrue(os.path.exists(ImageIndex.cache_path_for(other)))
+            with mock.patch('apps.ingredients.images.os.walk') as walk:
+                index = ImageIndex.load()
+        walk.assert_not_called()
+        self.assertIsNotNone(index.find('curry.jpg'))
+
+
+class ContentAddressedStorageTestCase(TestCase):
+    """
+    Tests du stockage des photos adressé par contenu.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        media_override = override_settings(MEDIA_ROOT=os.path.join(self.tmp.name, 'media'))
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.source = os.path.join(self.tmp.name, 'Curry.jpg')
+        with open(self.source, 'wb') as f:
+            f.write(b'curry-bytes')
+        self.category = IngredientCategory.objects.create(name='Épices', slug='epices')
+
+    def _stored_files(self):
+        return [name for _, _, names in os.walk(os.path.join(self.tmp.name, 'media')) for name in names]
+
+    def test_same_content_is_stored_once(self):
+        """Test: Ingrédients, galerie et catégorie partagent un seul fichier."""
+        from .storage import attach_image
+        curry = Ingredient.objects.create(name='Curry', slug='curry', description='-', category=self.category)
+        masala = Ingredient.objects.create(name='Masala', slug='masala', description='-', category=self.category)
+
+        self.assertTrue(attach_image(curry, 'main_image', self.source))
+        self.assertTrue(attach_image(masala, 'main_image', self.source))
+        self.assertTrue(attach_image(self.category, 'image', self.source))
+        # Déjà référencé : aucune écriture
+        self.assertFalse(attach_image(curry, 'main_image', self.source))
+
+        # L'API FieldFile.save classique est aussi dédupliquée
+        gallery = IngredientImage(ingredient=curry, caption='Poudre')
+        gallery.image.save('poudre.jpg', ContentFile(b'curry-bytes'), save=True)
+
+        curry.refresh_from_db()
+        self.assertTrue(curry.main_image.name.startswith('cas/'))
+        self.assertEqual(curry.main_image.name, masala.main_image.name)
+        self.assertEqual(self.category.image.name, curry.main_image.name)
+        self.assertEqual(gallery.image.name, curry.main_image.name)
+        self.assertEqual(len(self._stored_files()), 1)
+        with curry.main_image.open('rb') as f:
+            self.assertEqual(f.read(), b'curry-bytes')
+
+    @override_settings(INGREDIENT_MEDIA_HARDLINKS=True)
+    def test_source_edited_in_place_does_not_change_stored_object(self):
+        """Test: L'objet stocké est une copie de la source ; liens durs seulement entre objets stockés."""
+        from .storage import image_storage, store_image
+        name = store_image(self.source)
+        stored_path = image_storage().path(name)
+        self.assertNotEqual(os.stat(stored_path).st_ino, os.stat(self.source).st_ino)
+
+        with open(self.source, 'r+b') as f:
+            f.write(b'CURRY')
+        with open(stored_path, 'rb') as f:
+            self.assertEqual(f.read(), b'curry-bytes')
+
+        # Même contenu, autre extension : lien dur vers l'objet existant
+        png = os.path.join(self.tmp.name, 'Curry.png')
+        with open(png, 'wb') as f:
+            f.write(b'curry-bytes')
+        png_name = store_image(png)
+        self.assertEqual(os.path.splitext(png_name)[0], os.path.splitext(name)[0])
+        self.assertEqual(os.stat(image_storage().path(png_name)).st_ino, os.stat(stored_path).st_ino)
+
+
+class RefreshIngredientsFixtureMixin:
+    """Dossiers JSON / photos / media temporaires pour refresh_ingredients."""
+
+    def setUp(self):
+        from PIL import Image
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.pics = os.path.join(self.tmp.name, 'pics')
+        self.json_dir = os.path.join(self.tmp.name, 'json')
+        os.makedirs(self.pics)
+        os.makedirs(self.json_dir)
+        settings_override = override_settings(
+            MEDIA_ROOT=os.path.join(self.tmp.name, 'media'),
+            INGREDIENT_PICS_DIR=self.pics,
+            INGREDIENT_PICS_INDEX_CACHE='',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        for name, color in (('Pomme.png', 'red'), ('Poire.png', 'green')):
+            Image.new('RGB', (4, 4), color).save(os.path.join(self.pics, name))
+        with open(os.path.join(self.pics, 'Casse.jpg'), 'wb') as f:
+            f.write(b'pas une image')
+
+        with open(os.path.join(self.json_dir, 'Fruits.json'), 'w', encoding='utf-8') as f:
+            json.dump([
+                {'name': 'Pomme', 'image_filename': 'pomme.jpg', 'variant_images': ['Poire.png']},
+                {'name': 'Poire', 'image_filename': 'Poire.png'},
+                {'name': 'Coing', 'image_filename': 'Casse.jpg'},
+                {'name': 'Nèfle', 'image_filename': 'Absente.jpg'},
+            ], f)
+
+
+class RefreshIngredientsImageStageTestCase(RefreshIngredientsFixtureMixin, TestCase):
+    """
+    Tests de l'étape d'ingestion parallèle des images de refresh_ingredients.
+    """
+
+    def test_images_are_ingested_and_attached_in_bulk(self):
+        """Test: Images validées, stockées une fois et rattachées après l'import."""
+        out = StringIO()
+        call_command('refresh_ingredients', json_dir=self.json_dir, image_workers=4, stdout=out)
+
+        pomme = Ingredient.objects.get(name='Pomme')
+        poire = Ingredient.objects.get(name='Poire')
+        self.assertTrue(pomme.main_image.name.startswith('cas/'))
+        self.assertEqual(pomme.images.get().image.name, poire.main_image.name)
+        self.assertFalse(Ingredient.objects.get(name='Coing').main_image)
+        self.assertFalse(Ingredient.objects.get(name='Nèfle').main_image)
+        self.assertEqual(IngredientCategory.objects.get(slug='fruits').image.name, pomme.main_image.name)
+        self.assertIn('Image invalide Casse.jpg', out.getvalue())
+        self.assertIn('1 introuvables, 1 invalides', out.getvalue())
+
+
+class RefreshIngredientsSyncTestCase(RefreshIngredientsFixtureMixin, TestCase):
+    """
+    Tests du refresh différentiel (empreintes, une transaction, PK conservées).
+    """
+
+    def _write(self, items):
+        with open(os.path.join(self.json_dir, 'Fruits.json'), 'w', encoding='utf-8') as f:
+            json.dump(items, f)
+
+    def test_second_refresh_only_applies_the_diff(self):
+        """Test: Seuls les items modifiés, ajoutés ou retirés sont écrits."""
+        self._write([
+            {'name': 'Pomme', 'image_filename': 'Pomme.png', 'functional_categories': ['Dessert']},
+            {'name': 'Poire', 'description': 'Juteuse', 'variant_images': ['Poire.png']},
+            {'name': 'Coing', 'description': 'Âpre'},
+        ])
+        call_command('refresh_ingredients', json_dir=self.json_dir, stdout=StringIO())
+        before = {i.name: i for i in Ingredient.objects.all()}
+
+        self._write([
+            {'name': 'Pomme', 'image_filename': 'Pomme.png', 'functional_categories': ['Dessert']},
+            {'name': 'Poire', 'description': 'Fondante', 'variant_images': ['Poire.png']},
+            {'name': 'Nèfle', 'description': 'Rare'},
+        ])
+        out = StringIO()
+        call_command('refresh_ingredients', json_dir=self.json_dir, stdout=out)
+        self.assertIn('1 créés, 1 mis à jour, 1 inchangés, 1 supprimés', out.getvalue())
+
+        pomme = Ingredient.objects.get(name='Pomme')
+        self.assertEqual(pomme.pk, before['Pomme'].pk)
+        self.assertEqual(pomme.updated_at, before['Pomme'].updated_at)
+        self.assertEqual(list(pomme.functional_categories.values_list('slug', flat=True)), ['dessert'])
+
+        poire = Ingredient.objects.get(name='Poire')
+        self.assertEqual(poire.pk, before['Poire'].pk)
+        self.assertEqual(poire.description, 'Fondante')
+        self.assertEqual(poire.images.count(), 1)
+
+        self.assertFalse(Ingredient.objects.filter(name='Coing').exists())
+        self.assertTrue(Ingredient.objects.filter(name='Nèfle').exists())
+        self.assertEqual(IngredientCategory.objects.get(slug='fruits').image.name, pomme.main_image.name)
+
+    def test_catalogue_is_streamed_in_batches(self):
+        """Test: Les entrées sont consommées au fil de l'eau et écrites par lots bornés."""
+        from .importers import CatalogueSync
+        consumed, ingested = [], []
+
+        def entries():
+            for i in range(5):
+                consumed.append(i)
+                yield {'name': f'Fruit {i}', 'slug': f'fruit-{i}', 'category_slug': 'fruits',
+                       'category_name': 'Fruits', 'item': {'description': str(i)}}
+
+        def ingest_images(filenames):
+            ingested.append(len(consumed))
+            return {}
+
+        with mock.patch.object(CatalogueSync, 'BATCH_SIZE', 2):
+            report = CatalogueSync().sync(
+                entries(), wanted={f'Fruit {i}' for i in range(5)}, ingest_images=ingest_images,
+            )
+        self.assertEqual(ingested, [2, 4, 5])
+        self.assertEqual(report['created'], 5)
+        self.assertEqual(Ingredient.objects.filter(category__slug='fruits').count(), 5)
+
+    def test_invalid_file_is_skipped_entirely(self):
+        """Test: Un fichier invalide au milieu est ignoré en entier (aucun de ses items écrit)."""
+        with open(os.path.join(self.json_dir, 'Legumes.json'), 'w', encoding='utf-8') as f:
+            f.write('[{"name": "Carotte"}, {"name": "Navet"} {"name": "Poireau"}]')
+        out = StringIO()
+        call_command('refresh_ingredients', json_dir=self.json_dir, stdout=out)
+
+        self.assertIn('Format invalide pour Legumes.json', out.getvalue())
+        self.assertFalse(Ingredient.objects.filter(name='Carotte').exists())
+        self.assertTrue(Ingredient.objects.filter(name='Pomme').exists())
+
+    def test_missing_image_is_retried_and_existing_image_kept(self):
+        """Test: Une photo absente est recherchée aux refresh suivants ; une photo posée ailleurs est conservée."""
+        from PIL import Image
+        self._write([
+            {'name': 'Nèfle', 'image_filename': 'Nefle.png'},
+            {'name': 'Poire', 'description': 'Juteuse'},
+        ])
+        call_command('refresh_ingredients', json_dir=self.json_dir, stdout=StringIO())
+        self.assertFalse(Ingredient.objects.get(name='Nèfle').main_image)
+        # Photo posée par une autre commande (import_images)
+        poire = Ingredient.objects.get(name='Poire')
+        poire.main_image = 'cas/autre.png'
+        poire.save()
+
+        Image.new('RGB', (4, 4), 'brown').save(os.path.join(self.pics, 'Nefle.png'))
+        self._write([
+            {'name': 'Nèfle', 'image_filename': 'Nefle.png'},
+            {'name': 'Poire', 'description': 'Fondante'},
+        ])
+        out = StringIO()
+        call_command('refresh_ingredients', json_dir=self.json_dir, stdout=out)
+
+        self.assertIn('0 créés, 2 mis à jour', out.getvalue())
+        self.assertTrue(Ingredient.objects.get(name='Nèfle').main_image.name.startswith('cas/'))
+        poire = Ingredient.objects.get(name='Poire')
+        self.assertEqual(poire.description, 'Fondante')
+        self.assertEqual(poire.main_image.name, 'cas/autre.png')
+
+
+class IngredientSearchTestCase(TestCase):
+    """Tests de l'index plein texte (?search=) : repli des accents, racinisation, pertinence."""
+
+    def setUp(self):
+        self.client_public = APIClient()
+        self.url_list = '/api/v1/ingredients/ingredients/'
+        self.category = IngredientCategory.objects.create(name='Épices', slug='epices')
+        self.poivre = Ingredient.objects.create(
+            name='Poivre noir', slug='poivre-noir', category=self.category,
+            description='Baie séchée du poivrier.', flavor_profile='Piquant, boisé',
+        )
+        self.cannelle = Ingredient.objects.create(
+            name='Cannelle', slug='cannelle', category=self.category,
+            description='Écorce épicée, se marie avec le poivre.', storage_guide='À l\'abri de la lumière',
+        )
+
+    def search(self, query, **params):
+        response = self.client_public.get(self.url_list, {'search': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in response.data['results']]
+
+    def test_analyse_folds_accents_and_stems(self):
+        """Test: 'Épices', 'épicée' et 'epice' donnent le même terme."""
+        self.assertEqual(analyse('Épices'), analyse('épicée'))
+        self.assertEqual(analyse('Épices'), analyse('epice'))
+        self.assertEqual(analyse("À l'abri des gâteaux"), ['abri', 'gateau'])
+
+    def test_search_ranks_name_before_body(self):
+        """Test: Un terme présent dans le nom passe avant le même terme dans la description."""
+        self.assertEqual(self.search('poivres'), ['Poivre noir', 'Cannelle'])
+        self.assertEqual(self.search('EPICE'), ['Cannelle'])
+        self.assertEqual(self.search('lumiere'), ['Cannelle'])
+        self.assertEqual(self.search('poiv'), ['Poivre noir', 'Cannelle'])  # préfixe
+        # ?ordering= explicite l'emporte sur la pertinence
+        self.assertEqual(self.search('poivre', ordering='name'), ['Cannelle', 'Poivre noir'])
+
+    def test_search_is_paginated_not_truncated(self):
+        """Test: Le nombre de résultats et les pages suivantes couvrent toutes les correspondances."""
+        Ingredient.objects.bulk_create([
+            Ingredient(name=f'Mélange {i:03d}', slug=f'melange-{i:03d}', category=self.category,
+                       description='Avec du poivre.')
+            for i in range(250)
+        ])
+        IngredientSearchIndex.rebuild()
+        response = self.client_public.get(self.url_list, {'search': 'poivre', 'page': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 252)
+        first = self.client_public.get(self.url_list, {'search': 'poivre'}).data['results']
+        self.assertEqual(first[0]['name'], 'Poivre noir')
+
+    def test_prefix_only_on_unfinished_last_word(self):
+        """Test: Racines cherchées à l'identique ; préfixe seulement sur le mot en cours de saisie."""
+        for name in ('Lait', 'Laitue', 'Pâtes', 'Pâtisserie', 'Patate'):
+            Ingredient.objects.create(name=name, slug=name.lower(), category=self.category, description='-')
+        self.assertEqual(self.search('lait '), ['Lait'])
+        self.assertEqual(self.search('lai'), ['Lait', 'Laitue'])
+        self.assertEqual(self.search('pâtes'), ['Pâtes'])
+        self.assertEqual(self.search('poivre noi'), ['Poivre noir'])
+
+    def test_stopword_only_query_falls_back_to_icontains(self):
+        """Test: Une requête sans terme indexable ("de") repasse par le SearchFilter (icontains)."""
+        Ingredient.objects.create(name='Fleur de sel', slug='fleur-de-sel', category=self.category)
+        self.assertEqual(self.search('de'), ['Fleur de sel'])
+
+    def test_migration_fills_index_with_live_normalisation(self):
+        """Test: La migration 0007 remplit l'index comme search.py (copie figée à jour)."""
+        from django.apps import apps as django_apps
+        from django.db import connection
+        migration = import_module('apps.ingredients.migrations.0007_populate_ingredient_search_index')
+        self.assertEqual(migration.COLUMNS, COLUMNS)
+        for text in ("Épices douces, gâteaux et bocaux", "Beurre œufs PÂTISSIÈRE", ['Sucré', 'été']):
+            self.assertEqual(migration.analyse(text), analyse(text))
+
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM ingredients_search')
+        self.assertEqual(self.search('poivre'), [])
+        # Seul schema_editor.connection est utilisé (pas d'éditeur SQLite dans une transaction)
+        migration.populate_index(django_apps, mock.Mock(connection=connection))
+        self.assertEqual(self.search('poivre'), ['Poivre noir', 'Cannelle'])
+
+    def test_index_follows_saves_and_deletes(self):
+        """Test: L'index suit save(), la suppression et l'import groupé."""
+        self.cannelle.description = 'Écorce douce.'
+        self.cannelle.save()
+        self.assertEqual(self.search('poivre'), ['Poivre noir'])
+
+        self.poivre.delete()
+        self.assertEqual(self.search('poivre'), [])
+
+        from .importers import BulkIngredientImporter
+        BulkIngredientImporter().import_items([
+            {'name': 'Cardamome', 'category': 'Épices', 'prep_guide': 'Concasser'},
+        ])
+        self.assertEqual(self.search('concassée'), ['Cardamome'])
+
+    def test_rebuild_command(self):
+        """Test: La reconstruction réindexe tous les ingrédients."""
+        IngredientSearchIndex.rebuild()
+        out = StringIO()
+        call_command('rebuild_ingredient_search', stdout=out)
+        self.assertIn('2 ingrédients indexés', out.getvalue())
+        self.assertEqual(IngredientSearchIndex.search('cannelle'), [self.cannelle.pk])
@@ -1,6 +1,7 @@
 from rest_framework import viewsets, filters, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db.models import Prefetch
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import (
@@ -12,6 +13,7 @@ from .serializers import (
     FunctionalCategorySerializer, IngredientFamilySerializer, 
     LabelSerializer, CulinaryUseSerializer
 )
+from .search import IngredientSearchFilter, RelevanceOrderingFilter
 
 # -------------------------------------------------------------------------
 # ViewSets pour les Référentiels (Read-Only ou Admin Management)
@@ -58,13 +60,25 @@ class IngredientViewSet(viewsets.ModelViewSet):
     Supporte filtres avancés :
     - ?category=Epice
     - ?functional_categories=Patisserie
-    - ?search=Anis
+    - ?search=Anis (index plein texte, tri par pertinence sauf ?ordering=)
     """
-    queryset = Ingredient.objects.all()
+    # Plan de chargement aligné sur IngredientSerializer.to_representation :
+    # FK en JOIN, M2M et galerie en prefetch (nombre de requêtes constant par page).
+    queryset = Ingredient.objects.select_related(
+        'category',
+        'family',
+        'glossary_term',
+    ).prefetch_related(
+        'functional_categories',
+        'origins_countries',
+        'labels',
+        'culinary_uses',
+        'images',
+    )
     serializer_class = IngredientSerializer
     lookup_field = 'slug'
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IngredientSearchFilter, RelevanceOrderingFilter]
     
     # Filtres
     filterset_fields = {
@@ -87,7 +101,9 @@ class IngredientViewSet(viewsets.ModelViewSet):
         Retourne les ingrédients groupés par catégorie principale.
         Utile pour les menus déroulants ou l'arborecence.
         """
-        categories = IngredientCategory.objects.all()
+        categories = IngredientCategory.objects.prefetch_related(
+            Prefetch('ingredients', queryset=self.get_queryset())
+        )
         data = {}
         for cat in categories:
             data[cat.name] = IngredientSerializer(
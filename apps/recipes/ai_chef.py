@@ -0,0 +1,129 @@
+# C:\Foodypedia\apps\recipes\ai_chef.py
+
+"""
+Sources ("upstreams") de l'agent IA Chef pour le mode streaming (SSE).
+
+Une source est un générateur asynchrone d'événements (nom, données), dans
+l'ordre où la recette est produite :
+
+    ('title', "Tarte fine")  ('description', "...")  ('step', "Étaler la pâte")...
+
+settings.AI_CHEF_UPSTREAM désigne la source utilisée (chemin pointé) :
+- n8n_recipe_events  : webhook n8n (réponse NDJSON au fil de l'eau, ou JSON complet) ;
+- fake_recipe_events : recette simulée, sans réseau (tests, développement).
+"""
+
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+from apps.core.outbound import OutboundError, get_client
+
+RECIPE_FIELDS = ('title', 'description')
+
+
+class UpstreamError(Exception):
+    """Réponse inexploitable de la source."""
+
+
+def get_upstream():
+    return import_string(settings.AI_CHEF_UPSTREAM)
+
+
+def recipe_to_events(recipe: dict):
+    """Événements d'une recette complète ({"title", "description", "steps"})."""
+    for field in RECIPE_FIELDS:
+        if recipe.get(field):
+            yield field, recipe[field]
+    for step in recipe.get('steps') or []:
+        yield 'step', step
+
+
+def _n8n_events(ingredients):
+    """
+    Générateur synchrone : appel du webhook en flux (client partagé, disjoncteur).
+    Une réponse NDJSON ({"event": "step", "data": ...} par ligne) est relayée
+    ligne par ligne ; une réponse JSON classique est découpée en événements.
+    """
+    response = get_client('n8n').post(
+        settings.N8N_WEBHOOK_URL,
+        json={"ingredients": ingredients, "stream": True},
+        headers={'Accept': 'application/x-ndjson, application/json'},
+        stream=True,
+    )
+    with response:
+        if response.status_code >= 400:
+            raise UpstreamError(f"HTTP {response.status_code}")
+        try:
+            if 'ndjson' in response.headers.get('Content-Type', ''):
+                for line in response.iter_lines():
+                    if line:
+                        message = json.loads(line)
+                        yield message['event'], message.get('data')
+            else:
+                yield from recipe_to_events(response.json())
+        except (ValueError, KeyError, TypeError) as e:
+            raise UpstreamError(f"réponse invalide ({e})")
+
+
+async def n8n_recipe_events(ingredients):
+    # Le client HTTP est synchrone : chaque lecture de ligne part dans un thread,
+    # la boucle d'événements reste libre pendant l'attente de l'agent
+    events = _n8n_events(ingredients)
+    next_event = sync_to_async(next, thread_sensitive=False)
+    try:
+        while True:
+            event = await next_event(events, None)
+            if event is None:
+                return
+            yield event
+    finally:
+        await sync_to_async(events.close, thread_sensitive=False)()
+
+
+async def fake_recipe_events(ingredients, delay=None):
+    """Recette simulée (même contenu que l'ancienne réponse de développement)."""
+    delay = settings.AI_CHEF_FAKE_DELAY if delay is None else delay
+    recipe = {
+        "title": f"Délice aux {len(ingredients)} trésors",
+        "description": f"Une recette unique générée par IA combinant {', '.join(ingredients)}.",
+        "steps": [
+            "Préparer les ingrédients avec soin.",
+            "Faire revenir le tout à feu moyen.",
+            "Dresser magnifiquement et servir."
+        ],
+    }
+    for event in recipe_to_events(recipe):
+        if delay:
+            await asyncio.sleep(delay)
+        yield event
+
+
+def format_sse(event, data):
+    # json.dumps n'émet pas de saut de ligne : une seule ligne 'data:' par événement
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def sse_stream(events):
+    """
+    Relaie les événements d'une source au format Server-Sent Events :
+    title, description, step ({"index", "text"}), puis done (recette complète).
+    Le statut HTTP étant déjà envoyé, une erreur de la source devient un événement 'error'.
+    """
+    # Premier octet immédiat : le client sait que la génération a commencé
+    yield ": generation\n\n"
+    recipe = {}
+    try:
+        async for name, data in events:
+            if name == 'step':
+                recipe.setdefault('steps', []).append(data)
+                yield format_sse('step', {"index": len(recipe['steps']) - 1, "text": data})
+            else:
+                recipe[name] = data
+                yield format_sse(name, data)
+    except (OutboundError, UpstreamError) as e:
+        yield format_sse('error', {"error": f"Erreur de génération: {e}"})
+        return
+    recipe.setdefault('steps', [])
+    yield format_sse('done', recipe)
@@ -0,0 +1,13 @@
+# C:\Foodypedia\apps\recipes\apps.py
+
+from django.apps import AppConfig
+
+
+class RecipesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.recipes'
+    label = 'recipes'
+
+    def ready(self):
+        # Branchement des signaux (invalidation des caches de catégories)
+        from . import signals  # noqa: F401
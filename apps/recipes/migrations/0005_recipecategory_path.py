@@ -0,0 +1,39 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+def build_paths(apps, schema_editor):
+    """Calcule le chemin matérialisé des catégories existantes."""
+    RecipeCategory = apps.get_model('recipes', 'RecipeCategory')
+    parents = dict(RecipeCategory.objects.values_list('id', 'parent_id'))
+    paths = {}
+
+    def resolve(cat_id, seen=()):
+        if cat_id not in paths:
+            parent_id = parents[cat_id]
+            if parent_id is None or parent_id not in parents or parent_id in seen:
+                prefix = '/'
+            else:
+                prefix = resolve(parent_id, seen + (cat_id,))
+            paths[cat_id] = f"{prefix}{cat_id}/"
+        return paths[cat_id]
+
+    categories = [RecipeCategory(id=cat_id, path=resolve(cat_id)) for cat_id in parents]
+    RecipeCategory.objects.bulk_update(categories, ['path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recette_instructions_recette_notes_chef'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipecategory',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255, verbose_name='Chemin (index)'),
+        ),
+        migrations.RunPython(build_paths, migrations.RunPython.noop),
+    ]
@@ -18,6 +18,10 @@ class RecipeCategory(models.Model):
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='subcategories', verbose_name="Catégorie Parente")
     slug = models.SlugField(unique=True)
 
+    # Chemin matérialisé des ancêtres (ex: "/1/5/12/"), maintenu par save().
+    # Les descendants d'une catégorie sont les lignes dont le chemin commence par le sien.
+    path = models.CharField(max_length=255, blank=True, editable=False, db_index=True, verbose_name="Chemin (index)")
+
     class Meta:
         verbose_name = "Catégorie de Recette"
         verbose_name_plural = "Catégories de Recettes"
@@ -28,6 +32,69 @@ class RecipeCategory(models.Model):
             return f"{self.parent.name} > {self.name}"
         return self.name
 
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        if self.pk and self.parent_id:
+            parent_path = RecipeCategory.objects.filter(pk=self.parent_id).values_list('path', flat=True).first() or ''
+            if self.parent_id == self.pk or f"/{self.pk}/" in parent_path:
+                raise ValidationError("Une catégorie ne peut pas être rattachée à l'une de ses sous-catégories.")
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._sync_path()
+
+    def _sync_path(self):
+        """
+        Recalcule le chemin de la catégorie et, s'il a changé (création ou
+        changement de parent), réécrit en une requête celui de tous ses descendants.
+        """
+        from django.db.models import Value
+        from django.db.models.functions import Concat, Substr
+
+        parent_path = ''
+        if self.parent_id:
+            parent_path = RecipeCategory.objects.filter(pk=self.parent_id).values_list('path', flat=True).first() or ''
+        new_path = f"{parent_path or '/'}{self.pk}/"
+
+        old_path = RecipeCategory.objects.filter(pk=self.pk).values_list('path', flat=True).first()
+        if old_path == new_path:
+            self.path = new_path
+            return
+
+        RecipeCategory.objects.filter(pk=self.pk).update(path=new_path)
+        if old_path:
+            RecipeCategory.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1))
+            )
+        self.path = new_path
+
+    @classmethod
+    def rebuild_paths(cls):
+        """
+        Reconstruit tous les chemins depuis la table complète (une lecture, une écriture groupée).
+        A lancer après des écritures qui contournent save() (queryset.update, bulk_create).
+        """
+        rows = {row['id']: row for row in cls.objects.values('id', 'parent_id', 'path')}
+        paths = {}
+
+        def resolve(cat_id, seen=()):
+            if cat_id in paths:
+                return paths[cat_id]
+            parent_id = rows[cat_id]['parent_id']
+            if parent_id is None or parent_id not in rows or parent_id in seen:
+                prefix = '/'
+            else:
+                prefix = resolve(parent_id, seen + (cat_id,))
+            paths[cat_id] = f"{prefix}{cat_id}/"
+            return paths[cat_id]
+
+        to_update = []
+        for cat_id, row in rows.items():
+            if resolve(cat_id) != row['path']:
+                to_update.append(cls(id=cat_id, path=paths[cat_id]))
+        cls.objects.bulk_update(to_update, ['path'], batch_size=500)
+        return len(to_update)
+
 # -----------------------------------------------------
 # 2. TECHNIQUES
 # -----------------------------------------------------
@@ -156,6 +223,10 @@ class QuantiteIngredient(models.Model):
             raise ValidationError("Une ligne de recette doit contenir un Ingrédient OU une Sous-Recette.")
         if self.ingredient and self.sub_recipe:
             raise ValidationError("Impossible de sélectionner à la fois un Ingrédient et une Sous-Recette.")
+        if self.recette_id and self.sub_recipe_id:
+            # Refuse les cycles (A -> B -> A) et l'imbrication excessive
+            from .services import SubRecipeGraph
+            SubRecipeGraph.check_edge(self.recette_id, self.sub_recipe_id)
 
     def __str__(self):
         nom = self.ingredient.name if self.ingredient else f"Recette: {self.sub_recipe.titre}"
@@ -1,8 +1,10 @@
 # C:\Foodypedia\apps\recipes\serializers.py
 
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 from .models import Recette, Technique, QuantiteIngredient, RecipeCategory
 from apps.ingredients.serializers import IngredientSerializer
+from .services import CategoryTreeService, SubRecipeGraph
 
 # -----------------------------------------------------
 # 1. Serializers Utilitaires
@@ -16,10 +18,12 @@ class RecipeCategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'parent', 'subcategories']
 
     def get_subcategories(self, obj):
-        # On ne sérialise les enfants que si l'objet n'est pas déjà un enfant de bas niveau (opti)
-        if obj.subcategories.exists():
-            return RecipeCategorySerializer(obj.subcategories.all(), many=True).data
-        return []
+        # Sous-arbre lu depuis l'arborescence en cache. L'index est lu une fois
+        # par requête et gardé dans le contexte, partagé par toute la liste
+        nodes = self.context.get('category_nodes')
+        if nodes is None:
+            nodes = self.context['category_nodes'] = CategoryTreeService.get_nodes()
+        return CategoryTreeService.get_subcategories(nodes, obj.id)
 
 class TechniqueSerializer(serializers.ModelSerializer):
     class Meta:
@@ -46,6 +50,17 @@ class QuantiteIngredientSerializer(serializers.ModelSerializer):
             'quantite', 'unite', 'note'
         ]
 
+    def validate(self, attrs):
+        # Même garde-fou que QuantiteIngredient.clean : ni cycle, ni imbrication excessive
+        recette = attrs.get('recette', getattr(self.instance, 'recette', None))
+        sub_recipe = attrs.get('sub_recipe', getattr(self.instance, 'sub_recipe', None))
+        if recette and sub_recipe:
+            try:
+                SubRecipeGraph.check_edge(recette.pk, sub_recipe.pk)
+            except DjangoValidationError as exc:
+                raise serializers.ValidationError({'sub_recipe': exc.messages})
+        return attrs
+
 # -----------------------------------------------------
 # 3. Serializer Principal : RECETTE
 # -----------------------------------------------------
@@ -0,0 +1,618 @@
+# C:\Foodypedia\apps\recipes\services.py
+
+import hashlib
+import heapq
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.text import slugify
+from apps.core.models import CacheVersion
+from .models import Ingredient, RecipeCategory, QuantiteIngredient, Recette
+
+
+class CategoryTreeService:
+    """
+    Construit l'arborescence complète des catégories de recettes.
+    Une seule requête SQL pour toute la table, assemblage en mémoire,
+    puis mise en cache jusqu'à la prochaine écriture (voir signals.py).
+    La clé de cache porte la version partagée (CacheVersion) : une écriture
+    faite par un worker est vue par tous, ETag compris.
+    """
+    CACHE_KEY = 'recipes:category_tree'
+    CACHE_TIMEOUT = 24 * 3600
+
+    @classmethod
+    def get_tree(cls):
+        """
+        Retourne un tuple (arbre, etag).
+        En régime établi, une seule requête SQL (version, sur clé primaire).
+        """
+        cached = cls._get_cached()
+        return cached['tree'], cached['etag']
+
+    @classmethod
+    def get_nodes(cls):
+        """
+        Index {id: noeud} de l'arbre en cache (une lecture de version).
+        À lire une fois par requête puis à réutiliser pour chaque catégorie.
+        """
+        return cls._get_cached()['nodes']
+
+    @staticmethod
+    def get_subcategories(nodes, category_id):
+        """Sous-arbre d'une catégorie dans l'index de get_nodes() (liste vide si feuille)."""
+        node = nodes.get(category_id)
+        return node['subcategories'] if node else []
+
+    @classmethod
+    def _get_cached(cls):
+        key = f'{cls.CACHE_KEY}:{CacheVersion.current(cls.CACHE_KEY)}'
+        cached = cache.get(key)
+        if cached is None:
+            tree = cls.build_tree()
+            cached = {
+                'tree': tree,
+                'etag': cls._compute_etag(tree),
+                'nodes': cls._index_nodes(tree),
+            }
+            cache.set(key, cached, cls.CACHE_TIMEOUT)
+        return cached
+
+    @classmethod
+    def invalidate(cls):
+        CacheVersion.bump(cls.CACHE_KEY)
+
+    @staticmethod
+    def build_tree():
+        """
+        Charge toutes les catégories en une requête et les regroupe par parent.
+        Le format est identique à celui de RecipeCategorySerializer.
+        """
+        rows = RecipeCategory.objects.order_by('name', 'id').values('id', 'name', 'slug', 'parent_id')
+
+        children = {}
+        for row in rows:
+            children.setdefault(row['parent_id'], []).append(row)
+
+        def build(parent_id):
+            return [
+                {
+                    'id': row['id'],
+                    'name': row['name'],
+                    'slug': row['slug'],
+                    'parent': row['parent_id'],
+                    'subcategories': build(row['id']),
+                }
+                for row in children.get(parent_id, [])
+            ]
+
+        return build(None)
+
+    @staticmethod
+    def _index_nodes(tree):
+        nodes = {}
+        stack = list(tree)
+        while stack:
+            node = stack.pop()
+            nodes[node['id']] = node
+            stack.extend(node['subcategories'])
+        return nodes
+
+    @staticmethod
+    def _compute_etag(tree):
+        payload = json.dumps(tree, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        return '"%s"' % hashlib.md5(payload).hexdigest()
+
+
+class SubRecipeCycleError(ValidationError):
+    """Une ligne ferait de la recette sa propre sous-recette (directement ou non)."""
+
+
+class SubRecipeGraph:
+    """
+    Graphe des sous-recettes (Recette -> Sous-Recette).
+
+    - load() : graphe complet, chargé en une requête et mis en cache jusqu'à la
+      prochaine écriture d'une ligne (voir signals.py, CacheVersion) ; sert aux
+      parcours en masse (recettes parentes à recalculer, composantes connexes).
+    - check_edge() : validation d'une nouvelle ligne (cycles, profondeur) sur le
+      seul sous-graphe concerné, relu en base : jamais sur une copie en cache.
+    """
+    CACHE_KEY = 'recipes:sub_recipe_graph'
+    CACHE_TIMEOUT = 24 * 3600
+    DEFAULT_MAX_DEPTH = 10
+
+    def __init__(self, adjacency):
+        # {recette_id: {sous_recette_id, ...}}
+        self.adjacency = adjacency
+
+    @classmethod
+    def load(cls):
+        key = f'{cls.CACHE_KEY}:{CacheVersion.current(cls.CACHE_KEY)}'
+        adjacency = cache.get(key)
+        if adjacency is None:
+            adjacency = {}
+            edges = QuantiteIngredient.objects.filter(sub_recipe__isnull=False).values_list('recette_id', 'sub_recipe_id')
+            for recette_id, sub_id in edges:
+                adjacency.setdefault(recette_id, set()).add(sub_id)
+            cache.set(key, adjacency, cls.CACHE_TIMEOUT)
+        return cls(adjacency)
+
+    @classmethod
+    def invalidate(cls):
+        CacheVersion.bump(cls.CACHE_KEY)
+
+    @classmethod
+    def around(cls, recette_id, sub_recipe_id, max_depth=None):
+        """
+        Sous-graphe lu en base : descendants de sub_recipe_id et ancêtres de
+        recette_id, une requête par niveau. Le parcours s'arrête après
+        max_depth + 1 niveaux : au-delà, la ligne serait refusée de toute façon.
+        """
+        levels = (max_depth or cls.max_depth_setting()) + 1
+        lines = QuantiteIngredient.objects.filter(sub_recipe__isnull=False)
+        adjacency = {}
+
+        # Vers le bas depuis la sous-recette, vers le haut depuis la recette
+        for start, downward in ((sub_recipe_id, True), (recette_id, False)):
+            field = 'recette_id' if downward else 'sub_recipe_id'
+            frontier, seen = {start}, {start}
+            for _ in range(levels):
+                if not frontier:
+                    break
+                rows = lines.filter(**{f'{field}__in': frontier}).values_list('recette_id', 'sub_recipe_id')
+                frontier = set()
+                for parent, child in rows:
+                    adjacency.setdefault(parent, set()).add(child)
+                    following = child if downward else parent
+                    if following not in seen:
+                        seen.add(following)
+                        frontier.add(following)
+        return cls(adjacency)
+
+    @classmethod
+    def check_edge(cls, recette_id, sub_recipe_id, max_depth=None):
+        """Validation d'une ligne recette -> sous-recette avant écriture (clean, serializer)."""
+        cls.around(recette_id, sub_recipe_id, max_depth).validate_edge(recette_id, sub_recipe_id, max_depth)
+
+    @staticmethod
+    def max_depth_setting():
+        return getattr(settings, 'RECIPE_MAX_NESTING_DEPTH', SubRecipeGraph.DEFAULT_MAX_DEPTH)
+
+    # -----------------------------------------------------
+    # Lecture
+    # -----------------------------------------------------
+
+    def reaches(self, source_id, target_id):
+        """True si target_id est atteignable depuis source_id (ou lui est égal)."""
+        seen = set()
+        stack = [source_id]
+        while stack:
+            node = stack.pop()
+            if node == target_id:
+                return True
+            if node in seen:
+                continue
+            seen.add(node)
+            stack.extend(self.adjacency.get(node, ()))
+        return False
+
+    def ancestors(self, recipe_ids):
+        """Toutes les recettes qui utilisent (même indirectement) l'une des recettes données."""
+        parents = self._parents()
+        found = set()
+        stack = list(recipe_ids)
+        while stack:
+            for parent in parents.get(stack.pop(), ()):
+                if parent not in found:
+                    found.add(parent)
+                    stack.append(parent)
+        return found
+
+    def depths(self):
+        """
+        Profondeur maximale d'imbrication par recette :
+        0 = aucune sous-recette, 1 = sous-recettes simples, etc.
+        """
+        depths = {}
+        for start in self.adjacency:
+            if start in depths:
+                continue
+            stack = [(start, False)]
+            in_progress = set()
+            while stack:
+                node, expanded = stack.pop()
+                if node in depths:
+                    continue
+                children = self.adjacency.get(node, ())
+                if expanded:
+                    in_progress.discard(node)
+                    depths[node] = 1 + max((depths[child] for child in children), default=-1)
+                    continue
+                if node in in_progress:
+                    raise SubRecipeCycleError(f"Cycle détecté dans les sous-recettes (recette {node}).")
+                in_progress.add(node)
+                stack.append((node, True))
+                stack.extend((child, False) for child in children if child not in depths)
+        return depths
+
+    def depth(self, recipe_id):
+        return self.depths().get(recipe_id, 0)
+
+    # -----------------------------------------------------
+    # Validation
+    # -----------------------------------------------------
+
+    def validate_edge(self, recette_id, sub_recipe_id, max_depth=None):
+        """
+        Vérifie qu'ajouter la ligne recette -> sous-recette ne crée ni cycle
+        ni imbrication au-delà de max_depth niveaux.
+        """
+        if self.reaches(sub_recipe_id, recette_id):
+            raise SubRecipeCycleError(
+                "Cette sous-recette utilise déjà la recette (directement ou indirectement) : cycle interdit."
+            )
+
+        max_depth = max_depth or self.max_depth_setting()
+        depths = self.depths()
+        # Plus long chemin : ancêtre le plus haut -> recette -> sous-recette -> feuille
+        new_depth = self._height_above(recette_id) + 1 + depths.get(sub_recipe_id, 0)
+        if new_depth > max_depth:
+            raise ValidationError(
+                f"Imbrication de sous-recettes trop profonde ({new_depth} niveaux, maximum {max_depth})."
+            )
+
+    def _height_above(self, recipe_id):
+        """Plus long chemin d'un ancêtre jusqu'à recipe_id (0 si aucune recette ne l'utilise)."""
+        parents = self._parents()
+        heights = {}
+        in_progress = set()
+        stack = [(recipe_id, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node in heights:
+                continue
+            if expanded:
+                in_progress.discard(node)
+                heights[node] = 1 + max((heights[p] for p in parents.get(node, ())), default=-1)
+                continue
+            if node in in_progress:
+                raise SubRecipeCycleError(f"Cycle détecté dans les sous-recettes (recette {node}).")
+            in_progress.add(node)
+            stack.append((node, True))
+            stack.extend((p, False) for p in parents.get(node, ()) if p not in heights)
+        return heights[recipe_id]
+
+    def _parents(self):
+        """Index inverse : sous-recette -> recettes qui l'utilisent."""
+        parents = {}
+        for node, children in self.adjacency.items():
+            for child in children:
+                parents.setdefault(child, set()).add(node)
+        return parents
+
+
+class RecipeIngredientIndex:
+    """
+    Index inversé Ingrédient -> Recettes, construit depuis QuantiteIngredient
+    en une requête et mis en cache jusqu'à la prochaine écriture d'une ligne
+    (voir signals.py, CacheVersion). Les ingrédients d'une sous-recette sont hérités par
+    toutes les recettes qui l'utilisent, à toute profondeur.
+
+        index = RecipeIngredientIndex.load()
+        index.containing({farine, oeuf})      # recettes utilisant tous ces ingrédients
+        index.match({farine, oeuf, lait})     # meilleures recettes, par recouvrement
+    """
+    CACHE_KEY = 'recipes:ingredient_index'
+    CACHE_TIMEOUT = 24 * 3600  # les versions remplacées expirent d'elles-mêmes
+    # Copie locale au processus : relire l'index complet depuis le cache (désérialisation)
+    # coûterait plus que la recherche elle-même ; seule la version (en base) est lue à chaque appel
+    _local = None
+
+    def __init__(self, recipes, postings, families=None):
+        # {recette_id: frozenset(ingredient_id)} : ingrédients effectifs (sous-recettes incluses)
+        self.recipes = recipes
+        # {ingredient_id: set(recette_id)}
+        self.postings = postings
+        # {ingredient_id: family_id} pour les ingrédients des recettes ayant une famille
+        self.families = families or {}
+        self._pantry_matcher = None
+
+    @classmethod
+    def load(cls):
+        # Version partagée par tous les workers (CacheVersion), changée par signals.py
+        version = CacheVersion.current(cls.CACHE_KEY)
+        local = cls._local
+        if local is not None and local[0] == version:
+            return local[1]
+
+        key = f'{cls.CACHE_KEY}:{version}'
+        data = cache.get(key)
+        if data is None:
+            data = cls.build()
+            cache.set(key, data, cls.CACHE_TIMEOUT)
+        index = cls(*data)
+        cls._local = (version, index)
+        return index
+
+    @classmethod
+    def invalidate(cls):
+        CacheVersion.bump(cls.CACHE_KEY)
+
+    @staticmethod
+    def build():
+        direct, adjacency = {}, {}
+        rows = QuantiteIngredient.objects.values_list('recette_id', 'ingredient_id', 'sub_recipe_id')
+        for recette_id, ingredient_id, sub_id in rows:
+            direct.setdefault(recette_id, set())
+            if ingredient_id:
+                direct[recette_id].add(ingredient_id)
+            if sub_id:
+                adjacency.setdefault(recette_id, set()).add(sub_id)
+
+        # Fermeture par parcours en profondeur mémoïsé (un cycle éventuel est simplement coupé)
+        effective = {}
+
+        def resolve(recette_id, path):
+            if recette_id in effective:
+                return effective[recette_id]
+            ingredients = set(direct.get(recette_id, ()))
+            path.add(recette_id)
+            for sub_id in adjacency.get(recette_id, ()):
+                if sub_id not in path:
+                    ingredients |= resolve(sub_id, path)
+            path.discard(recette_id)
+            effective[recette_id] = frozenset(ingredients)
+            return effective[recette_id]
+
+        for recette_id in direct:
+            resolve(recette_id, set())
+
+        postings = {}
+        for recette_id, ingredients in effective.items():
+            for ingredient_id in ingredients:
+                postings.setdefault(ingredient_id, set()).add(recette_id)
+        families = dict(
+            Ingredient.objects.filter(id__in=postings, family__isnull=False).values_list('id', 'family_id')
+        )
+        return effective, postings, families
+
+    # -----------------------------------------------------
+    # Requêtes
+    # -----------------------------------------------------
+
+    def containing(self, ingredient_ids):
+        """Recettes qui utilisent TOUS les ingrédients donnés (intersection des listes)."""
+        lists = sorted((self.postings.get(i, set()) for i in set(ingredient_ids)), key=len)
+        if not lists:
+            return set()
+        result = set(lists[0])
+        for recipes in lists[1:]:
+            result &= recipes
+            if not result:
+                break
+        return result
+
+    def makeable_from(self, ingredient_ids):
+        """Recettes dont tous les ingrédients figurent parmi ceux donnés (inclusion inverse)."""
+        pantry = frozenset(ingredient_ids)
+        return {recette_id for recette_id in self._overlaps(pantry)
+                if self.recipes[recette_id] <= pantry}
+
+    def match(self, ingredient_ids, limit=5, unknown=0):
+        """
+        Recettes partageant au moins un ingrédient, de la meilleure à la moins bonne.
+        Score = 2 x communs / (demandés + ingrédients de la recette) (coefficient de Dice) :
+        1.0 quand la recette utilise exactement les ingrédients demandés.
+        unknown : ingrédients demandés absents du catalogue (comptent parmi les demandés).
+        """
+        query = frozenset(ingredient_ids)
+        asked = len(query) + unknown
+        results = []
+        for recette_id, common in self._overlaps(query).items():
+            size = len(self.recipes[recette_id])
+            results.append({
+                'recette_id': recette_id,
+                'score': round(2 * common / (asked + size), 4),
+                'communs': common,
+                'query_coverage': round(common / asked, 4),          # part des ingrédients demandés utilisés
+                'recipe_coverage': round(common / size, 4),          # part de la recette déjà disponible
+                'manquants': sorted(self.recipes[recette_id] - query),
+            })
+        results.sort(key=lambda r: (-r['score'], -r['communs'], r['recette_id']))
+        return results[:limit]
+
+    def pantry_matcher(self):
+        """Bitsets précalculés pour 'Que puis-je cuisiner ?' (construits au premier appel)."""
+        if self._pantry_matcher is None:
+            self._pantry_matcher = PantryMatcher(self)
+        return self._pantry_matcher
+
+    @staticmethod
+    def resolve_names(names):
+        """
+        Ingrédients désignés par leur nom ('Pomme', 'crème fraîche'...), en une requête.
+        Retourne ({ingredient_id: nom}, [noms inconnus]). Comparaison par slug :
+        insensible à la casse et aux accents.
+        """
+        wanted = {slugify(name): name for name in names if isinstance(name, str) and slugify(name)}
+        found = dict(Ingredient.objects.filter(slug__in=wanted).values_list('slug', 'id'))
+        names_by_id = {found[slug]: wanted[slug] for slug in wanted if slug in found}
+        unknown = [wanted[slug] for slug in wanted if slug not in found]
+        return names_by_id, unknown
+
+    def _overlaps(self, query):
+        """{recette_id: nombre d'ingrédients en commun} pour les recettes touchées par la requête."""
+        counts = {}
+        for ingredient_id in query:
+            for recette_id in self.postings.get(ingredient_id, ()):
+                counts[recette_id] = counts.get(recette_id, 0) + 1
+        return counts
+
+
+class PantryMatcher:
+    """
+    Classement des recettes selon un garde-manger ("Que puis-je cuisiner ?").
+
+    Chaque ingrédient reçoit un bit ; chaque recette aplatie (sous-recettes
+    incluses) devient un entier Python dont les bits sont ses ingrédients.
+    Le classement est alors, par recette, deux ET binaires et deux comptages
+    de bits (int.bit_count, en C) : aucune jointure SQL.
+
+    Un ingrédient manquant est "substituable" si le garde-manger contient un
+    autre ingrédient de la même IngredientFamily ; il compte alors pour
+    settings.PANTRY_SUBSTITUTION_WEIGHT dans la couverture.
+    """
+
+    def __init__(self, index):
+        self.ids_by_bit = sorted(index.postings)
+        self.bit_of = {ingredient_id: bit for bit, ingredient_id in enumerate(self.ids_by_bit)}
+        self.families = index.families
+        self.family_masks = {}
+        for ingredient_id, family_id in index.families.items():
+            self.family_masks[family_id] = self.family_masks.get(family_id, 0) | (1 << self.bit_of[ingredient_id])
+        self.recipes = [
+            (recette_id, self.mask(ingredients), len(ingredients))
+            for recette_id, ingredients in index.recipes.items() if ingredients
+        ]
+
+    def mask(self, ingredient_ids):
+        mask = 0
+        for ingredient_id in ingredient_ids:
+            bit = self.bit_of.get(ingredient_id)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def ids(self, mask):
+        """Identifiants des ingrédients d'un masque."""
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self.ids_by_bit[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+    def rank(self, pantry, limit=20, max_missing=None, substitution_weight=0.5):
+        """
+        Recettes utilisant au moins un ingrédient du garde-manger (ou un substitut),
+        de la meilleure couverture à la moins bonne, puis par nombre de manquants.
+        pantry : {ingredient_id: family_id ou None} (un ingrédient absent de toute
+        recette peut encore servir de substitut).
+        """
+        pantry_mask = self.mask(pantry)
+        substitutable = 0
+        for family_id in set(pantry.values()):
+            substitutable |= self.family_masks.get(family_id, 0)
+        substitutable &= ~pantry_mask
+
+        union = pantry_mask | substitutable
+        ranked = []
+        for recette_id, mask, size in self.recipes:
+            hit = mask & union
+            if not hit:
+                continue
+            have = (hit & pantry_mask).bit_count()
+            substituted = hit.bit_count() - have
+            missing = size - have - substituted
+            if max_missing is not None and missing > max_missing:
+                continue
+            ranked.append((-(have + substitution_weight * substituted) / size, missing, -have, recette_id, mask, size))
+        # Seule la page demandée est triée (recette_id unique : la comparaison s'arrête avant le masque)
+        top = heapq.nsmallest(limit, ranked)
+
+        results = []
+        for neg_coverage, missing, neg_have, recette_id, mask, size in top:
+            results.append({
+                'recette_id': recette_id,
+                'coverage': round(-neg_coverage, 4),
+                'ingredients': size,
+                'disponibles': -neg_have,
+                'substitutions': self._substitutions(mask & substitutable, pantry),
+                'manquants': self.ids(mask & ~pantry_mask & ~substitutable),
+            })
+        return {'count': len(ranked), 'results': results}
+
+    def _substitutions(self, mask, pantry):
+        """[(ingrédient de la recette, ingrédient du garde-manger de la même famille)]"""
+        pairs = []
+        for ingredient_id in self.ids(mask):
+            family_id = self.families[ingredient_id]
+            substitute = min(i for i, family in pantry.items() if family == family_id)
+            pairs.append((ingredient_id, substitute))
+        return pairs
+
+
+class PantryMatchService:
+    """
+    Endpoint "Que puis-je cuisiner ?" (RecetteViewSet.pantry_match) :
+    lecture des paramètres, résolution du garde-manger, classement par
+    PantryMatcher puis mise en forme de la page de résultats.
+    """
+    MAX_LIMIT = 100
+
+    @staticmethod
+    def parse(params):
+        """
+        Retourne (ingrédients, limit, max_missing) depuis une QueryDict (GET)
+        ou un corps JSON (POST). Lève ValidationError si les paramètres sont invalides.
+        """
+        raw = params.get('ingredients', [])
+        if isinstance(raw, str):
+            raw = [part.strip() for part in raw.split(',') if part.strip()]
+        if not isinstance(raw, list) or not raw:
+            raise ValidationError("'ingredients' requis (identifiants ou slugs).")
+        try:
+            limit = min(int(params.get('limit', 20)), PantryMatchService.MAX_LIMIT)
+            max_missing = params.get('max_missing')
+            max_missing = int(max_missing) if max_missing not in (None, '') else None
+        except (TypeError, ValueError):
+            raise ValidationError("'limit' et 'max_missing' doivent être des entiers.")
+        if limit < 1 or (max_missing is not None and max_missing < 0):
+            raise ValidationError("'limit' doit être au moins 1 et 'max_missing' positif ou nul.")
+        return raw, limit, max_missing
+
+    @staticmethod
+    def run(ingredients, limit=20, max_missing=None):
+        """Réponse de l'endpoint pour des ingrédients désignés par identifiant ou slug."""
+        ids = {int(value) for value in ingredients if str(value).isdigit()}
+        slugs = {str(value) for value in ingredients if not str(value).isdigit()}
+        rows = Ingredient.objects.filter(Q(id__in=ids) | Q(slug__in=slugs)).values_list('id', 'slug', 'family_id')
+        pantry = {ingredient_id: family_id for ingredient_id, _, family_id in rows}
+        found = {str(ingredient_id) for ingredient_id in pantry} | {slug for _, slug, _ in rows}
+        unknown = [value for value in ingredients if str(value) not in found]
+
+        ranking = RecipeIngredientIndex.load().pantry_matcher().rank(
+            pantry, limit=limit, max_missing=max_missing,
+            substitution_weight=settings.PANTRY_SUBSTITUTION_WEIGHT,
+        )
+
+        # Titres et noms pour la page de résultats seulement
+        results = ranking['results']
+        recettes = Recette.objects.only('id', 'titre', 'slug').in_bulk([r['recette_id'] for r in results])
+        names = dict(Ingredient.objects.filter(id__in={
+            i for r in results for i in r['manquants'] + [x for pair in r['substitutions'] for x in pair]
+        }).values_list('id', 'name'))
+        page = []
+        for r in results:
+            if r['recette_id'] not in recettes:
+                continue
+            # Un ingrédient supprimé depuis la construction de l'index est ignoré
+            manquants = sorted(names[i] for i in r['manquants'] if i in names)
+            page.append({
+                "recette_id": r['recette_id'],
+                "titre": recettes[r['recette_id']].titre,
+                "slug": recettes[r['recette_id']].slug,
+                "coverage": r['coverage'],
+                "ingredients": r['ingredients'],
+                "disponibles": r['disponibles'],
+                "substitutions": [
+                    {"ingredient": names[a], "remplace_par": names[b]}
+                    for a, b in r['substitutions'] if a in names and b in names
+                ],
+                "manquants": manquants,
+                "manquants_count": len(manquants),
+            })
+        return {"count": ranking['count'], "pantry": sorted(pantry), "unknown": unknown, "results": page}
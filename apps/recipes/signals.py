@@ -0,0 +1,28 @@
+# C:\Foodypedia\apps\recipes\signals.py
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Ingredient, RecipeCategory, QuantiteIngredient
+from .services import CategoryTreeService, RecipeIngredientIndex, SubRecipeGraph
+
+
+@receiver(post_save, sender=RecipeCategory)
+@receiver(post_delete, sender=RecipeCategory)
+def invalidate_category_tree(sender, **kwargs):
+    """Toute écriture sur une catégorie invalide l'arborescence en cache."""
+    CategoryTreeService.invalidate()
+
+
+@receiver(post_save, sender=QuantiteIngredient)
+@receiver(post_delete, sender=QuantiteIngredient)
+def invalidate_sub_recipe_graph(sender, **kwargs):
+    """Toute écriture sur une ligne de recette peut modifier le graphe des sous-recettes et l'index des ingrédients."""
+    SubRecipeGraph.invalidate()
+    RecipeIngredientIndex.invalidate()
+
+
+@receiver(post_save, sender=Ingredient)
+def invalidate_ingredient_families(sender, instance, created=False, update_fields=None, **kwargs):
+    """La famille d'un ingrédient sert aux substitutions de PantryMatcher."""
+    if not created and (update_fields is None or 'family' in update_fields):
+        RecipeIngredientIndex.invalidate()
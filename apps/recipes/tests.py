@@ -1,10 +1,19 @@
 # C:\Foodypedia\apps\recipes\tests.py
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Technique, Ingredient, QuantiteIngredient, Recette
+from .models import Technique, Ingredient, QuantiteIngredient, Recette, RecipeCategory
+from django.core.exceptions import ValidationError
+from apps.core.models import CacheVersion
+from .services import CategoryTreeService, RecipeIngredientIndex, SubRecipeGraph, SubRecipeCycleError
+import asyncio
+import json
+from unittest import mock
+from apps.core.outbound import OutboundClient
+from apps.ingredients.models import IngredientCategory, IngredientFamily
+from .ai_chef import UpstreamError
 
 User = get_user_model()
 
@@ -262,3 +271,483 @@ class RecetteAPITestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('total', response.data)
         self.assertIn('top_auteurs', response.data)
+
+
+class RecipeCategoryTreeTestCase(TestCase):
+    """
+    Tests pour l'arborescence des catégories (cache + ETag).
+    """
+
+    def setUp(self):
+        CategoryTreeService.invalidate()
+        self.client_public = APIClient()
+        self.url_tree = '/api/v1/recipes/categories/tree/'
+
+        self.cuisine = RecipeCategory.objects.create(name='Cuisine', slug='cuisine')
+        self.patisserie = RecipeCategory.objects.create(name='Pâtisserie', slug='patisserie')
+        self.sauces = RecipeCategory.objects.create(name='Sauces', slug='sauces', parent=self.cuisine)
+        self.entrees = RecipeCategory.objects.create(name='Entrées', slug='entrees', parent=self.cuisine)
+        self.fonds = RecipeCategory.objects.create(name='Fonds', slug='fonds', parent=self.sauces)
+
+    def test_tree_structure(self):
+        """Test: L'arbre est complet et trié par nom à chaque niveau."""
+        response = self.client_public.get(self.url_tree)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([node['slug'] for node in response.data], ['cuisine', 'patisserie'])
+
+        cuisine = response.data[0]
+        self.assertEqual([node['slug'] for node in cuisine['subcategories']], ['entrees', 'sauces'])
+        sauces = cuisine['subcategories'][1]
+        self.assertEqual(sauces['parent'], self.cuisine.id)
+        self.assertEqual(sauces['subcategories'][0]['slug'], 'fonds')
+        self.assertEqual(sauces['subcategories'][0]['subcategories'], [])
+
+    def test_tree_cached_single_query(self):
+        """Test: Version + arbre au premier appel, puis la version seule (clé primaire)."""
+        with self.assertNumQueries(2):
+            self.client_public.get(self.url_tree)
+        with self.assertNumQueries(1):
+            response = self.client_public.get(self.url_tree)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_reads_version_once(self):
+        """Test: La liste lit la version une seule fois, quel que soit le nombre de catégories."""
+        self.client_public.get(self.url_tree)
+        with self.assertNumQueries(2):  # catégories + version
+            response = self.client_public.get('/api/v1/recipes/categories/')
+        self.assertEqual(len(response.data), 5)
+        sauces = next(node for node in response.data if node['slug'] == 'sauces')
+        self.assertEqual([node['slug'] for node in sauces['subcategories']], ['fonds'])
+
+    def test_tree_etag_follows_other_workers(self):
+        """Test: Une écriture vue seulement en base (autre worker) change l'arbre et l'ETag."""
+        etag = self.client_public.get(self.url_tree)['ETag']
+        with mock.patch.object(CategoryTreeService, 'invalidate'):
+            RecipeCategory.objects.create(name='Desserts', slug='desserts', parent=self.patisserie)
+        CacheVersion.bump(CategoryTreeService.CACHE_KEY)  # fait par le signal de l'autre worker
+        response = self.client_public.get(self.url_tree, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_tree_etag_not_modified(self):
+        """Test: If-None-Match renvoie 304 tant que l'arbre ne change pas."""
+        response = self.client_public.get(self.url_tree)
+        etag = response['ETag']
+
+        response = self.client_public.get(self.url_tree, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_tree_invalidated_on_save_and_delete(self):
+        """Test: Les signaux save/delete invalident le cache et l'ETag."""
+        etag = self.client_public.get(self.url_tree)['ETag']
+
+        RecipeCategory.objects.create(name='Desserts', slug='desserts', parent=self.patisserie)
+        response = self.client_public.get(self.url_tree, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[1]['subcategories'][0]['slug'], 'desserts')
+
+        self.fonds.delete()
+        response = self.client_public.get(self.url_tree)
+        self.assertEqual(response.data[0]['subcategories'][1]['subcategories'], [])
+
+
+class RecipeCategoryPathTestCase(TestCase):
+    """
+    Tests pour l'index matérialisé des catégories et le filtrage récursif des recettes.
+    """
+
+    def setUp(self):
+        self.client_public = APIClient()
+        self.url_list = '/api/v1/recipes/recettes/'
+
+        self.cuisine = RecipeCategory.objects.create(name='Cuisine', slug='cuisine')
+        self.patisserie = RecipeCategory.objects.create(name='Pâtisserie', slug='patisserie')
+        self.sauces = RecipeCategory.objects.create(name='Sauces', slug='sauces', parent=self.cuisine)
+        self.fonds = RecipeCategory.objects.create(name='Fonds', slug='fonds', parent=self.sauces)
+
+        Recette.objects.create(titre='Fond brun', description='Base', category=self.fonds)
+        Recette.objects.create(titre='Sauce tomate', description='Sauce', category=self.sauces)
+        Recette.objects.create(titre='Tarte Tatin', description='Dessert', category=self.patisserie)
+
+    def test_paths_maintained_on_create(self):
+        """Test: Le chemin reflète la chaîne des ancêtres."""
+        self.assertEqual(self.cuisine.path, f'/{self.cuisine.id}/')
+        self.assertEqual(self.fonds.path, f'/{self.cuisine.id}/{self.sauces.id}/{self.fonds.id}/')
+
+    def test_paths_rewritten_on_reparent(self):
+        """Test: Déplacer une catégorie met à jour tous ses descendants."""
+        self.sauces.parent = self.patisserie
+        self.sauces.save()
+
+        self.fonds.refresh_from_db()
+        self.assertEqual(self.fonds.path, f'/{self.patisserie.id}/{self.sauces.id}/{self.fonds.id}/')
+
+    def test_rebuild_paths(self):
+        """Test: La reconstruction répare les chemins écrits hors save()."""
+        RecipeCategory.objects.filter(pk=self.sauces.pk).update(parent=self.patisserie)
+        self.assertEqual(RecipeCategory.rebuild_paths(), 2)
+
+        self.fonds.refresh_from_db()
+        self.assertTrue(self.fonds.path.startswith(f'/{self.patisserie.id}/'))
+
+    def test_filter_by_root_slug_includes_descendants(self):
+        """Test: Le filtre par catégorie racine inclut toute la sous-arborescence."""
+        response = self.client_public.get(f'{self.url_list}?category__root_slug=cuisine')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titres = sorted(r['titre'] for r in response.data['results'])
+        self.assertEqual(titres, ['Fond brun', 'Sauce tomate'])
+
+        response = self.client_public.get(f'{self.url_list}?category__slug=fonds')
+        self.assertEqual([r['titre'] for r in response.data['results']], ['Fond brun'])
+
+
+class SubRecipeGraphTestCase(TestCase):
+    """
+    Tests pour la validation du graphe des sous-recettes (cycles et profondeur).
+    """
+
+    def setUp(self):
+        SubRecipeGraph.invalidate()
+        self.fond = Recette.objects.create(titre='Fond brun', description='Base')
+        self.sauce = Recette.objects.create(titre='Sauce Bordelaise', description='Sauce')
+        self.plat = Recette.objects.create(titre='Entrecôte', description='Plat')
+        QuantiteIngredient.objects.create(recette=self.sauce, sub_recipe=self.fond, quantite=1)
+        QuantiteIngredient.objects.create(recette=self.plat, sub_recipe=self.sauce, quantite=1)
+
+    def test_self_reference_rejected(self):
+        """Test: Une recette ne peut pas être sa propre sous-recette."""
+        ligne = QuantiteIngredient(recette=self.fond, sub_recipe=self.fond, quantite=1)
+        with self.assertRaises(SubRecipeCycleError):
+            ligne.clean()
+
+    def test_transitive_cycle_rejected(self):
+        """Test: Fond -> Plat -> Sauce -> Fond est refusé."""
+        ligne = QuantiteIngredient(recette=self.fond, sub_recipe=self.plat, quantite=1)
+        with self.assertRaises(SubRecipeCycleError):
+            ligne.clean()
+
+    def test_valid_edge_accepted(self):
+        """Test: Une réutilisation sans cycle est acceptée."""
+        QuantiteIngredient(recette=self.plat, sub_recipe=self.fond, quantite=1).clean()
+
+    def test_depths(self):
+        """Test: Profondeur maximale d'imbrication par recette."""
+        graph = SubRecipeGraph.load()
+        self.assertEqual(graph.depth(self.fond.id), 0)
+        self.assertEqual(graph.depth(self.sauce.id), 1)
+        self.assertEqual(graph.depth(self.plat.id), 2)
+
+    def test_max_depth_enforced(self):
+        """Test: L'imbrication au-delà de la limite est refusée."""
+        graph = SubRecipeGraph.load()
+        menu = Recette.objects.create(titre='Menu', description='Menu')
+        with self.assertRaises(ValidationError):
+            graph.validate_edge(menu.id, self.plat.id, max_depth=2)
+        graph.validate_edge(menu.id, self.plat.id, max_depth=3)
+
+    def test_graph_cached_and_invalidated(self):
+        """Test: Le graphe est servi depuis le cache (version relue en base) et invalidé à l'écriture."""
+        SubRecipeGraph.load()
+        with self.assertNumQueries(1):
+            SubRecipeGraph.load()
+
+        QuantiteIngredient.objects.create(recette=self.plat, sub_recipe=self.fond, quantite=1)
+        self.assertIn(self.fond.id, SubRecipeGraph.load().adjacency[self.plat.id])
+
+    def test_validation_ignores_stale_cache(self):
+        """Test: La validation relit le sous-graphe en base, même si le cache d'un worker est périmé."""
+        SubRecipeGraph.load()
+        with mock.patch.object(SubRecipeGraph, 'invalidate'):
+            # Écriture "par un autre worker" : le graphe en cache ne la voit pas
+            QuantiteIngredient.objects.create(recette=self.fond, sub_recipe=Recette.objects.create(titre='Jus'))
+        jus = Recette.objects.get(titre='Jus')
+        with self.assertRaises(SubRecipeCycleError):
+            QuantiteIngredient(recette=jus, sub_recipe=self.plat, quantite=1).clean()
+        self.assertEqual(
+            SubRecipeGraph.around(self.sauce.id, self.fond.id).adjacency,
+            {self.plat.id: {self.sauce.id}, self.fond.id: {jus.id}},  # ancêtres de la sauce, descendants du fond
+        )
+
+
+class GenerateRecipeViewTestCase(TestCase):
+    """
+    Tests du proxy n8n (client HTTP sortant partagé).
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = '/api/v1/recipes/ai-chef/generate/'
+        self.payload = {'ingredients': ['pomme', 'sucre']}
+
+    def test_missing_webhook_url(self):
+        """Test: Webhook non configuré -> 503."""
+        with self.settings(N8N_WEBHOOK_URL=''):
+            response = self.client.post(self.url, self.payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_open_circuit_fails_fast(self):
+        """Test: Disjoncteur ouvert -> 503 immédiat avec Retry-After, sans appel réseau."""
+        n8n = OutboundClient('n8n', reset_timeout=30)
+        with self.settings(N8N_WEBHOOK_URL='http://n8n.invalid/webhook/chef'), \
+                mock.patch('apps.recipes.views.get_client', return_value=n8n), \
+                mock.patch.object(n8n.session, 'request') as request:
+            n8n.breaker.opened_at = n8n.breaker.clock()
+            response = self.client.post(self.url, self.payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '30')
+        request.assert_not_called()
+
+
+async def _blocking_upstream(ingredients):
+    """Source de test : titre immédiat, puis attente de _blocking_upstream.release."""
+    yield 'title', 'Titre immédiat'
+    await _blocking_upstream.release.wait()
+    yield 'step', 'Étape finale'
+
+
+async def _failing_upstream(ingredients):
+    yield 'title', 'Titre'
+    raise UpstreamError('HTTP 500')
+
+
+@override_settings(AI_CHEF_FAKE_DELAY=0)
+class GenerateRecipeStreamTestCase(TestCase):
+    """
+    Tests du mode streaming (SSE) de l'agent IA Chef.
+    """
+    url = '/api/v1/recipes/ai-chef/generate/stream/'
+    payload = {'ingredients': ['pomme', 'sucre', 'farine']}
+
+    @staticmethod
+    def parse(chunks):
+        events = []
+        for block in b''.join(chunks).decode().split('\n\n'):
+            lines = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+            if lines:
+                events.append((lines['event'], json.loads(lines['data'])))
+        return events
+
+    @override_settings(AI_CHEF_UPSTREAM='apps.recipes.ai_chef.fake_recipe_events')
+    async def test_fake_upstream_events_in_order(self):
+        """Test: title, description, chaque étape puis done (recette complète)."""
+        response = await self.async_client.post(self.url, self.payload, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = self.parse([chunk async for chunk in response.streaming_content])
+
+        self.assertEqual([name for name, _ in events], ['title', 'description', 'step', 'step', 'step', 'done'])
+        self.assertEqual(events[0][1], 'Délice aux 3 trésors')
+        self.assertEqual(events[3][1], {'index': 1, 'text': 'Faire revenir le tout à feu moyen.'})
+        self.assertEqual(len(events[-1][1]['steps']), 3)
+
+    @override_settings(AI_CHEF_UPSTREAM='apps.recipes.tests._blocking_upstream')
+    async def test_first_events_sent_before_generation_ends(self):
+        """Test: Le titre est reçu alors que la source n'a pas terminé."""
+        _blocking_upstream.release = asyncio.Event()
+        response = await self.async_client.post(self.url, self.payload, content_type='application/json')
+        stream = aiter(response.streaming_content)
+
+        first = await asyncio.wait_for(anext(stream), timeout=1)
+        title = await asyncio.wait_for(anext(stream), timeout=1)
+        self.assertTrue(first.startswith(b':'))
+        self.assertEqual(self.parse([title]), [('title', 'Titre immédiat')])
+
+        _blocking_upstream.release.set()
+        rest = self.parse([chunk async for chunk in stream])
+        self.assertEqual([name for name, _ in rest], ['step', 'done'])
+
+    @override_settings(AI_CHEF_UPSTREAM='apps.recipes.tests._failing_upstream')
+    async def test_upstream_error_becomes_error_event(self):
+        """Test: Erreur de la source en cours de flux -> événement 'error', pas de 'done'."""
+        response = await self.async_client.post(self.url, self.payload, content_type='application/json')
+        events = self.parse([chunk async for chunk in response.streaming_content])
+        self.assertEqual([name for name, _ in events], ['title', 'error'])
+
+    async def test_invalid_payload(self):
+        """Test: Moins de 2 ingrédients -> 400 JSON, sans flux."""
+        response = await self.async_client.post(self.url, {'ingredients': ['pomme']}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class RecipeIngredientIndexTestCase(TestCase):
+    """
+    Tests de l'index inversé ingrédients -> recettes (sous-recettes incluses)
+    et de la réponse depuis le catalogue de l'agent IA Chef.
+    """
+
+    def setUp(self):
+        RecipeIngredientIndex.invalidate()
+        category = IngredientCategory.objects.create(name='Épicerie', slug='epicerie')
+        self.ing = {
+            name: Ingredient.objects.create(name=name, slug=slug, description='-', category=category)
+            for name, slug in [('Farine', 'farine'), ('Beurre', 'beurre'), ('Pomme', 'pomme'),
+                               ('Sucre', 'sucre'), ('Crème fraîche', 'creme-fraiche'), ('Sel', 'sel')]
+        }
+        # Pâte brisée (farine, beurre, sel) utilisée par la tarte aux pommes
+        self.pate = Recette.objects.create(titre='Pâte brisée', description='Base')
+        for name in ('Farine', 'Beurre', 'Sel'):
+            QuantiteIngredient.objects.create(recette=self.pate, ingredient=self.ing[name], quantite=100, unite='g')
+        self.tarte = Recette.objects.create(
+            titre='Tarte aux pommes', description='Classique', instructions='Foncer le moule.\nCuire 35 min.'
+        )
+        QuantiteIngredient.objects.create(recette=self.tarte, sub_recipe=self.pate, quantite=1)
+        for name in ('Pomme', 'Sucre'):
+            QuantiteIngredient.objects.create(recette=self.tarte, ingredient=self.ing[name], quantite=4)
+        self.chantilly = Recette.objects.create(titre='Chantilly', description='Crème')
+        for name in ('Crème fraîche', 'Sucre'):
+            QuantiteIngredient.objects.create(recette=self.chantilly, ingredient=self.ing[name], quantite=1)
+
+    def ids(self, *names):
+        return {self.ing[name].id for name in names}
+
+    def test_sub_recipe_ingredients_are_inherited(self):
+        """Test: La tarte hérite de la farine et du beurre de la pâte brisée."""
+        index = RecipeIngredientIndex.load()
+        self.assertEqual(index.recipes[self.tarte.id], self.ids('Farine', 'Beurre', 'Sel', 'Pomme', 'Sucre'))
+        self.assertEqual(index.containing(self.ids('Farine', 'Pomme')), {self.tarte.id})
+        self.assertEqual(index.containing(self.ids('Sucre')), {self.tarte.id, self.chantilly.id})
+        self.assertEqual(index.makeable_from(self.ids('Crème fraîche', 'Sucre', 'Sel')), {self.chantilly.id})
+
+    def test_match_ranking_and_cache(self):
+        """Test: Classement par score ; index servi depuis le cache ; invalidé à l'écriture."""
+        RecipeIngredientIndex.load()
+        # Seule la version partagée (CacheVersion) est relue
+        with self.assertNumQueries(1):
+            matches = RecipeIngredientIndex.load().match(self.ids('Crème fraîche', 'Sucre', 'Pomme'))
+        self.assertEqual([m['recette_id'] for m in matches], [self.chantilly.id, self.tarte.id])
+        self.assertEqual(matches[0]['score'], 0.8)  # 2 x 2 / (3 + 2)
+        self.assertEqual(matches[1]['manquants'], sorted(self.ids('Farine', 'Beurre', 'Sel')))
+
+        QuantiteIngredient.objects.create(recette=self.pate, ingredient=self.ing['Crème fraîche'], quantite=1)
+        index = RecipeIngredientIndex.load()
+        self.assertIn(self.ing['Crème fraîche'].id, index.recipes[self.tarte.id])
+
+    def test_version_shared_between_processes(self):
+        """Test: Une invalidation faite par un autre worker (version en base) est vue ici."""
+        index = RecipeIngredientIndex.load()
+        self.assertIs(RecipeIngredientIndex.load(), index)
+        CacheVersion.objects.filter(key=RecipeIngredientIndex.CACHE_KEY).update(version='autre-worker')
+        self.assertIsNot(RecipeIngredientIndex.load(), index)
+
+    def test_view_ignores_ingredients_deleted_since_build(self):
+        """Test: Un ingrédient supprimé après la construction de l'index n'entraîne pas d'erreur 500."""
+        RecipeIngredientIndex.load()
+        with mock.patch.object(RecipeIngredientIndex, 'invalidate'):
+            QuantiteIngredient.objects.filter(ingredient=self.ing['Sel']).delete()
+            self.ing['Sel'].delete()
+        response = APIClient().post('/api/v1/recipes/ai-chef/generate/',
+                                    {'ingredients': ['pomme', 'sucre', 'farine', 'beurre']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['matches'][0]['manquants'], [])
+
+    def test_view_answers_from_catalogue(self):
+        """Test: Bon recouvrement -> recette existante, sans appel à l'agent."""
+        client = APIClient()
+        with self.settings(N8N_WEBHOOK_URL=''), \
+                mock.patch('apps.recipes.views.get_client') as get_client:
+            response = client.post('/api/v1/recipes/ai-chef/generate/',
+                                   {'ingredients': ['pomme', 'SUCRE', 'farine', 'Beurre']}, format='json')
+            get_client.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['source'], 'catalogue')
+        self.assertEqual(response.data['title'], 'Tarte aux pommes')
+        self.assertEqual(response.data['steps'], ['Foncer le moule.', 'Cuire 35 min.'])
+        self.assertEqual(response.data['matches'][0]['manquants'], ['Sel'])
+
+    def test_view_falls_back_when_coverage_is_poor(self):
+        """Test: Recouvrement faible (ou force_ai) -> passage à l'agent (ici non configuré : 503)."""
+        client = APIClient()
+        with self.settings(N8N_WEBHOOK_URL=''):
+            response = client.post('/api/v1/recipes/ai-chef/generate/',
+                                   {'ingredients': ['sel', 'truffe', 'homard']}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            response = client.post('/api/v1/recipes/ai-chef/generate/',
+                                   {'ingredients': ['crème fraîche', 'sucre'], 'force_ai': True}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class PantryMatchTestCase(TestCase):
+    """
+    Tests de "Que puis-je cuisiner ?" (bitsets, substitutions par famille, sous-recettes).
+    """
+    url = '/api/v1/recipes/recettes/pantry-match/'
+
+    def setUp(self):
+        RecipeIngredientIndex.invalidate()
+        category = IngredientCategory.objects.create(name='Épicerie', slug='epicerie')
+        laitiers = IngredientFamily.objects.create(name='Produits laitiers')
+
+        def ingredient(name, slug, family=None):
+            return Ingredient.objects.create(name=name, slug=slug, description='-', category=category, family=family)
+
+        self.farine = ingredient('Farine', 'farine')
+        self.oeuf = ingredient('Oeuf', 'oeuf')
+        self.lait = ingredient('Lait', 'lait', laitiers)
+        self.creme = ingredient('Crème', 'creme', laitiers)
+        self.sucre = ingredient('Sucre', 'sucre')
+        self.fraise = ingredient('Fraise', 'fraise')
+
+        def recette(titre, *lignes):
+            r = Recette.objects.create(titre=titre, slug=titre.lower().replace(' ', '-'), description='-')
+            for item in lignes:
+                field = 'sub_recipe' if isinstance(item, Recette) else 'ingredient'
+                QuantiteIngredient.objects.create(recette=r, quantite=1, **{field: item})
+            return r
+
+        self.crepes = recette('Crepes', self.farine, self.oeuf, self.lait)
+        self.creme_patissiere = recette('Creme patissiere', self.lait, self.oeuf, self.sucre)
+        self.tarte = recette('Tarte fraises', self.creme_patissiere, self.farine, self.fraise)
+
+    def test_ranking_with_substitution_and_sub_recipes(self):
+        """Test: Crème remplace le lait (même famille) ; la tarte hérite de la crème pâtissière."""
+        response = self.client.get(self.url, {'ingredients': f'farine,oeuf,{self.creme.id},inconnu'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['unknown'], ['inconnu'])
+        self.assertEqual(response.data['count'], 3)
+
+        crepes, creme_pat, tarte = response.data['results']
+        self.assertEqual(crepes['recette_id'], self.crepes.id)
+        self.assertEqual(crepes['coverage'], round(2.5 / 3, 4))
+        self.assertEqual(crepes['substitutions'], [{'ingredient': 'Lait', 'remplace_par': 'Crème'}])
+        self.assertEqual(crepes['manquants'], [])
+        self.assertEqual(creme_pat['manquants'], ['Sucre'])
+        self.assertEqual(tarte['recette_id'], self.tarte.id)
+        self.assertEqual(tarte['ingredients'], 5)  # lait, oeuf, sucre (sous-recette) + farine, fraise
+        self.assertEqual(tarte['manquants'], ['Fraise', 'Sucre'])
+
+    def test_max_missing_and_post(self):
+        """Test: POST avec max_missing=0 -> seulement les recettes réalisables."""
+        response = APIClient().post(
+            self.url, {'ingredients': [self.farine.id, 'oeuf', 'lait'], 'max_missing': 0}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['titre'] for r in response.data['results']], ['Crepes'])
+        self.assertEqual(response.data['results'][0]['coverage'], 1.0)
+
+    def test_bitset_ranking_uses_no_sql(self):
+        """Test: Le classement lui-même ne fait aucune requête (index en mémoire)."""
+        matcher = RecipeIngredientIndex.load().pantry_matcher()
+        with self.assertNumQueries(0):
+            ranking = matcher.rank({self.sucre.id: None})
+        self.assertIs(RecipeIngredientIndex.load().pantry_matcher(), matcher)
+        self.assertEqual({r['recette_id'] for r in ranking['results']}, {self.creme_patissiere.id, self.tarte.id})
+
+    def test_missing_ingredients(self):
+        """Test: Sans ingrédients -> 400."""
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_out_of_range_parameters(self):
+        """Test: limit < 1 ou max_missing < 0 -> 400."""
+        for params in ({'limit': 0}, {'limit': -5}, {'max_missing': -1}):
+            response = self.client.get(self.url, {'ingredients': 'oeuf', **params})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_single_endpoint(self):
+        """Test: L'action n'existe que sur les recettes."""
+        from .views import IngredientViewSet, RecetteViewSet, TechniqueViewSet
+        actions = {viewset: [a.url_path for a in viewset.get_extra_actions()]
+                   for viewset in (IngredientViewSet, RecetteViewSet, TechniqueViewSet)}
+        self.assertIn('pantry-match', actions[RecetteViewSet])
+        self.assertNotIn('pantry-match', actions[IngredientViewSet])
+        self.assertNotIn('pantry-match', actions[TechniqueViewSet])
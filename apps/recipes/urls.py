@@ -8,7 +8,8 @@ from .views import (
     TechniqueViewSet,
     IngredientViewSet,
     QuantiteIngredientViewSet,
-    GenerateRecipeView
+    GenerateRecipeView,
+    generate_recipe_stream
 )
 
 # Créer un routeur DRF
@@ -26,4 +27,5 @@ router.register(r'quantites-ingredients', QuantiteIngredientViewSet, basename='q
 urlpatterns = [
     path('', include(router.urls)),
     path('ai-chef/generate/', GenerateRecipeView.as_view(), name='ai-chef-generate'),
+    path('ai-chef/generate/stream/', generate_recipe_stream, name='ai-chef-generate-stream'),
 ]
\ No newline at end of file
@@ -1,8 +1,9 @@
 # C:\Foodypedia\apps\recipes\views.py
 
-from rest_framework import viewsets, permissions, filters
+from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.core.exceptions import ValidationError
 from django.db.models import Count, Q
 from .models import Technique, Ingredient, QuantiteIngredient, Recette, RecipeCategory
 from .serializers import (
@@ -12,6 +13,7 @@ from .serializers import (
     RecetteSerializer,
     RecipeCategorySerializer
 )
+from .services import CategoryTreeService, PantryMatchService, RecipeIngredientIndex
 
 
 class IsAuthenticatedOrReadOnly(permissions.BasePermission):
@@ -193,20 +195,11 @@ class RecetteViewSet(viewsets.ModelViewSet):
                         self.request.query_params.get('category__root_slug')
         
         if category_slug:
-            try:
-                root_cat = RecipeCategory.objects.get(slug=category_slug)
-                # Version robuste pour collecter les IDs
-                ids_to_check = [root_cat.id]
-                all_ids = set()
-                while ids_to_check:
-                    current_id = ids_to_check.pop()
-                    if current_id not in all_ids:
-                        all_ids.add(current_id)
-                        children_ids = RecipeCategory.objects.filter(parent_id=current_id).values_list('id', flat=True)
-                        ids_to_check.extend(list(children_ids))
-                
-                queryset = queryset.filter(category_id__in=all_ids)
-            except RecipeCategory.DoesNotExist:
+            # Index matérialisé : la catégorie et ses descendants partagent le préfixe de chemin
+            root_path = RecipeCategory.objects.filter(slug=category_slug).values_list('path', flat=True).first()
+            if root_path:
+                queryset = queryset.filter(category__path__startswith=root_path)
+            else:
                 queryset = queryset.filter(category__slug=category_slug)
 
         # Filtre par auteur
@@ -237,6 +230,25 @@ class RecetteViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(recettes, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get', 'post'], url_path='pantry-match',
+            permission_classes=[permissions.AllowAny])
+    def pantry_match(self, request):
+        """
+        "Que puis-je cuisiner ?" : recettes classées par couverture du garde-manger.
+        GET  /api/v1/recipes/recettes/pantry-match/?ingredients=12,farine,oeuf&limit=20&max_missing=2
+        POST /api/v1/recipes/recettes/pantry-match/  {"ingredients": [12, "farine"], "limit": 20}
+
+        Les sous-recettes sont aplaties ; un ingrédient manquant de la même
+        IngredientFamily qu'un ingrédient disponible compte comme substitution.
+        Classement en mémoire sur des bitsets précalculés (PantryMatcher).
+        """
+        params = request.data if request.method == 'POST' else request.query_params
+        try:
+            ingredients, limit, max_missing = PantryMatchService.parse(params)
+        except ValidationError as e:
+            return Response({"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(PantryMatchService.run(ingredients, limit=limit, max_missing=max_missing))
+
     @action(detail=False, methods=['get'])
     def statistiques(self, request):
         """
@@ -284,22 +296,39 @@ class RecipeCategoryViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Retourne l'arborescence complète des catégories.
         GET /api/v1/recipes/categories/tree/
+
+        Servie depuis le cache (en régime établi, seule la version partagée est relue) avec un ETag :
+        le client renvoie If-None-Match et reçoit un 304 si rien n'a changé.
         """
-        roots = RecipeCategory.objects.filter(parent__isnull=True)
-        serializer = self.get_serializer(roots, many=True)
-        return Response(serializer.data)
+        tree, etag = CategoryTreeService.get_tree()
+
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(tree)
+        response['ETag'] = etag
+        return response
 
 
 from rest_framework.views import APIView
 from rest_framework import status
+import json
 from django.conf import settings
-import requests
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from apps.core.outbound import CircuitOpenError, OutboundError, get_client
+from .ai_chef import get_upstream, n8n_recipe_events, sse_stream
 
 class GenerateRecipeView(APIView):
     """
     Proxy pour l'agent IA n8n via Webhook.
     POST /api/v1/recipes/ai-chef/generate/
-    Payload: { "ingredients": ["pomme", "sucre", "farine"] }
+    Payload: { "ingredients": ["pomme", "sucre", "farine"], "force_ai": false }
+    Répond depuis le catalogue ("source": "catalogue") quand une recette existante
+    couvre assez bien les ingrédients ; sinon appelle l'agent ("source": "ia").
+    Version en flux (SSE) : generate_recipe_stream.
     """
     permission_classes = [permissions.AllowAny] # Ou IsAuthenticated si restreint
 
@@ -311,37 +340,121 @@ class GenerateRecipeView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # URL du Webhook n8n (depuis settings ou dur)
-        # Idéalement: settings.N8N_WEBHOOK_URL
-        # Pour l'instant on met un placeholder ou on check settings
-        webhook_url = getattr(settings, 'N8N_WEBHOOK_URL', None)
-        
+        # Recettes existantes d'abord : réponse immédiate si le catalogue couvre la demande
+        if not request.data.get('force_ai'):
+            suggestion = self.catalogue_answer(ingredients)
+            if suggestion:
+                return Response(suggestion)
+
+        webhook_url = settings.N8N_WEBHOOK_URL
         if not webhook_url:
             return Response(
                 {"error": "Configuration serveur incomplète (Webhook URL manquant)."},
                 status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
 
+        # Appel au Webhook n8n par le client partagé (keep-alive, tentatives, disjoncteur)
         try:
-            # Appel au Webhook n8n
-            pass
-            # response = requests.post(webhook_url, json={"ingredients": ingredients}, timeout=30)
-            # response.raise_for_status()
-            # return Response(response.json())
-            
-            # MOCK TEMPORAIRE pour le développement sans n8n actif
-            return Response({
-                "title": f"Délice aux {len(ingredients)} trésors",
-                "description": f"Une recette unique générée par IA combinant {', '.join(ingredients)}.",
-                "steps": [
-                    "Préparer les ingrédients avec soin.",
-                    "Faire revenir le tout à feu moyen.",
-                    "Dresser magnifiquement et servir."
-                ]
-            })
-
-        except Exception as e:
+            response = get_client('n8n').post(webhook_url, json={"ingredients": ingredients})
+        except CircuitOpenError as e:
             return Response(
-                {"error": f"Erreur de génération: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {"error": f"Agent IA indisponible, réessayez plus tard. ({e})"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(int(get_client('n8n').breaker.reset_timeout))},
             )
+        except OutboundError as e:
+            return Response({"error": f"Erreur de génération: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        if response.status_code >= 400 or data is None:
+            return Response(
+                {"error": f"Erreur de génération: réponse invalide de l'agent IA (HTTP {response.status_code})."},
+                status=status.HTTP_502_BAD_GATEWAY
+            )
+        if isinstance(data, dict):
+            data.setdefault('source', 'ia')
+        return Response(data)
+
+    @staticmethod
+    def catalogue_answer(ingredients):
+        """
+        Meilleure recette existante pour ces ingrédients (index inversé en cache),
+        au format de la réponse IA, ou None si le recouvrement est insuffisant
+        (score < settings.AI_CHEF_CATALOGUE_MIN_SCORE).
+        """
+        names_by_id, unknown = RecipeIngredientIndex.resolve_names(ingredients)
+        if not names_by_id:
+            return None
+        matches = RecipeIngredientIndex.load().match(
+            names_by_id, limit=settings.AI_CHEF_CATALOGUE_LIMIT, unknown=len(unknown)
+        )
+        if not matches or matches[0]['score'] < settings.AI_CHEF_CATALOGUE_MIN_SCORE:
+            return None
+
+        recettes = Recette.objects.in_bulk([match['recette_id'] for match in matches])
+        # Recettes ou ingrédients supprimés depuis la construction de l'index : ignorés
+        matches = [match for match in matches if match['recette_id'] in recettes]
+        if not matches:
+            return None
+        missing_ids = {i for match in matches for i in match['manquants']}
+        missing_names = dict(Ingredient.objects.filter(id__in=missing_ids).values_list('id', 'name'))
+        best = recettes[matches[0]['recette_id']]
+        return {
+            "source": "catalogue",
+            "recette_id": best.id,
+            "title": best.titre,
+            "description": best.description,
+            "steps": [line.strip() for line in best.instructions.splitlines() if line.strip()],
+            "matches": [
+                {
+                    "recette_id": match['recette_id'],
+                    "titre": recettes[match['recette_id']].titre,
+                    "score": match['score'],
+                    "query_coverage": match['query_coverage'],
+                    "recipe_coverage": match['recipe_coverage'],
+                    "manquants": sorted(missing_names[i] for i in match['manquants'] if i in missing_names),
+                }
+                for match in matches
+            ],
+            "ingredients_inconnus": unknown,
+        }
+
+
+@csrf_exempt
+@require_POST
+async def generate_recipe_stream(request):
+    """
+    Agent IA Chef en streaming (Server-Sent Events), servi par asgi.py.
+    POST /api/v1/recipes/ai-chef/generate/stream/
+    Payload: { "ingredients": ["pomme", "sucre", "farine"] }
+
+    Le titre, la description puis chaque étape sont envoyés dès que la source
+    (settings.AI_CHEF_UPSTREAM) les produit :
+        event: title        data: "Délice aux 3 trésors"
+        event: step         data: {"index": 0, "text": "..."}
+        event: done         data: {"title": ..., "description": ..., "steps": [...]}
+    """
+    try:
+        ingredients = json.loads(request.body or b'{}').get('ingredients', [])
+    except (ValueError, AttributeError):
+        return JsonResponse({"error": "Corps JSON invalide."}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(ingredients, list) or len(ingredients) < 2:
+        return JsonResponse(
+            {"error": "Veuillez fournir au moins 2 ingrédients."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    upstream = get_upstream()
+    if upstream is n8n_recipe_events and not settings.N8N_WEBHOOK_URL:
+        return JsonResponse(
+            {"error": "Configuration serveur incomplète (Webhook URL manquant)."},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    response = StreamingHttpResponse(sse_stream(upstream(ingredients)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # pas de mise en tampon par un proxy nginx
+    return response
@@ -1,4 +1,4 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from .models import FicheTechnique, IngredientPrice
 from .services import CostCalculatorService
 
@@ -45,12 +45,15 @@ class FicheTechniqueAdmin(admin.ModelAdmin):
     def recalculate_costs(self, request, queryset):
         service = CostCalculatorService()
         count = 0
+        warnings = []
         for ft in queryset:
-            # 1. Calcul du coût total
-            new_cost = service.calculate_recipe_cost(ft.recette_fk)
+            # 1. Calcul du coût total (lignes non chiffrables signalées dans 'warnings')
+            new_cost = service.calculate_recipe_cost(ft.recette_fk, warnings=warnings)
             # 2. Mise à jour de la fiche
             ft.cout_matiere_ht = new_cost
             ft.save()
             count += 1
         
+        for warning in dict.fromkeys(warnings):
+            self.message_user(request, warning, level=messages.WARNING)
         self.message_user(request, f"{count} fiches techniques recalculées avec succès.")
\ No newline at end of file
@@ -8,4 +8,8 @@ class TechsheetsConfig(AppConfig):
     # Le nom doit refléter le chemin complet :
     name = 'apps.techsheets' 
     # Le label est l'ancien nom court (ou un nouveau)
-    label = 'techsheets'
\ No newline at end of file
+    label = 'techsheets'
+
+    def ready(self):
+        # Recalcul des coûts à chaque changement de la Mercuriale
+        from . import signals  # noqa: F401
@@ -1,15 +1,22 @@
 import json
 import os
+from collections import Counter
 from django.core.management.base import BaseCommand
-from django.utils.text import slugify
-from apps.techsheets.models import Technique
+from django.db import transaction
+from apps.core.streaming import JSONStreamError, iter_json_file, batched
+from apps.techsheets.services import TechniqueImportService
 
 class Command(BaseCommand):
     help = 'Import culinary dictionary from JSON'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--file', type=str, default=r"C:\Foodypedia\Termes Culinaires.json",
+                            help='Path to the dictionary JSON file ({"techniques": [...]})')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Number of terms read and upserted per batch')
+
     def handle(self, *args, **options):
-        # File path provided by user
-        json_file_path = r"C:\Foodypedia\Termes Culinaires.json"
+        json_file_path = options['file']
         
         if not os.path.exists(json_file_path):
             self.stdout.write(self.style.ERROR(f'File not found: {json_file_path}'))
@@ -17,50 +24,20 @@ class Command(BaseCommand):
 
         self.stdout.write(f'Reading {json_file_path}...')
         
+        service = TechniqueImportService()
+        report = Counter()
         try:
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            techniques_list = data.get('techniques', [])
-            self.stdout.write(f'Found {len(techniques_list)} items.')
-
-            created_count = 0
-            updated_count = 0
+            # Streamed in batches; one set-based upsert per batch, all-or-nothing
+            with transaction.atomic():
+                for batch in batched(iter_json_file(json_file_path, key='techniques'), options['batch_size']):
+                    report.update(service.upsert_dictionary(batch))
 
-            for item in techniques_list:
-                nom = item.get('nom')
-                if not nom:
-                    continue
-                    
-                slug = item.get('slug') or slugify(nom)
-                
-                # Extract fields
-                defaults = {
-                    'domaine': item.get('domaine', 'Cuisine'),
-                    'definition': item.get('definition', ''),
-                    'objectif': item.get('objectif', []),
-                    'principe': item.get('principe', ''),
-                    'exemples': item.get('exemples', {}),
-                    'erreurs_frequentes': item.get('erreurs_frequentes', []),
-                    'niveau': item.get('niveau', []),
-                }
-
-                obj, created = Technique.objects.update_or_create(
-                    slug=slug,
-                    defaults={
-                        'nom': nom,
-                        **defaults
-                    }
-                )
-                
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
-            
-            self.stdout.write(self.style.SUCCESS(f'Import Complete: {created_count} created, {updated_count} updated.'))
+            self.stdout.write(self.style.SUCCESS(
+                f"Import Complete: {report['created']} created, {report['updated']} updated, "
+                f"{report['skipped']} skipped."
+            ))
             
-        except json.JSONDecodeError as e:
+        except (json.JSONDecodeError, JSONStreamError) as e:
             self.stdout.write(self.style.ERROR(f'JSON Error: {e}'))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Error: {e}'))
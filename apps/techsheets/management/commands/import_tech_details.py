@@ -1,49 +1,39 @@
 import json
+from collections import Counter
 from django.core.management.base import BaseCommand
-from apps.techsheets.models import Technique
+from django.db import transaction
+from apps.core.streaming import JSONStreamError, iter_json_file, batched
+from apps.techsheets.services import TechniqueImportService
 
 class Command(BaseCommand):
     help = 'Import Technical Sheets Details (Phases, Materiel) from JSON'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--file', type=str, default='vue_detaillée_techniques.json',
+                            help='Path to the JSON file ({"fiches_techniques_detaillees": [...]})')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of sheets read and updated per batch')
+
     def handle(self, *args, **options):
-        file_path = 'vue_detaillée_techniques.json'
+        file_path = options['file']
         
+        service = TechniqueImportService()
+        report = Counter()
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            items = data.get('fiches_techniques_detaillees', [])
-            count = 0
-            
-            for item in items:
-                slug = item.get('slug')
-                try:
-                    technique = Technique.objects.get(slug=slug)
-                    
-                    # Update fields
-                    technique.reference_id = item.get('reference_cap')
-                    technique.phases = item.get('phases')
-                    technique.materiel = item.get('materiel')
-                    technique.is_active_techsheet = True
-                    
-                    # Deduce Category from Ref ID (Simple heuristic)
-                    ref = item.get('reference_cap', '')
-                    if 'PB' in ref:
-                        technique.categorie_cap = 'BASE'
-                    elif 'C' in ref and 'S' not in ref: # Not fully accurate but a start
-                         technique.categorie_cap = 'CUISSON'
-                    elif 'FS' in ref:
-                        technique.categorie_cap = 'SAUCE'
-                    
-                    technique.save()
-                    count += 1
-                    self.stdout.write(self.style.SUCCESS(f'Updated: {technique.nom}'))
-                    
-                except Technique.DoesNotExist:
-                    self.stdout.write(self.style.WARNING(f'Technique not found for slug: {slug}'))
+            # Streamed in batches; one lookup query + one bulk_update per batch
+            with transaction.atomic():
+                for batch in batched(iter_json_file(file_path, key='fiches_techniques_detaillees'), options['batch_size']):
+                    batch_report = service.apply_details(batch)
+                    for slug in batch_report.pop('missing'):
+                        self.stdout.write(self.style.WARNING(f'Technique not found for slug: {slug}'))
+                    report.update(batch_report)
             
-            self.stdout.write(self.style.SUCCESS(f'Successfully updated {count} techniques.'))
+            self.stdout.write(self.style.SUCCESS(
+                f"Successfully updated {report['updated']} techniques ({report['skipped']} skipped)."
+            ))
             
+        except (json.JSONDecodeError, JSONStreamError) as e:
+            self.stdout.write(self.style.ERROR(f'JSON Error: {e}'))
         except FileNotFoundError:
             self.stdout.write(self.style.ERROR(f'File not found: {file_path}'))
         except Exception as e:
@@ -0,0 +1,86 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from apps.recipes.services import SubRecipeGraph
+from apps.techsheets.models import FicheTechnique
+from apps.techsheets.services import CostPropagationService
+from apps.techsheets.recost import connected_components, build_partitions, init_worker, cost_partition
+
+
+class Command(BaseCommand):
+    help = 'Recompute FicheTechnique.cout_matiere_ht for the whole catalogue (run after each mercuriale import)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes (1 = no pool)')
+        parser.add_argument('--partitions', type=int, default=None,
+                            help='Number of partitions (default: 4 per worker)')
+        parser.add_argument('--top', type=int, default=10,
+                            help='Number of slowest recipes to report')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Compute costs without writing them')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        started = time.perf_counter()
+
+        recipe_ids = list(FicheTechnique.objects.values_list('recette_fk_id', flat=True))
+        if not recipe_ids:
+            self.stdout.write(self.style.WARNING('No technical sheet to recost.'))
+            return
+
+        components = connected_components(recipe_ids, SubRecipeGraph.load().adjacency)
+        partitions = build_partitions(components, options['partitions'] or workers * 4)
+        self.stdout.write(
+            f'{len(recipe_ids)} recipes, {len(components)} components, '
+            f'{len(partitions)} partitions, {workers} worker(s).'
+        )
+
+        costs, timings, warnings = {}, {}, []
+        done = 0
+        for index, (partition_costs, partition_timings, elapsed, partition_warnings) in enumerate(
+                self._run(partitions, workers), 1):
+            costs.update(partition_costs)
+            timings.update(partition_timings)
+            warnings.extend(partition_warnings)
+            done += len(partition_timings)
+            self.stdout.write(
+                f'  [{index}/{len(partitions)}] {len(partition_timings)} recipes in {elapsed:.2f}s '
+                f'({done}/{len(recipe_ids)})'
+            )
+
+        updated = 0
+        if not options['dry_run']:
+            with transaction.atomic():
+                updated = CostPropagationService().write_costs({pk: costs[pk] for pk in recipe_ids})
+
+        total = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Recost complete: {len(recipe_ids)} recipes, {updated} updated in {total:.2f}s '
+            f'({len(recipe_ids) / total:.0f} recipes/s).'
+        ))
+
+        for warning in warnings:
+            self.stdout.write(self.style.WARNING(f'  [!] {warning}'))
+
+        slowest = sorted(timings.items(), key=lambda item: item[1], reverse=True)[:options['top']]
+        if slowest and options['verbosity'] >= 1:
+            self.stdout.write('Slowest recipes:')
+            for recipe_id, seconds in slowest:
+                self.stdout.write(f'  #{recipe_id}: {seconds * 1000:.2f} ms')
+
+    def _run(self, partitions, workers):
+        """Génère les résultats au fur et à mesure (dans l'ordre de fin des partitions)."""
+        if workers == 1 or len(partitions) == 1:
+            for partition in partitions:
+                yield cost_partition(partition)
+            return
+
+        # Les processus fils ne doivent pas réutiliser les connexions ouvertes du parent
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            futures = [pool.submit(cost_partition, partition) for partition in partitions]
+            for future in as_completed(futures):
+                yield future.result()
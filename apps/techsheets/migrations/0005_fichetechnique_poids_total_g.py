@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('techsheets', '0004_technique_categorie_cap_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fichetechnique',
+            name='poids_total_g',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Rendement en poids, utilisé quand la recette sert de sous-recette en g/ml.', max_digits=10, null=True, verbose_name='Poids total produit (g)'),
+        ),
+    ]
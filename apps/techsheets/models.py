@@ -66,6 +66,14 @@ class FicheTechnique(models.Model):
         default=1,
         verbose_name="Nombre de portions standard"
     )
+    poids_total_g = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Poids total produit (g)",
+        help_text="Rendement en poids, utilisé quand la recette sert de sous-recette en g/ml."
+    )
     cout_matiere_ht = models.DecimalField(
         max_digits=10, 
         decimal_places=2, 
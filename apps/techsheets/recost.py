@@ -0,0 +1,66 @@
+# C:\Foodypedia\apps\techsheets\recost.py
+
+"""
+Outils du recalcul complet des coûts (commande recost_techsheets).
+
+Les fonctions exécutées dans le pool de processus n'importent Django qu'à
+l'appel : le module reste importable avant django.setup() (démarrage 'spawn').
+"""
+
+import time
+
+
+def init_worker():
+    """Chaque processus ouvre sa propre connexion (jamais celle héritée du parent)."""
+    import django
+    django.setup()
+    from django.db import connections
+    connections.close_all()
+
+
+def cost_partition(recipe_ids):
+    """
+    Exécuté dans un processus du pool : coûte une partition autonome du graphe.
+    Retourne (coûts, durées par recette, durée totale, avertissements).
+    """
+    from apps.techsheets.services import CostCalculatorService
+    timings, warnings = {}, []
+    started = time.perf_counter()
+    costs = CostCalculatorService().calculate_costs(recipe_ids, timings=timings, warnings=warnings)
+    elapsed = time.perf_counter() - started
+    return costs, {recipe_id: timings.get(recipe_id, 0.0) for recipe_id in recipe_ids}, elapsed, warnings
+
+
+def connected_components(recipe_ids, adjacency):
+    """
+    Composantes connexes (non orientées) du graphe des sous-recettes, limitées
+    aux recettes à recalculer. Deux recettes qui partagent une base (ex: Fond brun)
+    restent dans la même composante : chaque partition se calcule sans les autres.
+    """
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for recipe_id in recipe_ids:
+        find(recipe_id)
+    for node, children in adjacency.items():
+        for child in children:
+            parent[find(node)] = find(child)
+
+    components = {}
+    for recipe_id in recipe_ids:
+        components.setdefault(find(recipe_id), []).append(recipe_id)
+    return list(components.values())
+
+
+def build_partitions(components, count):
+    """Répartit les composantes en 'count' lots de tailles proches (plus grosses d'abord)."""
+    partitions = [[] for _ in range(max(count, 1))]
+    for component in sorted(components, key=len, reverse=True):
+        min(partitions, key=len).extend(component)
+    return [partition for partition in partitions if partition]
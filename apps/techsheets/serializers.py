@@ -17,7 +17,7 @@ class FicheTechniqueSerializer(serializers.ModelSerializer):
         model = FicheTechnique
         fields = [
             'recette_fk', 'recette_titre', 
-            'nombre_portions', 'cout_matiere_ht', 'marge_appliquee', 'cout_par_portion', 'prix_vente_suggere',
+            'nombre_portions', 'poids_total_g', 'cout_matiere_ht', 'marge_appliquee', 'cout_par_portion', 'prix_vente_suggere',
             'validation_admin', 'date_validation', 'materiel_requis_json'
         ]
 
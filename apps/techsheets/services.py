@@ -1,101 +1,495 @@
+import threading
+import time
+from contextlib import contextmanager
 from decimal import Decimal
+from django.db import transaction
+from django.db.models import Q
+from django.utils.text import slugify
+from apps.ingredients.models import Ingredient
 from apps.recipes.models import Recette, QuantiteIngredient
-from apps.techsheets.models import IngredientPrice, FicheTechnique
+from apps.recipes.services import SubRecipeCycleError, SubRecipeGraph
+from apps.techsheets.models import IngredientPrice, FicheTechnique, Technique
+from apps.techsheets.units import ingredient_factor, sub_recipe_factor
 
 class CostCalculatorService:
     """
     Service dédié au calcul du coût matière des recettes.
     Gère la récursion (Recette -> Sous-Recette -> Ingrédient).
+
+    Le graphe des sous-recettes est chargé en quelques requêtes groupées
+    (lignes, mercuriale, fiches techniques) puis parcouru en mémoire dans
+    l'ordre topologique : chaque recette n'est calculée qu'une seule fois,
+    même si elle est partagée par plusieurs recettes parentes (ex: Fond brun).
     """
 
-    def calculate_recipe_cost(self, recipe: Recette) -> Decimal:
+    def calculate_recipe_cost(self, recipe: Recette, warnings=None) -> Decimal:
         """
         Calcule le coût total HT des ingrédients d'une recette.
         """
-        total_cost = Decimal('0.00')
+        return self.calculate_costs([recipe.pk], warnings=warnings)[recipe.pk]
+
+    def calculate_costs(self, recipe_ids=None, timings=None, warnings=None) -> dict:
+        """
+        Mode batch : calcule le coût de plusieurs recettes en une passe.
+        - recipe_ids=None : tout le catalogue.
+        - Sinon : les recettes demandées et leurs sous-recettes (toutes profondeurs).
+        - timings : dict optionnel rempli avec le temps de calcul (s) de chaque recette.
+        - warnings : liste optionnelle complétée des lignes non chiffrables
+          (ex: sous-recette en g sans poids total produit, comptée à 0).
+        Retourne un dict {recette_id: Decimal}.
+        """
+        lines_by_recipe = self._load_lines(recipe_ids)
+        prices, yields = self._load_reference_data(lines_by_recipe)
+
+        # Facteurs de conversion mis en cache par (ingrédient ou sous-recette, unité)
+        factors = {}
+        costs = {}
+        for recipe_id in self._topological_order(lines_by_recipe):
+            started = time.perf_counter()
+            total_cost = Decimal('0.00')
+            for line in lines_by_recipe[recipe_id]:
+                total_cost += self._calculate_line_cost(line, prices, yields, costs, factors, warnings)
+            costs[recipe_id] = total_cost
+            if timings is not None:
+                timings[recipe_id] = time.perf_counter() - started
+
+        if recipe_ids is None:
+            return costs
+        return {recipe_id: costs.get(recipe_id, Decimal('0.00')) for recipe_id in recipe_ids}
+
+    # -----------------------------------------------------
+    # Chargement du graphe
+    # -----------------------------------------------------
+
+    def _load_lines(self, recipe_ids=None) -> dict:
+        """
+        Charge les lignes d'ingrédients, regroupées par recette.
+        Sans filtre : une seule requête. Avec filtre : une requête par niveau
+        de profondeur, pour suivre les sous-recettes.
+        """
+        fields = ('recette_id', 'ingredient_id', 'sub_recipe_id', 'quantite', 'unite')
+        lines_by_recipe = {}
 
-        # Récupérer toutes les lignes d'ingrédients de la recette
-        # Optimisation : prefetch pour éviter N requêtes
-        lignes = recipe.lignes_ingredients.select_related('ingredient__price_info', 'sub_recipe').all()
+        if recipe_ids is None:
+            lines_by_recipe.update({pk: [] for pk in Recette.objects.values_list('pk', flat=True)})
+            for line in QuantiteIngredient.objects.order_by('id').values(*fields):
+                lines_by_recipe.setdefault(line['recette_id'], []).append(line)
+            return lines_by_recipe
 
-        for ligne in lignes:
-            cost_line = self._calculate_line_cost(ligne)
-            total_cost += cost_line
+        frontier = set(recipe_ids)
+        while frontier:
+            lines_by_recipe.update({pk: [] for pk in frontier})
+            next_frontier = set()
+            for line in QuantiteIngredient.objects.filter(recette_id__in=frontier).order_by('id').values(*fields):
+                lines_by_recipe[line['recette_id']].append(line)
+                sub_id = line['sub_recipe_id']
+                if sub_id and sub_id not in lines_by_recipe:
+                    next_frontier.add(sub_id)
+            frontier = next_frontier
+        return lines_by_recipe
 
-        return total_cost
+    def _load_reference_data(self, lines_by_recipe: dict):
+        """Mercuriale des ingrédients utilisés et rendements des fiches techniques (deux requêtes)."""
+        ingredient_ids = {
+            line['ingredient_id']
+            for lines in lines_by_recipe.values() for line in lines
+            if line['ingredient_id']
+        }
+        prices = {
+            row['ingredient_id']: row
+            for row in IngredientPrice.objects.filter(ingredient_id__in=ingredient_ids)
+                                              .values('ingredient_id', 'average_price', 'unit', 'ingredient__specific_data')
+        }
+        yields = {
+            row['recette_fk_id']: row
+            for row in FicheTechnique.objects.filter(recette_fk_id__in=lines_by_recipe.keys())
+                                             .values('recette_fk_id', 'nombre_portions', 'poids_total_g')
+        }
+        return prices, yields
 
-    def _calculate_line_cost(self, ligne: QuantiteIngredient) -> Decimal:
+    def _topological_order(self, lines_by_recipe: dict) -> list:
+        """
+        Ordre de calcul : chaque sous-recette avant les recettes qui l'utilisent.
+        Parcours en profondeur itératif (pas de limite de récursion Python).
+        """
+        order = []
+        state = {}  # 1 = en cours, 2 = terminé
+        for start in lines_by_recipe:
+            if start in state:
+                continue
+            stack = [(start, iter(self._sub_recipe_ids(lines_by_recipe, start)))]
+            state[start] = 1
+            while stack:
+                node, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    state[node] = 2
+                    order.append(node)
+                elif state.get(child) == 1:
+                    raise SubRecipeCycleError(f"Cycle détecté dans les sous-recettes (recette {child}).")
+                elif child not in state:
+                    state[child] = 1
+                    stack.append((child, iter(self._sub_recipe_ids(lines_by_recipe, child))))
+        return order
+
+    @staticmethod
+    def _sub_recipe_ids(lines_by_recipe: dict, recipe_id) -> list:
+        return [line['sub_recipe_id'] for line in lines_by_recipe.get(recipe_id, []) if line['sub_recipe_id']]
+
+    # -----------------------------------------------------
+    # Calcul par ligne
+    # -----------------------------------------------------
+
+    def _calculate_line_cost(self, line: dict, prices: dict, yields: dict, costs: dict, factors: dict,
+                             warnings=None) -> Decimal:
         """Coût d'une ligne (Ingrédient OU Sous-recette)"""
-        qty = Decimal(str(ligne.quantite)) if ligne.quantite else Decimal('0')
-        
+        qty = Decimal(str(line['quantite'])) if line['quantite'] else Decimal('0')
+
         # CAS 1 : C'est un Ingrédient Brut
-        if ligne.ingredient:
-            return self._get_ingredient_cost(ligne.ingredient, qty, ligne.unite)
-        
-        # CAS 2 : C'est une Sous-Recette
-        elif ligne.sub_recipe:
-            return self._get_sub_recipe_cost(ligne.sub_recipe, qty, ligne.unite)
+        if line['ingredient_id']:
+            price_info = prices.get(line['ingredient_id'])
+            if price_info is None:
+                # Si pas de prix, on retourne 0 (ou on pourrait logguer un warning)
+                return Decimal('0.00')
+            key = ('ingredient', line['ingredient_id'], line['unite'])
+            if key not in factors:
+                factors[key] = ingredient_factor(
+                    line['unite'], price_info['unit'], price_info['ingredient__specific_data']
+                )
+                if factors[key] is None and warnings is not None:
+                    warnings.append(
+                        f"Ingrédient {line['ingredient_id']} utilisé en '{line['unite']}' sans conversion "
+                        f"vers son unité d'achat ({price_info['unit']}) : ligne comptée à 0."
+                    )
+            if factors[key] is None:
+                return Decimal('0.00')
+            return self._get_ingredient_cost(price_info['average_price'], qty, factors[key])
+
+        # CAS 2 : C'est une Sous-Recette (déjà calculée grâce à l'ordre topologique)
+        elif line['sub_recipe_id']:
+            sub_id = line['sub_recipe_id']
+            key = ('sub_recipe', sub_id, line['unite'])
+            if key not in factors:
+                rendement = yields.get(sub_id, {})
+                factors[key] = sub_recipe_factor(
+                    line['unite'], rendement.get('nombre_portions', 1), rendement.get('poids_total_g')
+                )
+                if factors[key] is None and warnings is not None:
+                    warnings.append(
+                        f"Sous-recette {sub_id} utilisée en '{line['unite']}' sans poids total produit "
+                        f"(FicheTechnique.poids_total_g) : ligne comptée à 0."
+                    )
+            if factors[key] is None:
+                return Decimal('0.00')
+            return self._get_sub_recipe_cost(costs[sub_id], qty, factors[key])
 
         return Decimal('0.00')
 
-    def _get_ingredient_cost(self, ingredient, qty: Decimal, unit: str) -> Decimal:
-        """
-        Récupère le prix dans la Mercuriale et calcule le montant.
-        NOTE: Simplification des conversions d'unités pour cette version (1L = 1kg = 1000g).
-        """
-        try:
-            price_info = ingredient.price_info
-        except IngredientPrice.DoesNotExist:
-            # Si pas de prix, on retourne 0 (ou on pourrait logguer un warning)
-            return Decimal('0.00')
-
-        base_price = price_info.average_price # Prix au kg ou à l'unité
-        base_unit = price_info.unit # 'kg', 'l', 'unit'
-
-        # Logique de conversion simple
-        factor = Decimal('1')
-
-        # Si achat au kg et utilisation en g -> /1000
-        if base_unit in ['kg', 'l'] and unit.lower() in ['g', 'ml', 'gr']:
-            factor = Decimal('0.001')
-        
-        # Si achat au kg et utilisation en kg -> 1
-        # Si achat unité et utilisation unité -> 1
-
-        cost = base_price * qty * factor
-        return cost
-
-    def _get_sub_recipe_cost(self, sub_recipe: Recette, qty: Decimal, unit: str) -> Decimal:
-        """
-        Calcule le coût d'une sous-recette utilisée.
-        Il faut connaître le coût total de la sous-recette ET son rendement (nb portions ou poids total).
-        Pour simplifier ici : on considère que la quantité demandée est un % du totals.
-        MAIS pour être précis, il faudrait que FicheTechnique stocke le "Poids Total" de la recette.
-        
-        APPROCHE SIMPLIFIÉE V1 :
-        On considère que 'qty' représente le nombre de portions si l'unité est 'portion' ou 'uni'.
-        Ou on recalcule tout dynamiquement.
-        """
-        # 1. Calculer le coût total de fabrication de la sous-recette (Récursion)
-        # Idéalement, on lit le cache dans FicheTechnique pour éviter boucle infinie si stocké
-        # Mais pour être "temps réel", on recalcule.
-        total_sub_cost = self.calculate_recipe_cost(sub_recipe)
-
-        # 2. Ramener à la quantité utilisée
-        # Pour faire simple : Si on utilise '1' unité, on prend le coût total / nb portions
-        # Cette partie nécessiterait un champ "Poids Total" sur la Recette/FicheTechnique pour être exacte en grammes.
-        
-        try:
-            ft = sub_recipe.fiche_technique
-            nb_portions = ft.nombre_portions
-        except FicheTechnique.DoesNotExist:
-            nb_portions = 1
-        
-        if nb_portions == 0: nb_portions = 1
-        
-        cost_per_portion = total_sub_cost / Decimal(nb_portions)
-        
-        # Si on demande en "g", c'est complexe sans poids total.
-        # On assume ici que qty = nombre de portions (ex: 1 Fond de tarte)
-        
-        return cost_per_portion * qty
+    def _get_ingredient_cost(self, base_price: Decimal, qty: Decimal, factor: Decimal) -> Decimal:
+        """
+        Montant d'une ligne : prix Mercuriale (au kg, au litre ou à la pièce)
+        x quantité convertie dans l'unité d'achat (voir units.ingredient_factor).
+        """
+        return base_price * qty * factor
+
+    def _get_sub_recipe_cost(self, total_sub_cost: Decimal, qty: Decimal, factor: Decimal) -> Decimal:
+        """
+        Ramène le coût total d'une sous-recette à la quantité utilisée.
+        Le facteur vient du rendement de la FicheTechnique : poids total produit
+        pour une quantité en g/ml, sinon nombre de portions (voir units.sub_recipe_factor).
+        """
+        return total_sub_cost * qty * factor
+
+
+class RecipeScalingService:
+    """
+    Déclinaison d'une fiche technique en plusieurs nombres de couverts.
+    L'arbre des sous-recettes est aplati une seule fois en une liste
+    d'ingrédients bruts (quantité et coût pour une fournée) ; chaque cible
+    n'est ensuite qu'une multiplication de ces deux vecteurs par un scalaire.
+    """
+
+    def __init__(self, calculator=None):
+        self.calculator = calculator or CostCalculatorService()
+
+    def flatten_recipe(self, recipe_id) -> list:
+        """
+        Ingrédients bruts d'une fournée de la recette, sous-recettes comprises,
+        regroupés par (ingrédient, unité) : [{'ingredient', 'unite', 'quantite', 'cout'}].
+        """
+        calculator = self.calculator
+        lines_by_recipe = calculator._load_lines([recipe_id])
+        prices, yields = calculator._load_reference_data(lines_by_recipe)
+
+        flat = {}
+        for current_id in calculator._topological_order(lines_by_recipe):
+            totals = {}
+            for line in lines_by_recipe[current_id]:
+                qty = Decimal(str(line['quantite'])) if line['quantite'] else Decimal('0')
+                if line['ingredient_id']:
+                    key = (line['ingredient_id'], line['unite'])
+                    totals[key] = totals.get(key, Decimal('0')) + qty
+                elif line['sub_recipe_id']:
+                    sub_id = line['sub_recipe_id']
+                    rendement = yields.get(sub_id, {})
+                    factor = sub_recipe_factor(
+                        line['unite'], rendement.get('nombre_portions', 1), rendement.get('poids_total_g')
+                    )
+                    if factor is None:
+                        # Quantité non convertible (pas de poids total produit) : ignorée
+                        continue
+                    share = qty * factor
+                    for key, sub_qty in flat[sub_id].items():
+                        totals[key] = totals.get(key, Decimal('0')) + sub_qty * share
+            flat[current_id] = totals
+
+        rows = []
+        for (ingredient_id, unite), qty in flat[recipe_id].items():
+            price_info = prices.get(ingredient_id)
+            cost = Decimal('0.00')
+            if price_info is not None:
+                factor = ingredient_factor(unite, price_info['unit'], price_info['ingredient__specific_data'])
+                # Quantité non convertible vers l'unité d'achat : non chiffrée
+                if factor is not None:
+                    cost = calculator._get_ingredient_cost(price_info['average_price'], qty, factor)
+            rows.append({'ingredient': ingredient_id, 'unite': unite, 'quantite': qty, 'cout': cost})
+        return rows
+
+    def scale(self, fiche: FicheTechnique, targets) -> dict:
+        """Quantités et coûts de la fiche pour chaque nombre de portions demandé."""
+        rows = self.flatten_recipe(fiche.recette_fk_id)
+        names = dict(Ingredient.objects.filter(id__in={row['ingredient'] for row in rows}).values_list('id', 'name'))
+
+        base_portions = fiche.nombre_portions or 1
+        quantities = [row['quantite'] for row in rows]
+        costs = [row['cout'] for row in rows]
+        batch_cost = sum(costs, Decimal('0.00'))
+
+        resultats = []
+        for target in targets:
+            ratio = Decimal(target) / Decimal(base_portions)
+            scaled_quantities = [qty * ratio for qty in quantities]
+            scaled_costs = [cost * ratio for cost in costs]
+            cout_total = batch_cost * ratio
+            resultats.append({
+                'portions': target,
+                'facteur': float(ratio),
+                'cout_total_ht': float(round(cout_total, 2)),
+                'cout_par_portion': float(round(cout_total / Decimal(target), 2)),
+                'ingredients': [
+                    {
+                        'ingredient': row['ingredient'],
+                        'nom': names.get(row['ingredient'], ''),
+                        'quantite': float(round(qty, 3)),
+                        'unite': row['unite'],
+                        'cout_ht': float(round(cost, 2)),
+                    }
+                    for row, qty, cost in zip(rows, scaled_quantities, scaled_costs)
+                ],
+            })
+
+        return {
+            'recette': fiche.recette_fk_id,
+            'nombre_portions': base_portions,
+            'cout_fournee_ht': float(round(batch_cost, 2)),
+            'resultats': resultats,
+        }
+
+
+class CostPropagationService:
+    """
+    Recalcul incrémental de FicheTechnique.cout_matiere_ht après un changement
+    de Mercuriale : seules les recettes impactées sont recalculées.
+
+    Index inverse : ingrédient -> recettes qui l'utilisent (une requête)
+    -> recettes parentes via le graphe des sous-recettes (en cache).
+    """
+
+    def __init__(self, calculator=None):
+        self.calculator = calculator or CostCalculatorService()
+
+    def find_affected_recipes(self, ingredient_ids) -> set:
+        direct = set(
+            QuantiteIngredient.objects.filter(ingredient_id__in=ingredient_ids)
+                                      .values_list('recette_id', flat=True)
+        )
+        if not direct:
+            return set()
+        return direct | SubRecipeGraph.load().ancestors(direct)
+
+    def propagate_price_changes(self, ingredient_ids) -> int:
+        """Recalcule les recettes impactées par ces ingrédients. Retourne le nombre de fiches mises à jour."""
+        return self.recost_recipes(self.find_affected_recipes(ingredient_ids))
+
+    def recost_recipes(self, recipe_ids) -> int:
+        """
+        Recalcule en une passe les recettes données et écrit les coûts
+        qui ont changé avec un seul bulk_update.
+        """
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return 0
+
+        return self.write_costs(self.calculator.calculate_costs(recipe_ids))
+
+    def write_costs(self, costs: dict) -> int:
+        """Enregistre les coûts {recette_id: Decimal} qui ont changé (un seul bulk_update)."""
+        fiches = list(FicheTechnique.objects.filter(recette_fk_id__in=costs.keys()).only('recette_fk_id', 'cout_matiere_ht'))
+
+        to_update = []
+        for fiche in fiches:
+            new_cost = costs[fiche.recette_fk_id].quantize(Decimal('0.01'))
+            if fiche.cout_matiere_ht != new_cost:
+                fiche.cout_matiere_ht = new_cost
+                to_update.append(fiche)
+
+        FicheTechnique.objects.bulk_update(to_update, ['cout_matiere_ht'], batch_size=500)
+        return len(to_update)
+
+
+class TechniqueImportService:
+    """
+    Import ensembliste du dictionnaire technique (import_dictionary) et des
+    fiches détaillées (import_tech_details), lot par lot.
+
+    Par lot : une requête pour l'existant, slugs préparés en Python, puis
+    bulk_create(update_conflicts=True) / bulk_update. Les rapports sont des
+    dicts de compteurs {'created', 'updated', 'skipped'}.
+    """
+    DICTIONARY_FIELDS = ['nom', 'domaine', 'definition', 'objectif', 'principe', 'exemples', 'erreurs_frequentes', 'niveau']
+    DETAIL_FIELDS = ['reference_id', 'phases', 'materiel', 'is_active_techsheet', 'categorie_cap']
+    BATCH_SIZE = 500
+
+    def upsert_dictionary(self, items) -> dict:
+        report = {'created': 0, 'updated': 0, 'skipped': 0}
+
+        # Dernière occurrence gagnante pour un même slug (comme des update_or_create successifs)
+        by_slug = {}
+        for item in items:
+            nom = item.get('nom') if isinstance(item, dict) else None
+            slug = (item.get('slug') or slugify(nom)) if nom else ''
+            if not slug:
+                report['skipped'] += 1
+                continue
+            if slug in by_slug:
+                report['skipped'] += 1
+            by_slug[slug] = item
+        if not by_slug:
+            return report
+
+        noms = {item['nom'] for item in by_slug.values()}
+        existing = dict(
+            Technique.objects.filter(Q(slug__in=by_slug.keys()) | Q(nom__in=noms)).values_list('slug', 'nom')
+        )
+        slug_by_nom = {nom: slug for slug, nom in existing.items()}
+
+        techniques = []
+        for slug, item in by_slug.items():
+            owner = slug_by_nom.get(item['nom'])
+            if owner is not None and owner != slug:
+                # 'nom' est unique : déjà porté par une autre technique
+                report['skipped'] += 1
+                continue
+            slug_by_nom[item['nom']] = slug
+            techniques.append(Technique(
+                slug=slug,
+                nom=item['nom'],
+                domaine=item.get('domaine', 'Cuisine'),
+                definition=item.get('definition', ''),
+                objectif=item.get('objectif', []),
+                principe=item.get('principe', ''),
+                exemples=item.get('exemples', {}),
+                erreurs_frequentes=item.get('erreurs_frequentes', []),
+                niveau=item.get('niveau', []),
+            ))
+            report['updated' if slug in existing else 'created'] += 1
+
+        Technique.objects.bulk_create(
+            techniques,
+            update_conflicts=True,
+            unique_fields=['slug'],
+            update_fields=self.DICTIONARY_FIELDS,
+            batch_size=self.BATCH_SIZE,
+        )
+        return report
+
+    def apply_details(self, items) -> dict:
+        """Complète les techniques existantes (phases, matériel, réf. CAP). 'missing' liste les slugs inconnus."""
+        report = {'created': 0, 'updated': 0, 'skipped': 0, 'missing': []}
+        items = [item for item in items if isinstance(item, dict)]
+        techniques = Technique.objects.in_bulk({item.get('slug') for item in items} - {None}, field_name='slug')
+
+        to_update = {}
+        for item in items:
+            technique = techniques.get(item.get('slug'))
+            if technique is None:
+                report['skipped'] += 1
+                report['missing'].append(item.get('slug'))
+                continue
+            technique.reference_id = item.get('reference_cap')
+            technique.phases = item.get('phases') or []
+            technique.materiel = item.get('materiel') or []
+            technique.is_active_techsheet = True
+            technique.categorie_cap = self._categorie_cap(item.get('reference_cap') or '', technique.categorie_cap)
+            to_update[technique.pk] = technique
+
+        Technique.objects.bulk_update(list(to_update.values()), self.DETAIL_FIELDS, batch_size=self.BATCH_SIZE)
+        report['updated'] = len(to_update)
+        return report
+
+    @staticmethod
+    def _categorie_cap(ref, current):
+        # Déduction de la catégorie depuis la référence CAP (heuristique simple)
+        if 'PB' in ref:
+            return 'BASE'
+        if 'C' in ref and 'S' not in ref:  # Not fully accurate but a start
+            return 'CUISSON'
+        if 'FS' in ref:
+            return 'SAUCE'
+        return current
+
+
+# -----------------------------------------------------
+# Déclenchement (signaux IngredientPrice)
+# -----------------------------------------------------
+
+_deferred = threading.local()
+
+
+def schedule_price_propagation(ingredient_id):
+    """
+    Appelé à chaque écriture de prix. Hors contexte deferred_cost_propagation(),
+    le recalcul est lancé après le commit de la transaction en cours.
+    """
+    pending = getattr(_deferred, 'ingredient_ids', None)
+    if pending is not None:
+        pending.add(ingredient_id)
+        return
+    transaction.on_commit(lambda: CostPropagationService().propagate_price_changes([ingredient_id]))
+
+
+@contextmanager
+def deferred_cost_propagation():
+    """
+    Regroupe les recalculs d'un lot de mises à jour de prix (ex: import de la
+    Mercuriale du jour) en un seul passage à la sortie du bloc :
+
+        with deferred_cost_propagation():
+            for price in prices:
+                price.save()
+    """
+    if getattr(_deferred, 'ingredient_ids', None) is not None:
+        # Bloc imbriqué : c'est le bloc englobant qui recalculera
+        yield
+        return
+
+    _deferred.ingredient_ids = set()
+    try:
+        yield
+        ingredient_ids = _deferred.ingredient_ids
+    finally:
+        _deferred.ingredient_ids = None
+
+    if ingredient_ids:
+        transaction.on_commit(lambda: CostPropagationService().propagate_price_changes(ingredient_ids))
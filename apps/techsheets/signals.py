@@ -0,0 +1,13 @@
+# C:\Foodypedia\apps\techsheets\signals.py
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import IngredientPrice
+from .services import schedule_price_propagation
+
+
+@receiver(post_save, sender=IngredientPrice)
+@receiver(post_delete, sender=IngredientPrice)
+def propagate_price_change(sender, instance, **kwargs):
+    """Un prix modifié ou supprimé déclenche le recalcul des recettes qui l'utilisent."""
+    schedule_price_propagation(instance.ingredient_id)
@@ -1,9 +1,20 @@
+import json
+import multiprocessing
+import os
+import tempfile
 from decimal import Decimal
-from django.test import TestCase
+from io import StringIO
+from unittest import skipUnless
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from django.test import TestCase, SimpleTestCase
 from apps.ingredients.models import Ingredient, IngredientCategory
 from apps.recipes.models import Recette, QuantiteIngredient, RecipeCategory
-from apps.techsheets.models import IngredientPrice, FicheTechnique
-from apps.techsheets.services import CostCalculatorService
+from apps.techsheets.models import IngredientPrice, FicheTechnique, Technique
+from apps.recipes.services import SubRecipeCycleError
+from apps.techsheets.units import parse_unit, ingredient_factor, sub_recipe_factor, MASS, VOLUME, PIECE, UNKNOWN
+from apps.techsheets.recost import connected_components, build_partitions
+from apps.techsheets.services import CostCalculatorService, CostPropagationService, deferred_cost_propagation
 
 class CostCalculatorTests(TestCase):
     def setUp(self):
@@ -68,3 +79,342 @@ class CostCalculatorTests(TestCase):
         # Sous-recette (3.50€) + Beurre (1.00€) = 4.50€
         cost = self.service.calculate_recipe_cost(tarte)
         self.assertEqual(cost, Decimal('4.50'))
+
+    def test_batch_costs_shared_sub_recipe(self):
+        """Test du mode batch : une base partagée n'est calculée qu'une fois"""
+        # Fond brun : 1kg Beurre = 10€ pour 4 portions (2.50€ / portion)
+        fond = Recette.objects.create(titre="Fond brun", category=self.cat_rec)
+        QuantiteIngredient.objects.create(recette=fond, ingredient=self.beurre, quantite=1, unite='kg')
+        FicheTechnique.objects.create(recette_fk=fond, nombre_portions=4)
+
+        # Deux sauces utilisant le fond brun, dont une imbriquée
+        sauce = Recette.objects.create(titre="Sauce Bordelaise", category=self.cat_rec)
+        QuantiteIngredient.objects.create(recette=sauce, sub_recipe=fond, quantite=2, unite='port')
+        plat = Recette.objects.create(titre="Entrecôte Bordelaise", category=self.cat_rec)
+        QuantiteIngredient.objects.create(recette=plat, sub_recipe=sauce, quantite=1, unite='port')
+        QuantiteIngredient.objects.create(recette=plat, sub_recipe=fond, quantite=1, unite='port')
+        QuantiteIngredient.objects.create(recette=plat, ingredient=self.farine, quantite=500, unite='g')
+
+        # Lignes + Recettes + Mercuriale + Fiches techniques
+        with self.assertNumQueries(4):
+            costs = self.service.calculate_costs()
+
+        self.assertEqual(costs[fond.id], Decimal('10.00'))
+        self.assertEqual(costs[sauce.id], Decimal('5.00'))
+        # Sauce (5€) + 1 portion de fond (2.50€) + 500g farine (1€)
+        self.assertEqual(costs[plat.id], Decimal('8.50'))
+        self.assertEqual(self.service.calculate_recipe_cost(plat), costs[plat.id])
+
+    def test_batch_costs_subset(self):
+        """Test du mode batch restreint à quelques recettes"""
+        pate = Recette.objects.create(titre="Pâte", category=self.cat_rec)
+        QuantiteIngredient.objects.create(recette=pate, ingredient=self.farine, quantite=500, unite='g')
+        autre = Recette.objects.create(titre="Autre", category=self.cat_rec)
+        QuantiteIngredient.objects.create(recette=autre, ingredient=self.beurre, quantite=1, unite='kg')
+
+        costs = self.service.calculate_costs([pate.id])
+        self.assertEqual(costs, {pate.id: Decimal('1.00')})
+
+    def test_sub_recipe_by_weight(self):
+        """Test d'une sous-recette utilisée en grammes (rendement en poids connu)"""
+        # Pâte : 3.50€ pour 800g produits
+        pate = Recette.objects.create(titre="Pâte", category=self.cat_rec)
+        QuantiteIngredient.objects.create(recette=pate, ingredient=self.farine, quantite=500, unite='g')
+        QuantiteIngredient.objects.create(recette=pate, ingredient=self.beurre, quantite=250, unite='g')
+        FicheTechnique.objects.create(recette_fk=pate, nombre_portions=2, poids_total_g=Decimal('800'))
+
+        tarte = Recette.objects.create(titre="Tarte", category=self.cat_rec)
+        QuantiteIngredient.objects.create(recette=tarte, sub_recipe=pate, quantite=200, unite='g')
+
+        # 200g / 800g * 3.50€ = 0.875€
+        self.assertEqual(self.service.calculate_recipe_cost(tarte), Decimal('0.875'))
+
+    def test_sub_recipe_by_weight_without_yield_is_reported(self):
+        """Test : sous-recette en grammes sans poids total produit -> ligne à 0 et avertissement"""
+        pate = Recette.objects.create(titre="Pâte", category=self.cat_rec)
+        QuantiteIngredient.objects.create(recette=pate, ingredient=self.farine, quantite=500, unite='g')
+        FicheTechnique.objects.create(recette_fk=pate, nombre_portions=2)
+
+        tarte = Recette.objects.create(titre="Tarte", category=self.cat_rec)
+        QuantiteIngredient.objects.create(recette=tarte, sub_recipe=pate, quantite=200, unite='g')
+        QuantiteIngredient.objects.create(recette=tarte, ingredient=self.farine, quantite=100, unite='g')
+
+        warnings = []
+        # Seule la farine directe est chiffrée (et non 200 portions de pâte)
+        self.assertEqual(self.service.calculate_recipe_cost(tarte, warnings=warnings), Decimal('0.2'))
+        self.assertEqual(len(warnings), 1)
+        self.assertIn(f"Sous-recette {pate.id}", warnings[0])
+
+    def test_ingredient_without_conversion_is_reported(self):
+        """Test : ingrédient en pièces acheté au kg sans poids de pièce -> ligne à 0 et avertissement"""
+        tarte = Recette.objects.create(titre="Tarte", category=self.cat_rec)
+        QuantiteIngredient.objects.create(recette=tarte, ingredient=self.beurre, quantite=2, unite='pièces')
+        QuantiteIngredient.objects.create(recette=tarte, ingredient=self.farine, quantite=3, unite='pincées')
+        QuantiteIngredient.objects.create(recette=tarte, ingredient=self.farine, quantite=100, unite='g')
+
+        warnings = []
+        # Seuls les 100g de farine sont chiffrés (et non 2 kg de beurre + 3 kg de farine)
+        self.assertEqual(self.service.calculate_recipe_cost(tarte, warnings=warnings), Decimal('0.2'))
+        self.assertEqual(len(warnings), 2)
+        self.assertIn(f"Ingrédient {self.beurre.id} utilisé en 'pièces'", warnings[0])
+        self.assertIn(f"Ingrédient {self.farine.id} utilisé en 'pincées'", warnings[1])
+
+    def test_cycle_does_not_recurse_forever(self):
+        """Test : un cycle en base lève une erreur au lieu d'un RecursionError"""
+        a = Recette.objects.create(titre="A", category=self.cat_rec)
+        b = Recette.objects.create(titre="B", category=self.cat_rec)
+        # Écriture directe, sans passer par clean()
+        QuantiteIngredient.objects.create(recette=a, sub_recipe=b, quantite=1)
+        QuantiteIngredient.objects.create(recette=b, sub_recipe=a, quantite=1)
+
+        with self.assertRaises(SubRecipeCycleError):
+            self.service.calculate_recipe_cost(a)
+
+
+class CostPropagationTests(TestCase):
+    def setUp(self):
+        self.cat_ing = IngredientCategory.objects.create(name="TestCat", slug="test-cat")
+        self.beurre = Ingredient.objects.create(name="Beurre", slug="beurre", category=self.cat_ing)
+        self.farine = Ingredient.objects.create(name="Farine", slug="farine", category=self.cat_ing)
+        self.price_beurre = IngredientPrice.objects.create(ingredient=self.beurre, average_price=Decimal('10.00'), unit='kg')
+        self.price_farine = IngredientPrice.objects.create(ingredient=self.farine, average_price=Decimal('2.00'), unit='kg')
+
+        # Pâte (beurre + farine) -> Tarte (pâte) ; Pain (farine seule)
+        self.pate = Recette.objects.create(titre="Pâte")
+        QuantiteIngredient.objects.create(recette=self.pate, ingredient=self.beurre, quantite=250, unite='g')
+        QuantiteIngredient.objects.create(recette=self.pate, ingredient=self.farine, quantite=500, unite='g')
+        self.tarte = Recette.objects.create(titre="Tarte")
+        QuantiteIngredient.objects.create(recette=self.tarte, sub_recipe=self.pate, quantite=1, unite='port')
+        self.pain = Recette.objects.create(titre="Pain")
+        QuantiteIngredient.objects.create(recette=self.pain, ingredient=self.farine, quantite=1, unite='kg')
+
+        for recette in (self.pate, self.tarte, self.pain):
+            FicheTechnique.objects.create(recette_fk=recette, nombre_portions=1)
+
+        self.service = CostPropagationService()
+
+    def test_affected_recipes_follow_super_recipes(self):
+        """Le beurre impacte la pâte et la tarte, pas le pain"""
+        affected = self.service.find_affected_recipes([self.beurre.id])
+        self.assertEqual(affected, {self.pate.id, self.tarte.id})
+
+    def test_price_change_recosts_affected_sheets(self):
+        """Un changement de prix met à jour les fiches concernées après commit"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.price_beurre.average_price = Decimal('20.00')
+            self.price_beurre.save()
+
+        # Pâte : 0.25kg * 20€ + 0.5kg * 2€ = 6€
+        self.assertEqual(FicheTechnique.objects.get(pk=self.pate.id).cout_matiere_ht, Decimal('6.00'))
+        self.assertEqual(FicheTechnique.objects.get(pk=self.tarte.id).cout_matiere_ht, Decimal('6.00'))
+        self.assertEqual(FicheTechnique.objects.get(pk=self.pain.id).cout_matiere_ht, Decimal('0.00'))
+
+    def test_deferred_propagation_runs_once(self):
+        """Un lot de prix ne déclenche qu'un seul recalcul groupé"""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with deferred_cost_propagation():
+                self.price_beurre.average_price = Decimal('20.00')
+                self.price_beurre.save()
+                self.price_farine.average_price = Decimal('4.00')
+                self.price_farine.save()
+        self.assertEqual(len(callbacks), 1)
+
+        # Pâte : 5€ + 2€ ; Pain : 4€
+        self.assertEqual(FicheTechnique.objects.get(pk=self.tarte.id).cout_matiere_ht, Decimal('7.00'))
+        self.assertEqual(FicheTechnique.objects.get(pk=self.pain.id).cout_matiere_ht, Decimal('4.00'))
+
+
+class UnitConversionTests(SimpleTestCase):
+    def test_parse_unit_aliases(self):
+        """Libellés libres normalisés en unités canoniques"""
+        self.assertEqual(parse_unit('Gr'), (MASS, Decimal('1')))
+        self.assertEqual(parse_unit('kg'), (MASS, Decimal('1000')))
+        self.assertEqual(parse_unit('cl'), (VOLUME, Decimal('10')))
+        self.assertEqual(parse_unit('c. à s.'), (VOLUME, Decimal('15')))
+        self.assertEqual(parse_unit('cuillères à café'), (VOLUME, Decimal('5')))
+        self.assertEqual(parse_unit('pièces'), (PIECE, Decimal('1')))
+        self.assertEqual(parse_unit('pincée').dimension, UNKNOWN)
+
+    def test_ingredient_factor(self):
+        """Conversions vers l'unité d'achat (kg, l, pièce)"""
+        self.assertEqual(ingredient_factor('g', 'kg'), Decimal('0.001'))
+        self.assertEqual(ingredient_factor('dl', 'l'), Decimal('0.1'))
+        # Huile : densité 0.92 g/ml -> 1 litre = 0.92 kg
+        self.assertEqual(ingredient_factor('l', 'kg', {'densite': '0.92'}), Decimal('0.92'))
+        # Oeuf de 60g acheté au kg
+        self.assertEqual(ingredient_factor('pièce', 'kg', {'poids_piece_g': 60}), Decimal('0.06'))
+        # Oeufs achetés à la pièce, utilisés en grammes
+        self.assertEqual(ingredient_factor('g', 'unit', {'poids_piece_g': 60}), Decimal('1') / Decimal('60'))
+        # Conversion impossible : rien n'est deviné
+        self.assertIsNone(ingredient_factor('pièce', 'kg'))
+        self.assertIsNone(ingredient_factor('g', 'unit'))
+        self.assertIsNone(ingredient_factor('pincée', 'kg'))
+        self.assertIsNone(ingredient_factor('portion', 'kg'))
+
+    def test_sub_recipe_factor(self):
+        """Sous-recette en portions ou au poids si le rendement est connu"""
+        self.assertEqual(sub_recipe_factor('port', 4), Decimal('0.25'))
+        # Au poids sans poids total produit : conversion inconnue
+        self.assertIsNone(sub_recipe_factor('g', 4))
+        self.assertEqual(sub_recipe_factor('kg', 4, Decimal('2000')), Decimal('0.5'))
+
+
+class RecostCommandTests(TestCase):
+    def setUp(self):
+        self.cat_ing = IngredientCategory.objects.create(name="TestCat", slug="test-cat")
+        self.beurre = Ingredient.objects.create(name="Beurre", slug="beurre", category=self.cat_ing)
+        IngredientPrice.objects.create(ingredient=self.beurre, average_price=Decimal('10.00'), unit='kg')
+
+        self.fond = Recette.objects.create(titre="Fond")
+        QuantiteIngredient.objects.create(recette=self.fond, ingredient=self.beurre, quantite=100, unite='g')
+        self.sauce = Recette.objects.create(titre="Sauce")
+        QuantiteIngredient.objects.create(recette=self.sauce, sub_recipe=self.fond, quantite=2, unite='port')
+        self.seul = Recette.objects.create(titre="Seul")
+        QuantiteIngredient.objects.create(recette=self.seul, ingredient=self.beurre, quantite=1, unite='kg')
+        for recette in (self.fond, self.sauce, self.seul):
+            FicheTechnique.objects.create(recette_fk=recette, nombre_portions=1)
+
+    def test_components_keep_shared_bases_together(self):
+        """Les recettes liées par une sous-recette restent dans la même partition"""
+        adjacency = {self.sauce.id: {self.fond.id}}
+        components = connected_components([self.fond.id, self.sauce.id, self.seul.id], adjacency)
+        self.assertEqual(sorted(sorted(c) for c in components), sorted([sorted([self.fond.id, self.sauce.id]), [self.seul.id]]))
+        self.assertEqual(len(build_partitions(components, 4)), 2)
+
+    def test_recost_command(self):
+        """La commande recalcule et enregistre tout le catalogue"""
+        out = StringIO()
+        call_command('recost_techsheets', workers=1, stdout=out)
+
+        self.assertEqual(FicheTechnique.objects.get(pk=self.fond.id).cout_matiere_ht, Decimal('1.00'))
+        self.assertEqual(FicheTechnique.objects.get(pk=self.sauce.id).cout_matiere_ht, Decimal('2.00'))
+        self.assertEqual(FicheTechnique.objects.get(pk=self.seul.id).cout_matiere_ht, Decimal('10.00'))
+        self.assertIn('Recost complete: 3 recipes, 3 updated', out.getvalue())
+
+    # Les processus du pool lisent la base de test en mémoire héritée du parent (fork)
+    @skipUnless(multiprocessing.get_start_method() == 'fork', "base de test invisible sans fork")
+    def test_recost_command_with_worker_pool(self):
+        """--workers 2 (pool de processus) donne les mêmes coûts que le calcul en série"""
+        call_command('recost_techsheets', workers=1, stdout=StringIO())
+        serial = dict(FicheTechnique.objects.values_list('recette_fk_id', 'cout_matiere_ht'))
+        FicheTechnique.objects.update(cout_matiere_ht=Decimal('0.00'))
+
+        out = StringIO()
+        call_command('recost_techsheets', workers=2, partitions=2, stdout=out)
+
+        self.assertIn('2 partitions, 2 worker(s)', out.getvalue())
+        self.assertEqual(dict(FicheTechnique.objects.values_list('recette_fk_id', 'cout_matiere_ht')), serial)
+        self.assertEqual(serial[self.sauce.id], Decimal('2.00'))
+
+    def test_recost_command_dry_run(self):
+        """--dry-run n'écrit rien"""
+        call_command('recost_techsheets', workers=1, dry_run=True, stdout=StringIO())
+        self.assertEqual(FicheTechnique.objects.get(pk=self.seul.id).cout_matiere_ht, Decimal('0.00'))
+
+
+class RecipeScalingTests(TestCase):
+    def setUp(self):
+        self.cat_ing = IngredientCategory.objects.create(name="TestCat", slug="test-cat")
+        self.beurre = Ingredient.objects.create(name="Beurre", slug="beurre", category=self.cat_ing)
+        self.farine = Ingredient.objects.create(name="Farine", slug="farine", category=self.cat_ing)
+        IngredientPrice.objects.create(ingredient=self.beurre, average_price=Decimal('10.00'), unit='kg')
+        IngredientPrice.objects.create(ingredient=self.farine, average_price=Decimal('2.00'), unit='kg')
+
+        # Pâte (2 fonds de tarte) : 500g farine + 250g beurre
+        self.pate = Recette.objects.create(titre="Pâte")
+        QuantiteIngredient.objects.create(recette=self.pate, ingredient=self.farine, quantite=500, unite='g')
+        QuantiteIngredient.objects.create(recette=self.pate, ingredient=self.beurre, quantite=250, unite='g')
+        FicheTechnique.objects.create(recette_fk=self.pate, nombre_portions=2)
+
+        # Tarte (4 parts) : 1 fond de tarte + 100g beurre
+        self.tarte = Recette.objects.create(titre="Tarte")
+        QuantiteIngredient.objects.create(recette=self.tarte, sub_recipe=self.pate, quantite=1, unite='port')
+        QuantiteIngredient.objects.create(recette=self.tarte, ingredient=self.beurre, quantite=100, unite='g')
+        FicheTechnique.objects.create(recette_fk=self.tarte, nombre_portions=4)
+
+        self.client_public = APIClient()
+        self.url = f'/api/v1/techsheets/fiches-techniques/{self.tarte.id}/declinaisons/'
+
+    def test_flatten_recipe(self):
+        """L'arbre est aplati en ingrédients bruts pour une fournée"""
+        from apps.techsheets.services import RecipeScalingService
+        rows = {row['ingredient']: row for row in RecipeScalingService().flatten_recipe(self.tarte.id)}
+        # Demi-pâte : 250g farine + 125g beurre ; + 100g beurre
+        self.assertEqual(rows[self.farine.id]['quantite'], Decimal('250'))
+        self.assertEqual(rows[self.beurre.id]['quantite'], Decimal('225'))
+        self.assertEqual(sum(row['cout'] for row in rows.values()), CostCalculatorService().calculate_recipe_cost(self.tarte))
+
+    def test_declinaisons_endpoint(self):
+        """Plusieurs nombres de couverts en un seul appel"""
+        response = self.client_public.get(self.url, {'portions': '4,8,40'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['nombre_portions'], 4)
+        # Fournée : 250g farine (0.50€) + 225g beurre (2.25€) = 2.75€
+        self.assertEqual(response.data['cout_fournee_ht'], 2.75)
+
+        resultats = {r['portions']: r for r in response.data['resultats']}
+        self.assertEqual(resultats[8]['facteur'], 2.0)
+        self.assertEqual(resultats[8]['cout_total_ht'], 5.5)
+        self.assertEqual(resultats[40]['cout_par_portion'], 0.69)
+        beurre = next(i for i in resultats[40]['ingredients'] if i['ingredient'] == self.beurre.id)
+        self.assertEqual(beurre['quantite'], 2250.0)
+        self.assertEqual(beurre['nom'], 'Beurre')
+
+    def test_declinaisons_invalid_portions(self):
+        """Les cibles doivent être des entiers positifs"""
+        for value in ('', 'abc', '10,-2', '0'):
+            response = self.client_public.get(self.url, {'portions': value})
+            self.assertEqual(response.status_code, 400)
+
+
+class TechniqueImportTests(TestCase):
+    """Imports ensemblistes du dictionnaire et des fiches détaillées."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        Technique.objects.create(nom="Blanchir", slug="blanchir", definition="Ancienne définition")
+        Technique.objects.create(nom="Braiser", slug="braiser-ancien", definition="Cuire à couvert")
+
+    def _write(self, name, payload):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        return path
+
+    def test_dictionary_upsert_report(self):
+        """Upsert par lots : créations, mises à jour et items ignorés comptés"""
+        path = self._write('dictionnaire.json', {'techniques': [
+            {'nom': 'Blanchir', 'definition': 'Plonger dans l\'eau bouillante', 'niveau': ['CAP']},
+            {'nom': 'Abaisser', 'definition': 'Étaler une pâte'},
+            {'nom': 'Braiser', 'definition': 'Conflit de nom'},  # nom déjà porté par 'braiser-ancien'
+            {'definition': 'Sans nom'},
+        ] + [{'nom': f'Terme {i}', 'definition': '-'} for i in range(25)]})
+
+        out = StringIO()
+        call_command('import_dictionary', file=path, batch_size=10, stdout=out)
+
+        self.assertIn('26 created, 1 updated, 2 skipped', out.getvalue())
+        blanchir = Technique.objects.get(slug='blanchir')
+        self.assertEqual(blanchir.definition, "Plonger dans l'eau bouillante")
+        self.assertEqual(blanchir.niveau, ['CAP'])
+        self.assertEqual(Technique.objects.get(slug='abaisser').nom, 'Abaisser')
+        self.assertEqual(Technique.objects.get(nom='Braiser').slug, 'braiser-ancien')
+
+    def test_details_bulk_update(self):
+        """Les fiches détaillées sont appliquées en une lecture + un bulk_update"""
+        path = self._write('details.json', {'fiches_techniques_detaillees': [
+            {'slug': 'blanchir', 'reference_cap': '1PB06', 'phases': ['Bouillir', 'Refroidir'], 'materiel': ['Casserole']},
+            {'slug': 'inconnue', 'reference_cap': '1C01'},
+        ]})
+
+        out = StringIO()
+        with self.assertNumQueries(4):  # SAVEPOINT/RELEASE + lecture + bulk_update
+            call_command('import_tech_details', file=path, stdout=out)
+
+        self.assertIn('Technique not found for slug: inconnue', out.getvalue())
+        self.assertIn('Successfully updated 1 techniques (1 skipped)', out.getvalue())
+        blanchir = Technique.objects.get(slug='blanchir')
+        self.assertTrue(blanchir.is_active_techsheet)
+        self.assertEqual(blanchir.categorie_cap, 'BASE')
+        self.assertEqual(blanchir.phases, ['Bouillir', 'Refroidir'])
@@ -0,0 +1,159 @@
+# C:\Foodypedia\apps\techsheets\units.py
+
+"""
+Normalisation des unités de QuantiteIngredient.unite pour le calcul des coûts.
+
+Chaque libellé saisi ('g', 'Gr', 'cl', 'c. à s.', 'pièces'...) est analysé une
+seule fois (lru_cache) en une unité canonique : une dimension (masse en g,
+volume en ml, pièce, portion) et un facteur vers l'unité de base.
+"""
+
+import re
+import unicodedata
+from collections import namedtuple
+from decimal import Decimal
+from functools import lru_cache
+
+MASS = 'mass'        # base : gramme
+VOLUME = 'volume'    # base : millilitre
+PIECE = 'piece'      # base : pièce
+PORTION = 'portion'  # base : portion de recette
+UNKNOWN = 'unknown'
+
+CanonicalUnit = namedtuple('CanonicalUnit', ['dimension', 'factor'])
+
+UNIT_TABLE = {
+    # Masse (g)
+    'mg': (MASS, Decimal('0.001')),
+    'g': (MASS, Decimal('1')),
+    'gr': (MASS, Decimal('1')),
+    'gramme': (MASS, Decimal('1')),
+    'kg': (MASS, Decimal('1000')),
+    'kilo': (MASS, Decimal('1000')),
+    'kilogramme': (MASS, Decimal('1000')),
+    # Volume (ml)
+    'ml': (VOLUME, Decimal('1')),
+    'millilitre': (VOLUME, Decimal('1')),
+    'cl': (VOLUME, Decimal('10')),
+    'centilitre': (VOLUME, Decimal('10')),
+    'dl': (VOLUME, Decimal('100')),
+    'decilitre': (VOLUME, Decimal('100')),
+    'l': (VOLUME, Decimal('1000')),
+    'litre': (VOLUME, Decimal('1000')),
+    'cs': (VOLUME, Decimal('15')),
+    'cas': (VOLUME, Decimal('15')),
+    'cuillere a soupe': (VOLUME, Decimal('15')),
+    'cc': (VOLUME, Decimal('5')),
+    'cac': (VOLUME, Decimal('5')),
+    'cuillere a cafe': (VOLUME, Decimal('5')),
+    # Pièces
+    'unit': (PIECE, Decimal('1')),
+    'u': (PIECE, Decimal('1')),
+    'unite': (PIECE, Decimal('1')),
+    'piece': (PIECE, Decimal('1')),
+    'pc': (PIECE, Decimal('1')),
+    'pce': (PIECE, Decimal('1')),
+    # Portions (sous-recettes)
+    'portion': (PORTION, Decimal('1')),
+    'port': (PORTION, Decimal('1')),
+    'part': (PORTION, Decimal('1')),
+}
+
+# Unités d'achat de la Mercuriale (IngredientPrice.UNIT_CHOICES)
+PRICE_UNITS = {
+    'kg': CanonicalUnit(MASS, Decimal('1000')),
+    'l': CanonicalUnit(VOLUME, Decimal('1000')),
+    'unit': CanonicalUnit(PIECE, Decimal('1')),
+}
+
+# Clés lues dans Ingredient.specific_data
+DENSITY_KEYS = ('densite', 'density')                    # g/ml
+PIECE_WEIGHT_KEYS = ('poids_piece_g', 'piece_weight_g')  # g/pièce
+
+
+@lru_cache(maxsize=1024)
+def parse_unit(label):
+    """
+    Analyse un libellé d'unité libre. Retourne une CanonicalUnit
+    (dimension UNKNOWN si le libellé n'est pas reconnu).
+    """
+    text = unicodedata.normalize('NFKD', (label or '').lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'[.\s]+', ' ', text).strip()
+    text = text.replace('c a s', 'cas').replace('c a c', 'cac')
+
+    candidates = [text, text.replace(' ', '')]
+    # Pluriels : 'pièces', 'portions', 'grammes', 'cuilleres a soupe'...
+    candidates += [re.sub(r's\b', '', c) for c in candidates]
+    for candidate in candidates:
+        if candidate in UNIT_TABLE:
+            return CanonicalUnit(*UNIT_TABLE[candidate])
+    return CanonicalUnit(UNKNOWN, Decimal('1'))
+
+
+def _read_decimal(specific_data, keys):
+    for key in keys:
+        value = (specific_data or {}).get(key)
+        if value in (None, ''):
+            continue
+        try:
+            value = Decimal(str(value).replace(',', '.'))
+        except ArithmeticError:
+            continue
+        if value > 0:
+            return value
+    return None
+
+
+def ingredient_factor(unit_label, price_unit, specific_data=None):
+    """
+    Facteur multiplicatif qui convertit une quantité saisie en 'unit_label'
+    vers l'unité d'achat 'price_unit' ('kg', 'l', 'unit').
+
+    - masse <-> volume : densité de l'ingrédient (défaut 1 g/ml, eau) ;
+    - pièce <-> masse/volume : poids d'une pièce si renseigné ;
+    - conversion impossible (unité inconnue, portion, pièce sans poids de
+      pièce) : None, à signaler plutôt que de prendre la quantité telle quelle.
+    """
+    source = parse_unit(unit_label)
+    target = PRICE_UNITS.get(price_unit)
+    if target is None or source.dimension in (UNKNOWN, PORTION):
+        return None
+
+    if source.dimension == target.dimension:
+        return source.factor / target.factor
+
+    density = _read_decimal(specific_data, DENSITY_KEYS) or Decimal('1')
+    piece_weight = _read_decimal(specific_data, PIECE_WEIGHT_KEYS)
+
+    # Ramène la source en grammes
+    if source.dimension == MASS:
+        grams = source.factor
+    elif source.dimension == VOLUME:
+        grams = source.factor * density
+    elif piece_weight:
+        grams = source.factor * piece_weight
+    else:
+        return None
+
+    # Puis des grammes vers l'unité d'achat
+    if target.dimension == MASS:
+        return grams / target.factor
+    if target.dimension == VOLUME:
+        return grams / density / target.factor
+    if piece_weight:
+        return grams / piece_weight
+    return None
+
+
+def sub_recipe_factor(unit_label, nombre_portions, poids_total_g=None):
+    """
+    Part d'une sous-recette consommée par une quantité de 1 'unit_label'.
+    - En masse/volume (1 ml ~ 1 g) : rapportée au poids total produit ;
+      None si ce poids est inconnu (conversion impossible, à signaler) ;
+    - sinon la quantité est un nombre de portions.
+    """
+    source = parse_unit(unit_label)
+    if source.dimension in (MASS, VOLUME):
+        return source.factor / Decimal(poids_total_g) if poids_total_g else None
+    return Decimal('1') / Decimal(nombre_portions or 1)
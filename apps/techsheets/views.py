@@ -1,11 +1,12 @@
 # C:\Foodypedia\apps\techsheets\views.py
 
-from rest_framework import viewsets, permissions, filters
+from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Avg, Count, Q
 from .models import FicheTechnique
 from .serializers import FicheTechniqueSerializer
+from .services import RecipeScalingService
 
 
 class IsAuthenticatedOrReadOnly(permissions.BasePermission):
@@ -40,6 +41,9 @@ class FicheTechniqueViewSet(viewsets.ModelViewSet):
     search_fields = ['recette_fk__titre', 'recette_fk__description']
     ordering_fields = ['nombre_portions', 'cout_matiere_ht', 'marge_appliquee', 'validation_admin']
     ordering = ['-validation_admin', 'recette_fk__titre']
+
+    # Nombre maximum de cibles pour l'endpoint 'declinaisons'
+    MAX_DECLINAISONS = 20
     
     def get_queryset(self):
         """
@@ -125,6 +129,31 @@ class FicheTechniqueViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(fiche)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def declinaisons(self, request, pk=None):
+        """
+        Quantités et coûts de la fiche pour plusieurs nombres de couverts en un appel.
+        GET /api/v1/techsheets/fiches-techniques/{id}/declinaisons/?portions=10,20,50,120
+        """
+        raw = request.query_params.get('portions', '')
+        try:
+            targets = [int(value) for value in raw.split(',') if value.strip()]
+        except ValueError:
+            targets = []
+        if not targets or any(target <= 0 for target in targets):
+            return Response(
+                {"error": "Paramètre 'portions' requis : liste d'entiers positifs (ex: 10,20,50)."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(targets) > self.MAX_DECLINAISONS:
+            return Response(
+                {"error": f"{self.MAX_DECLINAISONS} déclinaisons maximum par appel."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fiche = self.get_object()
+        return Response(RecipeScalingService().scale(fiche, targets))
+
 from .models import Technique
 from .serializers import TechniqueSerializer
 from django_filters.rest_framework import DjangoFilterBackend
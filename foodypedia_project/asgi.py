@@ -11,6 +11,8 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodypedia_project.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodypedia_project.settings.dev')
 
+# Nécessaire pour les vues asynchrones en flux (ai-chef/generate/stream/) :
+#   uvicorn foodypedia_project.asgi:application
 application = get_asgi_application()
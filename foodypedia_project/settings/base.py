@@ -174,4 +174,42 @@ CORS_ALLOWED_ORIGINS = [
 # --- Configuration MEDIA (Images Ingrédients) ---
 import os
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# --- Recettes : garde-fou sur l'imbrication des sous-recettes ---
+RECIPE_MAX_NESTING_DEPTH = 10
+
+# --- Import ingrédients : photos et index des noms de fichiers ---
+INGREDIENT_PICS_DIR = os.path.join(BASE_DIR.parent, 'static', 'ingredients_pics')
+INGREDIENT_PICS_INDEX_CACHE = os.path.join(BASE_DIR, '.cache', 'ingredients_pics_index.json')
+# Photos stockées une fois par contenu (SHA-256) ; lien dur entre objets stockés si possible
+INGREDIENT_MEDIA_HARDLINKS = True
+
+# --- Microservice IA (services/ia) et file de tâches locale ---
+IA_SERVICE_URL = os.environ.get('IA_SERVICE_URL', 'http://localhost:8001/generate-fiche-technique/')
+IA_SERVICE_BATCH_URL = os.environ.get('IA_SERVICE_BATCH_URL', 'http://localhost:8001/generate-fiches-techniques/batch')
+IA_SERVICE_TIMEOUT = 30         # secondes, par appel (par ligne pour un lot)
+IA_JOB_MAX_ATTEMPTS = 3         # tentatives avant échec définitif
+IA_JOB_STALE_AFTER = 300        # secondes : une tâche RUNNING plus ancienne est remise en file
+IA_WORKERS = 4                  # threads par défaut de run_ia_worker
+IA_WORKER_BATCH_SIZE = 20       # tâches envoyées par appel au endpoint de lot (1 = appel unitaire)
+IA_BATCH_MAX_RECETTES = 500     # recettes par demande de génération en lot
+
+# --- Agent IA n8n (GenerateRecipeView) ; vide = non configuré (503) ---
+N8N_WEBHOOK_URL = os.environ.get('N8N_WEBHOOK_URL', '')
+N8N_WEBHOOK_TIMEOUT = 60        # secondes : génération de recette par l'agent
+# Source du mode streaming (SSE) : webhook n8n, ou 'apps.recipes.ai_chef.fake_recipe_events' sans réseau
+AI_CHEF_UPSTREAM = 'apps.recipes.ai_chef.n8n_recipe_events'
+AI_CHEF_FAKE_DELAY = 0.5        # secondes entre deux événements de la source simulée
+# Réponse depuis les recettes existantes (index inversé ingrédients -> recettes)
+AI_CHEF_CATALOGUE_MIN_SCORE = 0.5   # score de Dice minimal de la meilleure recette, sinon appel IA
+AI_CHEF_CATALOGUE_LIMIT = 5         # recettes proposées
+# "Que puis-je cuisiner ?" : poids d'un ingrédient remplacé par un autre de la même famille
+PANTRY_SUBSTITUTION_WEIGHT = 0.5
+
+# --- Clients HTTP sortants (apps/core/outbound.py) : pool, tentatives, disjoncteur ---
+# Options par service, par-dessus OUTBOUND_HTTP_DEFAULTS
+OUTBOUND_HTTP = {
+    'ia': {'read_timeout': IA_SERVICE_TIMEOUT, 'pool_maxsize': IA_WORKERS * 2},
+    'n8n': {'read_timeout': N8N_WEBHOOK_TIMEOUT, 'retries': 1},
+}
@@ -1,8 +1,11 @@
 # microservice_ia/api.py (mise à jour)
 
-from fastapi import FastAPI
+import json
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from schemas import FicheInput, FicheOutput # Importer le Schéma
-from logic import generer_fiche_normalisee # Importer la logique
+from logic import generer_fiche_normalisee, generer_lot, ServiceSaturated, BATCH_MAX_ITEMS, cache # Importer la logique
 import uvicorn
 
 # Initialisation de l'API
@@ -12,10 +15,43 @@ app = FastAPI(title="Foodypedia AI Microservice")
 async def generate_fiche_technique(data: FicheInput):
     """
     Endpoint principal qui appelle la logique IA et retourne le résultat.
+    La logique est asynchrone : la boucle d'événements reste libre pendant l'appel au LLM.
     """
-    # L'appel direct à la fonction de logique
-    resultat = generer_fiche_normalisee(data) 
+    try:
+        resultat = await generer_fiche_normalisee(data)
+    except ServiceSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
     return resultat
 
+@app.post("/generate-fiches-techniques/batch")
+async def generate_fiches_techniques_batch(items: List[FicheInput], parallelisme: Optional[int] = None):
+    """
+    Génère un lot de fiches en parallèle (pool borné) et renvoie les résultats
+    en NDJSON (une ligne JSON par élément), au fur et à mesure qu'ils sont prêts.
+    Chaque ligne porte l'"index" de l'élément dans la requête.
+    """
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Lot limité à {BATCH_MAX_ITEMS} éléments")
+
+    async def lignes():
+        async for resultat in generer_lot(items, parallelisme):
+            yield json.dumps(resultat, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lignes(), media_type="application/x-ndjson")
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Compteurs du cache de résultats (succès, échecs, taille)."""
+    if cache is None:
+        return {"backend": "none"}
+    return cache.stats()
+
+@app.delete("/cache")
+def cache_clear():
+    """Vide le cache et remet les compteurs à zéro."""
+    if cache is not None:
+        cache.clear()
+    return {"cleared": True}
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8001)
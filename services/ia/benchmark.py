@@ -0,0 +1,82 @@
+# microservice_ia/benchmark.py
+
+"""
+Banc de charge du microservice IA : débit (req/s) selon le nombre de clients simultanés.
+
+    python benchmark.py                          # en processus (ASGITransport), sans serveur
+    python benchmark.py --url http://localhost:8001
+    python benchmark.py --concurrency 1 8 32 64 --requests 128
+
+Avec la latence LLM simulée (IA_SIMULATED_LATENCY), le débit attendu est d'environ
+min(clients, IA_MAX_CONCURRENCY) / latence : il doit croître avec la concurrence.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+ENDPOINT = "/generate-fiche-technique/"
+
+
+def make_payload(i):
+    return {
+        "recette_id": i,
+        "titre": f"Recette de test {i}",
+        "ingredients_bruts": ["200 g de Farine", "3 pièce de Oeuf", "50 cl de Lait"],
+    }
+
+
+async def run_level(client, concurrency, total):
+    """Envoie 'total' requêtes avec 'concurrency' clients ; retourne les mesures."""
+    latencies, statuses = [], {}
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            response = await client.post(ENDPOINT, json=make_payload(i))
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "elapsed": elapsed,
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "max": max(latencies),
+        "statuses": statuses,
+    }
+
+
+async def main(args):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                   limits=httpx.Limits(max_connections=max(args.concurrency)))
+    else:
+        from api import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                   base_url="http://ia", timeout=args.timeout)
+
+    async with client:
+        print(f"{'clients':>8} {'requêtes':>9} {'durée (s)':>10} {'req/s':>8} {'p50 (s)':>8} {'max (s)':>8}  statuts")
+        for concurrency in args.concurrency:
+            total = args.requests or concurrency * 2
+            r = await run_level(client, concurrency, total)
+            print(f"{r['concurrency']:>8} {r['requests']:>9} {r['elapsed']:>10.2f} {r['rps']:>8.1f} "
+                  f"{r['p50']:>8.2f} {r['max']:>8.2f}  {r['statuses']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc de charge du microservice IA")
+    parser.add_argument("--url", help="URL d'un serveur lancé (défaut : application en processus)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--requests", type=int, default=None,
+                        help="Requêtes par niveau (défaut : 2 x clients)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    asyncio.run(main(parser.parse_args()))
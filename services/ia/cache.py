@@ -0,0 +1,187 @@
+# microservice_ia/cache.py
+
+"""
+Cache des résultats de génération, indexé par une empreinte de l'entrée normalisée.
+
+Deux FicheInput ne différant que par recette_id, la casse, les espaces ou l'ordre
+des ingrédients donnent la même clé : le LLM n'est appelé qu'une fois. On stocke
+les données de la fiche (FicheData) ; recette_id est réappliqué à la lecture.
+
+Backends :
+    MemoryBackend  LRU + TTL en mémoire (par processus)
+    DiskBackend    LRU + TTL dans un fichier SQLite (partagé entre processus et redémarrages)
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from schemas import FicheInput
+
+CACHE_KEY_VERSION = 1
+
+
+def _normaliser_texte(texte: str) -> str:
+    texte = unicodedata.normalize("NFC", texte or "")
+    return " ".join(texte.split()).casefold()
+
+
+def cle_cache(data: FicheInput) -> str:
+    """Empreinte SHA-256 de l'entrée canonique (recette_id exclu)."""
+    canonique = {
+        "v": CACHE_KEY_VERSION,
+        "titre": _normaliser_texte(data.titre),
+        "ingredients": sorted(_normaliser_texte(i) for i in data.ingredients_bruts if i and i.strip()),
+        "contraintes": data.contraintes_json or {},
+    }
+    brut = json.dumps(canonique, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(brut.encode("utf-8")).hexdigest()
+
+
+class MemoryBackend:
+    """LRU borné à max_entries ; les entrées expirent après ttl secondes."""
+    nom = "memory"
+    bloquant = False
+
+    def __init__(self, max_entries=1024, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()  # clé -> (expire_a, valeur), du moins au plus récent
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskBackend:
+    """
+    Même politique dans une table SQLite. Les accès sont bloquants : la logique
+    les exécute dans le pool de threads (run_blocking).
+    """
+    nom = "disk"
+    bloquant = True
+
+    def __init__(self, path, max_entries=10000, ttl=86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fiche_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS fiche_cache_lru ON fiche_cache (last_access)")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM fiche_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM fiche_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE fiche_cache SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fiche_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + self.ttl, now),
+            )
+            # Expirées d'abord, puis les moins récemment utilisées au-delà de la limite
+            self._conn.execute("DELETE FROM fiche_cache WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM fiche_cache WHERE key IN ("
+                " SELECT key FROM fiche_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM fiche_cache")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM fiche_cache").fetchone()[0]
+
+
+class ResultCache:
+    """Backend + compteurs de succès/échecs (exposés par GET /cache/stats)."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # échecs servis par une génération identique déjà en cours
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def clear(self):
+        self.backend.clear()
+        self.hits = self.misses = self.coalesced = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend.nom,
+            "entries": len(self.backend),
+            "max_entries": self.backend.max_entries,
+            "ttl": self.backend.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def creer_cache(backend="memory", max_entries=1024, ttl=86400, path="ia_cache.sqlite3"):
+    """Cache selon la configuration ; None si backend == 'none'."""
+    if backend == "none":
+        return None
+    if backend == "disk":
+        return ResultCache(DiskBackend(path, max_entries=max_entries, ttl=ttl))
+    if backend == "memory":
+        return ResultCache(MemoryBackend(max_entries=max_entries, ttl=ttl))
+    raise ValueError(f"IA_CACHE_BACKEND inconnu : {backend!r} (memory, disk ou none)")
@@ -1,34 +1,202 @@
 # microservice_ia/logic.py
 
-from schemas import FicheInput, FicheData, FicheOutput
-import time
+import asyncio
+import os
 import random
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import List
+from schemas import FicheInput, FicheData, FicheOutput
+from cache import cle_cache, creer_cache
+
+# --- Limites de concurrence (variables d'environnement) ---
+# Générations simultanées par processus ; au-delà, les requêtes attendent leur tour
+MAX_CONCURRENCY = int(os.environ.get("IA_MAX_CONCURRENCY", "64"))
+# Requêtes en attente tolérées ; au-delà, refus immédiat (503) plutôt qu'une file infinie
+MAX_WAITING = int(os.environ.get("IA_MAX_WAITING", "512"))
+# Threads pour le code bloquant (SDK LLM synchrone, calculs lourds)
+EXECUTOR_WORKERS = int(os.environ.get("IA_EXECUTOR_WORKERS", "16"))
+# Latence simulée du LLM (secondes)
+SIMULATED_LATENCY = float(os.environ.get("IA_SIMULATED_LATENCY", "1.5"))
+# Lots : éléments traités en parallèle par lot, et taille maximale d'un lot
+BATCH_CONCURRENCY = int(os.environ.get("IA_BATCH_CONCURRENCY", "16"))
+BATCH_MAX_ITEMS = int(os.environ.get("IA_BATCH_MAX_ITEMS", "500"))
+# Cache des résultats : memory, disk (fichier SQLite) ou none
+CACHE_BACKEND = os.environ.get("IA_CACHE_BACKEND", "memory")
+CACHE_MAX_ENTRIES = int(os.environ.get("IA_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL = float(os.environ.get("IA_CACHE_TTL", "86400"))
+CACHE_PATH = os.environ.get("IA_CACHE_PATH", "ia_cache.sqlite3")
+
+
+class ServiceSaturated(Exception):
+    """Trop de requêtes en attente : le client doit réessayer plus tard."""
 
-def generer_fiche_normalisee(data: FicheInput) -> FicheOutput:
+
+_executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="ia-llm")
+cache = creer_cache(CACHE_BACKEND, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, path=CACHE_PATH)
+
+
+class EtatBoucle:
     """
-    Simule l'appel au LLM et le calcul de la Fiche Technique.
+    Primitives asyncio d'une boucle d'événements : un Semaphore ou un Future
+    est lié à la boucle qui l'utilise en premier. Créées à la demande pour
+    chaque boucle (clients de test, rechargement), jamais au chargement du module.
     """
-    print(f"[{time.strftime('%H:%M:%S')}] Début du traitement IA pour {data.titre}...")
-    
+
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        self.waiting = 0
+        self.en_cours = {}  # clé de cache -> génération en cours
+
+
+_etats = weakref.WeakKeyDictionary()  # boucle -> EtatBoucle
+
+
+def etat_boucle() -> EtatBoucle:
+    loop = asyncio.get_running_loop()
+    etat = _etats.get(loop)
+    if etat is None:
+        etat = _etats[loop] = EtatBoucle()
+    return etat
+
+
+@asynccontextmanager
+async def concurrency_slot(rejeter_si_sature=True):
+    """
+    Réserve une place parmi les MAX_CONCURRENCY générations simultanées.
+    rejeter_si_sature=False : attend toujours (éléments d'un lot, déjà bornés par lot).
+    """
+    etat = etat_boucle()
+    if rejeter_si_sature and etat.semaphore.locked() and etat.waiting >= MAX_WAITING:
+        raise ServiceSaturated(f"{MAX_WAITING} requêtes déjà en attente")
+    etat.waiting += 1
+    try:
+        await etat.semaphore.acquire()
+    finally:
+        etat.waiting -= 1
+    try:
+        yield
+    finally:
+        etat.semaphore.release()
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Exécute une fonction bloquante dans le pool borné, sans bloquer la boucle d'événements."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+
+
+def estimer_cout(data: FicheInput) -> float:
     # 1. Nettoyage et Normalisation des ingrédients (simulé)
     # Dans un vrai cas : ici, on normaliserait "cuillère à café" en 'cc', "farine T45" en 'Farine de blé', etc.
-    normalisation_couts = random.uniform(8.0, 20.0) # Simulation de l'estimation de coût
-
-    # 2. Simulation de la durée du LLM
-    time.sleep(1.5) # Simule le temps de réponse d'une requête LLM
-
-    # 3. Construction des données de sortie
-    donnees_generes = FicheData(
-        nombre_portions=random.choice([2, 4, 6]),
-        cout_matiere_ht=round(normalisation_couts, 2), 
-        marge_appliquee=random.choice([20.00, 25.00, 30.00]),
-        # Liste d'IDs d'ustensiles (qui existent dans le catalogue 'core')
-        materiel_requis_json=random.sample([1, 5, 12, 22, 30], 3)
-    )
+    return random.uniform(8.0, 20.0) # Simulation de l'estimation de coût
+
+
+async def appeler_llm(data: FicheInput) -> None:
+    # Appel réseau au LLM : avec un client asynchrone (httpx.AsyncClient, SDK async), l'attente
+    # ne bloque pas la boucle. Un SDK synchrone passerait par run_blocking().
+    await asyncio.sleep(SIMULATED_LATENCY) # Simule le temps de réponse d'une requête LLM
 
+
+async def generer_donnees(data: FicheInput, rejeter_si_sature=True) -> FicheData:
+    """
+    Simule l'appel au LLM et le calcul de la Fiche Technique.
+    Coroutine : des centaines de générations peuvent attendre le LLM en parallèle
+    dans un seul processus, dans la limite de MAX_CONCURRENCY.
+    """
+    async with concurrency_slot(rejeter_si_sature):
+        print(f"[{time.strftime('%H:%M:%S')}] Début du traitement IA pour {data.titre}...")
+
+        normalisation_couts = await run_blocking(estimer_cout, data)
+
+        # 2. Simulation de la durée du LLM
+        await appeler_llm(data)
+
+        # 3. Construction des données de sortie
+        return FicheData(
+            nombre_portions=random.choice([2, 4, 6]),
+            cout_matiere_ht=round(normalisation_couts, 2), 
+            marge_appliquee=random.choice([20.00, 25.00, 30.00]),
+            # Liste d'IDs d'ustensiles (qui existent dans le catalogue 'core')
+            materiel_requis_json=random.sample([1, 5, 12, 22, 30], 3)
+        )
+
+
+async def _cache_appel(methode, *args):
+    if cache.backend.bloquant:
+        return await run_blocking(methode, *args)
+    return methode(*args)
+
+
+async def generer_fiche_normalisee(data: FicheInput, rejeter_si_sature=True) -> FicheOutput:
+    """
+    Fiche technique pour 'data' : lue dans le cache si une entrée équivalente a
+    déjà été générée, sinon générée puis mise en cache. Les demandes identiques
+    simultanées (double clic) partagent la même génération.
+    """
+    if cache is None:
+        donnees = await generer_donnees(data, rejeter_si_sature)
+        return _sortie(data, donnees)
+
+    cle = cle_cache(data)
+    en_cache = await _cache_appel(cache.get, cle)
+    if en_cache is not None:
+        return _sortie(data, FicheData(**en_cache))
+
+    en_cours = etat_boucle().en_cours
+    tache = en_cours.get(cle)
+    if tache is None:
+        tache = asyncio.ensure_future(_generer_et_mettre_en_cache(cle, data, rejeter_si_sature))
+        en_cours[cle] = tache
+        tache.add_done_callback(lambda _: en_cours.pop(cle, None))
+    else:
+        cache.coalesced += 1
+    # shield : l'annulation d'un demandeur n'annule pas la génération partagée
+    donnees = await asyncio.shield(tache)
+    return _sortie(data, donnees)
+
+
+async def _generer_et_mettre_en_cache(cle, data, rejeter_si_sature) -> FicheData:
+    donnees = await generer_donnees(data, rejeter_si_sature)
+    await _cache_appel(cache.set, cle, donnees.model_dump())  # seules les réussites sont mises en cache
+    return donnees
+
+
+def _sortie(data: FicheInput, donnees: FicheData) -> FicheOutput:
     return FicheOutput(
         recette_id=data.recette_id,
         statut_generation="SUCCES",
         message="Fiche technique normalisée et coûts estimés avec succès.",
-        donnees_fiche=donnees_generes
-    )
\ No newline at end of file
+        donnees_fiche=donnees
+    )
+
+
+async def generer_lot(items: List[FicheInput], parallelisme: int = None):
+    """
+    Génère les fiches d'un lot, au plus 'parallelisme' à la fois, et produit
+    un résultat par élément dans l'ordre de fin (pas dans l'ordre d'entrée) :
+        {"index": 3, "recette_id": 12, "ok": true, "fiche": {...}}
+        {"index": 4, "recette_id": 15, "ok": false, "erreur": "..."}
+    Une erreur sur un élément n'interrompt pas le lot.
+    """
+    limite = asyncio.Semaphore(max(1, min(parallelisme or BATCH_CONCURRENCY, BATCH_CONCURRENCY)))
+
+    async def traiter(index, data):
+        async with limite:
+            try:
+                fiche = await generer_fiche_normalisee(data, rejeter_si_sature=False)
+            except Exception as e:
+                return {"index": index, "recette_id": data.recette_id, "ok": False, "erreur": str(e)}
+            return {"index": index, "recette_id": data.recette_id, "ok": True, "fiche": fiche.model_dump()}
+
+    taches = [asyncio.create_task(traiter(index, data)) for index, data in enumerate(items)]
+    try:
+        for prochaine in asyncio.as_completed(taches):
+            yield await prochaine
+    finally:
+        # Client déconnecté : on abandonne les éléments restants
+        for tache in taches:
+            tache.cancel()
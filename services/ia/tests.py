@@ -0,0 +1,290 @@
+# microservice_ia/tests.py
+
+"""
+Tests du microservice IA (hors Django) :
+
+    cd services/ia && python -m unittest tests
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from fastapi.testclient import TestClient
+import api
+import logic
+from cache import DiskBackend, MemoryBackend, ResultCache, cle_cache
+from schemas import FicheInput
+
+
+def fiche(recette_id=1, titre="Tarte aux pommes", ingredients=("Pommes", "Pâte brisée"), **extra):
+    return FicheInput(recette_id=recette_id, titre=titre, ingredients_bruts=list(ingredients), **extra)
+
+
+class CacheKeyTests(unittest.TestCase):
+    """Tests de l'empreinte de l'entrée normalisée."""
+
+    def test_key_ignores_recette_id_case_spaces_and_order(self):
+        """Test: recette_id, casse, espaces et ordre des ingrédients ne changent pas la clé."""
+        reference = cle_cache(fiche())
+        self.assertEqual(cle_cache(fiche(recette_id=42)), reference)
+        self.assertEqual(cle_cache(fiche(titre="  TARTE aux   Pommes ")), reference)
+        self.assertEqual(cle_cache(fiche(ingredients=("pâte BRISÉE", "  pommes", ""))), reference)
+
+    def test_key_depends_on_content(self):
+        """Test: Titre, ingrédients et contraintes distinguent les entrées."""
+        reference = cle_cache(fiche())
+        self.assertNotEqual(cle_cache(fiche(titre="Tarte aux poires")), reference)
+        self.assertNotEqual(cle_cache(fiche(ingredients=("Pommes",))), reference)
+        self.assertNotEqual(cle_cache(fiche(contraintes_json={"vegan": True})), reference)
+
+
+class MemoryBackendTests(unittest.TestCase):
+    """Tests du LRU + TTL en mémoire."""
+
+    def test_evicts_least_recently_used(self):
+        """Test: Au-delà de max_entries, l'entrée la moins récemment lue est retirée."""
+        backend = MemoryBackend(max_entries=2, ttl=60)
+        backend.set("a", 1)
+        backend.set("b", 2)
+        self.assertEqual(backend.get("a"), 1)  # 'a' redevient la plus récente
+        backend.set("c", 3)
+
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("a"), 1)
+        self.assertEqual(backend.get("c"), 3)
+        self.assertEqual(len(backend), 2)
+
+    def test_entries_expire_after_ttl(self):
+        """Test: Une entrée n'est plus servie après ttl secondes."""
+        backend = MemoryBackend(ttl=10)
+        with mock.patch("cache.time.monotonic", return_value=1000.0):
+            backend.set("a", 1)
+        with mock.patch("cache.time.monotonic", return_value=1009.0):
+            self.assertEqual(backend.get("a"), 1)
+        with mock.patch("cache.time.monotonic", return_value=1010.0):
+            self.assertIsNone(backend.get("a"))
+        self.assertEqual(len(backend), 0)
+
+
+class DiskBackendTests(unittest.TestCase):
+    """Tests du cache SQLite partagé entre processus."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "cache.sqlite3")
+
+    def test_entries_survive_a_restart(self):
+        """Test: Une nouvelle instance sur le même fichier relit les entrées."""
+        DiskBackend(self.path).set("a", {"nombre_portions": 4})
+        self.assertEqual(DiskBackend(self.path).get("a"), {"nombre_portions": 4})
+
+    def test_evicts_least_recently_used_and_expired(self):
+        """Test: Même politique LRU + TTL que le backend mémoire."""
+        backend = DiskBackend(self.path, max_entries=2, ttl=10)
+        with mock.patch("cache.time.time", return_value=1000.0):
+            backend.set("a", 1)
+        with mock.patch("cache.time.time", return_value=1001.0):
+            backend.set("b", 2)
+        with mock.patch("cache.time.time", return_value=1002.0):
+            self.assertEqual(backend.get("a"), 1)
+        with mock.patch("cache.time.time", return_value=1003.0):
+            backend.set("c", 3)
+            self.assertIsNone(backend.get("b"))
+            self.assertEqual(backend.get("a"), 1)
+        with mock.patch("cache.time.time", return_value=1013.0):
+            self.assertIsNone(backend.get("c"))
+
+
+class ResultCacheTests(unittest.TestCase):
+    """Tests des compteurs exposés par GET /cache/stats."""
+
+    def test_hit_and_miss_counters(self):
+        """Test: Succès, échecs et ratio ; clear() remet tout à zéro."""
+        cache = ResultCache(MemoryBackend(max_entries=8, ttl=60))
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("a"), 1)
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (2, 1, 1))
+        self.assertEqual(stats["hit_ratio"], 0.6667)
+        self.assertEqual(stats["backend"], "memory")
+
+        cache.clear()
+        self.assertEqual(cache.stats()["hits"] + cache.stats()["misses"] + cache.stats()["entries"], 0)
+
+
+class CachedGenerationTests(unittest.IsolatedAsyncioTestCase):
+    """Tests de la génération servie par le cache (logic.generer_fiche_normalisee)."""
+
+    def setUp(self):
+        self.cache = ResultCache(MemoryBackend(max_entries=8, ttl=60))
+        for name, value in (("cache", self.cache), ("SIMULATED_LATENCY", 0.05)):
+            patcher = mock.patch.object(logic, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_concurrent_identical_requests_share_one_generation(self):
+        """Test: Deux demandes équivalentes simultanées -> un seul appel au LLM, puis le cache."""
+        with mock.patch.object(logic, "appeler_llm", wraps=logic.appeler_llm) as llm:
+            premiere, seconde = await asyncio.gather(
+                logic.generer_fiche_normalisee(fiche(recette_id=1)),
+                logic.generer_fiche_normalisee(fiche(recette_id=2, titre="TARTE AUX POMMES")),
+            )
+            troisieme = await logic.generer_fiche_normalisee(fiche(recette_id=3))
+
+        self.assertEqual(llm.call_count, 1)
+        self.assertEqual((premiere.recette_id, seconde.recette_id, troisieme.recette_id), (1, 2, 3))
+        self.assertEqual(premiere.donnees_fiche, seconde.donnees_fiche)
+        self.assertEqual(troisieme.donnees_fiche, premiere.donnees_fiche)
+        stats = self.cache.stats()
+        self.assertEqual((stats["coalesced"], stats["hits"], stats["misses"]), (1, 1, 2))
+
+
+class ConcurrencyTests(unittest.IsolatedAsyncioTestCase):
+    """Tests de la concurrence bornée (semaphore, file d'attente, pool de threads)."""
+
+    def setUp(self):
+        self.en_vol = self.pic = 0
+        self.liberer = asyncio.Event()
+        for name, value in (("cache", None), ("MAX_CONCURRENCY", 2), ("MAX_WAITING", 1),
+                            ("appeler_llm", self.llm_bloque)):
+            patcher = mock.patch.object(logic, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def llm_bloque(self, data):
+        self.en_vol += 1
+        self.pic = max(self.pic, self.en_vol)
+        await self.liberer.wait()
+        self.en_vol -= 1
+
+    async def test_semaphore_limits_simultaneous_generations(self):
+        """Test: Au plus MAX_CONCURRENCY générations à la fois, les suivantes attendent."""
+        taches = [asyncio.create_task(logic.generer_donnees(fiche(), rejeter_si_sature=False)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.en_vol, 2)
+        self.assertEqual(logic.etat_boucle().waiting, 3)
+
+        self.liberer.set()
+        await asyncio.gather(*taches)
+        self.assertEqual(self.pic, 2)
+
+    async def test_rejects_when_waiting_queue_is_full(self):
+        """Test: Au-delà de MAX_WAITING requêtes en attente -> ServiceSaturated (503)."""
+        taches = [asyncio.create_task(logic.generer_donnees(fiche())) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        with self.assertRaises(logic.ServiceSaturated):
+            await logic.generer_donnees(fiche())
+        # Les éléments d'un lot attendent toujours
+        lot = asyncio.create_task(logic.generer_donnees(fiche(), rejeter_si_sature=False))
+        self.liberer.set()
+        await asyncio.gather(*taches, lot)
+
+    async def test_blocking_code_runs_in_executor(self):
+        """Test: L'estimation (bloquante) tourne dans le pool 'ia-llm', pas dans la boucle."""
+        threads = []
+
+        def estimer(data):
+            threads.append(threading.current_thread().name)
+            return 10.0
+
+        self.liberer.set()
+        with mock.patch.object(logic, "estimer_cout", estimer):
+            donnees = await logic.generer_donnees(fiche())
+        self.assertEqual(donnees.cout_matiere_ht, 10.0)
+        self.assertTrue(threads[0].startswith("ia-llm"))
+
+
+class EventLoopStateTests(unittest.TestCase):
+    """Tests des primitives asyncio créées par boucle (test clients, rechargement)."""
+
+    def test_each_event_loop_gets_its_own_state(self):
+        """Test: Deux boucles successives, avec contention sur le semaphore, fonctionnent."""
+        async def lot():
+            resultats = await asyncio.gather(*(logic.generer_fiche_normalisee(fiche(titre=str(i))) for i in range(4)))
+            return logic.etat_boucle(), len(resultats)
+
+        cache = ResultCache(MemoryBackend(max_entries=8, ttl=60))
+        with mock.patch.object(logic, "MAX_CONCURRENCY", 1), mock.patch.object(logic, "SIMULATED_LATENCY", 0.01), \
+                mock.patch.object(logic, "cache", cache):
+            premier, n1 = asyncio.run(lot())
+            cache.clear()
+            second, n2 = asyncio.run(lot())
+        self.assertEqual((n1, n2), (4, 4))
+        self.assertIsNot(premier, second)
+
+    def test_saturation_returns_503(self):
+        """Test: ServiceSaturated devient un 503 avec Retry-After."""
+        sature = mock.AsyncMock(side_effect=logic.ServiceSaturated("512 requêtes déjà en attente"))
+        with mock.patch.object(api, "generer_fiche_normalisee", sature):
+            response = TestClient(api.app).post(
+                "/generate-fiche-technique/", json=fiche().model_dump(),
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "2")
+
+
+
+class BatchEndpointTests(unittest.TestCase):
+    """Tests de POST /generate-fiches-techniques/batch (NDJSON)."""
+
+    def setUp(self):
+        self.client = TestClient(api.app)
+        self.en_vol = self.pic = 0
+        for name, value in (("cache", None), ("appeler_llm", self.llm)):
+            patcher = mock.patch.object(logic, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def llm(self, data):
+        self.en_vol += 1
+        self.pic = max(self.pic, self.en_vol)
+        await asyncio.sleep(0.01)
+        self.en_vol -= 1
+        if data.titre == "Erreur":
+            raise RuntimeError("LLM indisponible")
+
+    def post(self, items, **params):
+        response = self.client.post(
+            "/generate-fiches-techniques/batch", params=params,
+            json=[item.model_dump() for item in items],
+        )
+        return response, [json.loads(ligne) for ligne in response.text.splitlines() if ligne]
+
+    def test_one_line_per_item_and_errors_do_not_stop_the_batch(self):
+        """Test: Une ligne NDJSON par élément (avec son index), l'erreur d'un élément est isolée."""
+        items = [fiche(recette_id=i, titre=f"Plat {i}") for i in range(5)] + [fiche(recette_id=9, titre="Erreur")]
+        response, lignes = self.post(items)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        self.assertEqual(sorted(ligne["index"] for ligne in lignes), list(range(6)))
+        erreurs = [ligne for ligne in lignes if not ligne["ok"]]
+        self.assertEqual([(e["index"], e["recette_id"], e["erreur"]) for e in erreurs], [(5, 9, "LLM indisponible")])
+        for ligne in lignes:
+            if ligne["ok"]:
+                self.assertEqual(ligne["fiche"]["recette_id"], ligne["recette_id"])
+
+    def test_parallelism_is_bounded(self):
+        """Test: Au plus 'parallelisme' éléments du lot sont générés à la fois."""
+        items = [fiche(recette_id=i, titre=f"Plat {i}") for i in range(8)]
+        _, lignes = self.post(items, parallelisme=3)
+        self.assertEqual(len(lignes), 8)
+        self.assertEqual(self.pic, 3)
+
+    def test_rejects_oversized_batch(self):
+        """Test: Au-delà de BATCH_MAX_ITEMS éléments -> 413."""
+        with mock.patch.object(api, "BATCH_MAX_ITEMS", 2):
+            response, _ = self.post([fiche(), fiche(), fiche()])
+        self.assertEqual(response.status_code, 413)
+
+
+if __name__ == "__main__":
+    unittest.main()